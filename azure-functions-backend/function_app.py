@@ -3,33 +3,120 @@ import azure.functions as func
 import datetime
 import json
 import logging
+import importlib.util
 import io
 import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import PyPDF2
 import re
-import nltk
-import spacy
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 app = func.FunctionApp()
 
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('averaged_perceptron_tagger')
+# Sentence segmentation for the spaCy pipeline: "parser" uses the dependency
+# parser (also gives us noun chunks for job titles), "senter" uses the much
+# faster statistical sentence recognizer and skips parsing altogether
+SPACY_MODEL = "en_core_web_sm"
+SPACY_SENTENCE_SEGMENTATION = os.environ.get("SPACY_SENTENCE_SEGMENTATION", "parser")
 
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    # If model not found, download it
-    os.system("python -m spacy download en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+# Batch analysis feeds resumes through nlp.pipe in batches of SPACY_BATCH_SIZE,
+# fanning out to SPACY_N_PROCESS processes once there are enough of them
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", "16"))
+SPACY_N_PROCESS = int(os.environ.get("SPACY_N_PROCESS", str(os.cpu_count() or 1)))
+
+# PDF text extraction: PDF_EXTRACTION_ENGINE is "pypdfium2", "pdfminer" or
+# "pypdf2", and "auto" uses pypdfium2 if it is installed. Uploads over
+# PDF_MAX_BYTES or PDF_MAX_PAGES are rejected (0 disables a cap), and PDFs
+# with at least PDF_PARALLEL_MIN_PAGES pages are split across
+# PDF_EXTRACTION_WORKERS processes
+PDF_EXTRACTION_ENGINE = os.environ.get("PDF_EXTRACTION_ENGINE", "auto")
+PDF_MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "50"))
+PDF_EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Optional semantic similarity: a TF-IDF model fitted once on a reference
+# corpus (see backend/fit_tfidf_model.py) and loaded from TFIDF_MODEL_PATH. With
+# SIMILARITY_WEIGHT above 0, the match score blends the keyword score with
+# the cosine similarity between the resume and the job description
+TFIDF_MODEL_PATH = os.environ.get("TFIDF_MODEL_PATH", "tfidf_model.pkl")
+SIMILARITY_WEIGHT = float(os.environ.get("SIMILARITY_WEIGHT", "0"))
+
+# Match scoring: "weighted" counts each job keyword by its entry in a weight
+# table indexed by keyword id, so technical keywords outweigh soft skills and
+# keywords specific to one domain outweigh ones several domains share. A table
+# built by backend/fit_keyword_weights.py from past job descriptions
+# (KEYWORD_WEIGHTS_PATH) also favours keywords that are rare across jobs.
+# "ratio" counts every keyword equally
+MATCH_SCORING = os.environ.get("MATCH_SCORING", "weighted")
+KEYWORD_WEIGHTS_PATH = os.environ.get("KEYWORD_WEIGHTS_PATH", "keyword_weights.npz")
+
+# The skills taxonomy, shared with the Flask backend (backend/taxonomy.json);
+# it is read once when the function app starts
+TAXONOMY_PATH = os.environ.get("TAXONOMY_PATH",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomy.json"))
+
+def load_spacy_pipeline(model_name):
+    """Load spaCy with only the components extract_entities needs"""
+    # spaCy itself takes a while to import, so it is only imported when needed
+    import spacy
+    
+    try:
+        if SPACY_SENTENCE_SEGMENTATION == "senter":
+            pipeline = spacy.load(model_name, exclude=["parser", "tagger", "attribute_ruler", "lemmatizer"])
+            pipeline.enable_pipe("senter")
+        else:
+            # The tagger and attribute ruler stay because noun chunks need POS tags
+            pipeline = spacy.load(model_name, exclude=["lemmatizer", "senter"])
+    except OSError:
+        # Never download at runtime: a cold start must not depend on the network
+        raise RuntimeError(f"spaCy model '{model_name}' is not installed. "
+                           f"Install it with: python -m spacy download {model_name}")
+    
+    # Drop the shared token-to-vector layer if no remaining component listens to it
+    if "tok2vec" in pipeline.pipe_names and not pipeline.get_pipe("tok2vec").listening_components:
+        pipeline.remove_pipe("tok2vec")
+    
+    return pipeline
+
+# The spaCy model is loaded lazily by get_nlp(), once per process, so
+# importing this module stays fast and never touches the network
+nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Return the process-wide spaCy pipeline, loading it on first use"""
+    global nlp
+    if nlp is None:
+        with _nlp_lock:
+            if nlp is None:
+                nlp = load_spacy_pipeline(SPACY_MODEL)
+    return nlp
+
+# The TF-IDF model is loaded the same way, by get_tfidf_model()
+tfidf_model = None
+_tfidf_lock = threading.Lock()
+
+def load_tfidf_model(path):
+    """Load a model written by backend/fit_tfidf_model.py: the fitted vectorizer and its fingerprint"""
+    try:
+        # Unpickling the vectorizer imports scikit-learn, so this only happens on first use
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except OSError:
+        raise RuntimeError(f"TF-IDF model '{path}' not found. Fit one with: python backend/fit_tfidf_model.py <corpus>")
+
+def get_tfidf_model():
+    """Return the process-wide TF-IDF model, loading it on first use"""
+    global tfidf_model
+    if tfidf_model is None:
+        with _tfidf_lock:
+            if tfidf_model is None:
+                tfidf_model = load_tfidf_model(TFIDF_MODEL_PATH)
+    return tfidf_model
 
 @app.route(route="analyze", methods=["POST"])
 def analyze(req: func.HttpRequest) -> func.HttpResponse:
@@ -59,11 +146,22 @@ def analyze(req: func.HttpRequest) -> func.HttpResponse:
                 mimetype="application/json"
             )
         
-        # Extract text from PDF
-        resume_text = extract_text_from_pdf(resume_file)
+        # Milliseconds per stage, logged for Application Insights
+        timings = {}
+        
+        with timed_stage(timings, 'total'):
+            # Extract text from PDF, parsing the upload stream in place
+            with timed_stage(timings, 'pdf_extraction'):
+                resume_text = extract_text_from_pdf(resume_file.stream)
+            
+            # Analyze the resume against job description
+            analysis_result = analyze_resume_comprehensively(resume_text, job_description, timings=timings)
         
-        # Analyze the resume against job description
-        analysis_result = analyze_resume_comprehensively(resume_text, job_description)
+        log_stage_timings(timings)
+        
+        # ?debug_timings=1 adds this request's stage timings to the response
+        if req.params.get('debug_timings') == '1':
+            analysis_result['debug_timings'] = timings
         
         return func.HttpResponse(
             json.dumps(analysis_result),
@@ -71,6 +169,12 @@ def analyze(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="application/json"
         )
     
+    except PdfLimitError as e:
+        return func.HttpResponse(
+            json.dumps({'error': str(e)}),
+            status_code=413,
+            mimetype="application/json"
+        )
     except Exception as e:
         logging.error(f"Error during analysis: {str(e)}")
         return func.HttpResponse(
@@ -79,68 +183,401 @@ def analyze(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="application/json"
         )
 
+@app.route(route="analyze/batch", methods=["POST"])
+def analyze_batch(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Batch resume analysis function processed a request.')
+    
+    try:
+        resume_files = req.files.getlist('resumes')
+        job_description = req.form.get('jobDescription')
+        
+        if not resume_files or job_description is None:
+            return func.HttpResponse(
+                json.dumps({'error': 'Missing resume files or job description'}),
+                status_code=400,
+                mimetype="application/json"
+            )
+        
+        # ?stream=1 returns the same NDJSON lines as the Flask backend. The
+        # Functions HTTP binding buffers the response body, so the lines
+        # arrive together here, but clients can share one parser.
+        if req.params.get('stream') == '1':
+            return func.HttpResponse(
+                ''.join(stream_batch_analyses(resume_files, job_description)),
+                status_code=200,
+                mimetype="application/x-ndjson"
+            )
+        
+        results = []
+        errors = []
+        for result in iter_batch_analyses(resume_files, job_description):
+            if 'error' in result:
+                errors.append(result)
+            else:
+                results.append(result)
+        
+        return func.HttpResponse(
+            json.dumps({'results': rank_analysis_results(results), 'errors': errors}),
+            status_code=200,
+            mimetype="application/json"
+        )
+    
+    except Exception as e:
+        logging.error(f"Error during batch analysis: {str(e)}")
+        return func.HttpResponse(
+            json.dumps({'error': str(e)}),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+def stream_batch_analyses(resume_files, job_description):
+    """NDJSON lines for a batch: one per resume, then a summary with the ranking"""
+    # Only filenames and scores are kept for the summary
+    ranking = []
+    failed = 0
+    try:
+        for result in iter_batch_analyses(resume_files, job_description):
+            if 'error' in result:
+                failed += 1
+                yield json.dumps({'type': 'error', **result}) + '\n'
+            else:
+                ranking.append({'filename': result['filename'], 'match_score': result['match_score']})
+                yield json.dumps({'type': 'result', **result}) + '\n'
+    except Exception as e:
+        logging.error(f"Error during batch analysis: {str(e)}")
+        yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+    
+    summary = {
+        'type': 'summary',
+        'analyzed': len(ranking),
+        'failed': failed,
+        'ranking': rank_analysis_results(ranking)
+    }
+    yield json.dumps(summary) + '\n'
+
+def iter_batch_analyses(resume_files, job_description):
+    """Analyze uploaded resumes chunk by chunk, yielding each result as soon as it is ready"""
+    # The job description side is computed once for the whole batch. Chunks
+    # are large enough for nlp.pipe to fan out across every process
+    chunk_size = SPACY_BATCH_SIZE * max(SPACY_N_PROCESS, 1)
+    job_profile = build_job_profile(job_description)
+    
+    for chunk_start in range(0, len(resume_files), chunk_size):
+        filenames = []
+        resume_texts = []
+        
+        for resume_file in resume_files[chunk_start:chunk_start + chunk_size]:
+            # A bad file is reported on its own rather than failing the whole batch
+            if not resume_file.filename.endswith('.pdf'):
+                yield {'filename': resume_file.filename, 'error': 'Please upload a PDF file'}
+                continue
+            
+            try:
+                resume_texts.append(extract_text_from_pdf(resume_file.stream))
+                filenames.append(resume_file.filename)
+            except Exception as e:
+                yield {'filename': resume_file.filename, 'error': str(e)}
+        
+        analysis_results = analyze_resumes_batch(resume_texts, job_description, job_profile)
+        for filename, analysis_result in zip(filenames, analysis_results):
+            yield {'filename': filename, **analysis_result}
+
 # ... keep existing code (all the helper functions remain unchanged)
+class PdfLimitError(Exception):
+    """Raised when an uploaded PDF is over PDF_MAX_BYTES or PDF_MAX_PAGES"""
+
+def check_pdf_size(size):
+    """Reject a PDF before any work is done on it if it is over PDF_MAX_BYTES"""
+    if PDF_MAX_BYTES and size > PDF_MAX_BYTES:
+        raise PdfLimitError(f"PDF is {size} bytes; the limit is {PDF_MAX_BYTES} bytes.")
+
+def check_pdf_page_count(page_count):
+    if PDF_MAX_PAGES and page_count > PDF_MAX_PAGES:
+        raise PdfLimitError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}.")
+
+def select_pdf_engine():
+    """The PDF engine to use: PDF_EXTRACTION_ENGINE, or pypdfium2 when it is installed"""
+    if PDF_EXTRACTION_ENGINE != "auto":
+        return PDF_EXTRACTION_ENGINE
+    # pdfminer is never picked automatically: it copes better with some
+    # unusual layouts but is slower than PyPDF2. find_spec checks for
+    # pypdfium2 without paying for the import
+    if importlib.util.find_spec("pypdfium2") is not None:
+        return "pypdfium2"
+    return "pypdf2"
+
+def read_pdf_pages(engine, pdf_file, page_numbers=None):
+    """Return (page_count, page texts) for page_numbers, or every page after checking the page cap"""
+    if engine == "pypdfium2":
+        import pypdfium2
+        document = pypdfium2.PdfDocument(pdf_file)
+        try:
+            page_count = len(document)
+            if page_numbers is None:
+                check_pdf_page_count(page_count)
+                page_numbers = range(page_count)
+            texts = []
+            for page_number in page_numbers:
+                page = document[page_number]
+                text_page = page.get_textpage()
+                # pdfium ends lines with \r\n; the other engines use \n
+                texts.append(text_page.get_text_range().replace('\r\n', '\n'))
+                text_page.close()
+                page.close()
+            return page_count, texts
+        finally:
+            document.close()
+    
+    if engine == "pdfminer":
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        # The document is parsed once; page contents are only read when interpreted
+        pages = list(PDFPage.get_pages(pdf_file))
+        page_count = len(pages)
+        if page_numbers is None:
+            check_pdf_page_count(page_count)
+            page_numbers = range(page_count)
+        resource_manager = PDFResourceManager()
+        texts = []
+        for page_number in page_numbers:
+            output = io.StringIO()
+            device = TextConverter(resource_manager, output, laparams=LAParams())
+            PDFPageInterpreter(resource_manager, device).process_page(pages[page_number])
+            device.close()
+            texts.append(output.getvalue())
+        return page_count, texts
+    
+    if engine == "pypdf2":
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        page_count = len(pdf_reader.pages)
+        if page_numbers is None:
+            check_pdf_page_count(page_count)
+            page_numbers = range(page_count)
+        return page_count, [pdf_reader.pages[page_number].extract_text() for page_number in page_numbers]
+    
+    raise ValueError(f"Unknown PDF extraction engine '{engine}'")
+
+def extract_pdf_page_range(engine, pdf_bytes, start, stop):
+    """Worker-process entry point: texts of pages start..stop-1"""
+    return read_pdf_pages(engine, io.BytesIO(pdf_bytes), range(start, stop))[1]
+
+# Page-level parallelism runs in a process pool (every engine holds the GIL
+# or, for pdfium, is not thread-safe), created on first use in each worker
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACTION_WORKERS)
+    return _pdf_pool
+
 def extract_text_from_pdf(pdf_file):
-    """Extract text content from uploaded PDF file"""
+    """Extract text content from an uploaded PDF (a seekable file object or bytes)"""
+    if isinstance(pdf_file, bytes):
+        # BytesIO shares the buffer with the bytes object rather than copying it
+        pdf_file = io.BytesIO(pdf_file)
+    
+    # Enforce the byte cap from the stream's size without reading it
+    pdf_file.seek(0, os.SEEK_END)
+    check_pdf_size(pdf_file.tell())
+    pdf_file.seek(0)
+    
+    engine = select_pdf_engine()
     try:
-        file_bytes = pdf_file.read()
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        if PDF_EXTRACTION_WORKERS > 1:
+            page_count, _ = read_pdf_pages(engine, pdf_file, page_numbers=[])
+            check_pdf_page_count(page_count)
+        else:
+            page_count = 0
+        
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            # Split the pages into one contiguous range per worker process
+            pdf_file.seek(0)
+            pdf_bytes = pdf_file.read()
+            pages_per_worker = -(-page_count // PDF_EXTRACTION_WORKERS)
+            futures = [get_pdf_pool().submit(extract_pdf_page_range, engine, pdf_bytes, start,
+                                             min(start + pages_per_worker, page_count))
+                       for start in range(0, page_count, pages_per_worker)]
+            texts = [text for future in futures for text in future.result()]
+        else:
+            # Typical resumes are a page or two, which is quicker to read in-process
+            pdf_file.seek(0)
+            _, texts = read_pdf_pages(engine, pdf_file)
+        
+        # Join once instead of concatenating page by page
+        return ''.join(texts)
+    except PdfLimitError:
+        raise
     except Exception as e:
         logging.error(f"Error extracting PDF text: {str(e)}")
         raise Exception("Could not extract text from the PDF. Please ensure it's a valid PDF file.")
 
-def analyze_resume_comprehensively(resume_text, job_description):
-    """Comprehensive resume analysis using multiple NLP techniques"""
-    # Process texts with spaCy for better entity recognition
-    resume_doc = nlp(resume_text)
-    job_doc = nlp(job_description)
+def analyze_resume_comprehensively(resume_text, job_description, job_profile=None, resume_entities=None, timings=None,
+                                   semantic_similarity=None):
+    """Comprehensive resume analysis using multiple NLP techniques.
+    
+    Every derived fact is computed exactly once. Pass a dict as timings to
+    get the time spent in each stage, in milliseconds.
+    """
+    # Batch analysis passes the job profile and resume entities in precomputed
+    if job_profile is None:
+        with timed_stage(timings, 'job_profile'):
+            job_profile = build_job_profile(job_description)
     
     # 1. Extract skills, experience, education and other entities
-    resume_entities = extract_entities(resume_doc)
-    job_entities = extract_entities(job_doc)
+    # Process the resume with spaCy for better entity recognition. The job
+    # description is not parsed: no output field depends on its entities.
+    if resume_entities is None:
+        with timed_stage(timings, 'entities'):
+            resume_entities = extract_entities(get_nlp()(resume_text))
+    
+    # Structured resume: sections, bullets, date ranges, skills and education
+    with timed_stage(timings, 'resume_ir'):
+        resume_ir = build_resume_ir(resume_text)
+    
+    # Lowercased text and keyword hits shared by the stages below
+    with timed_stage(timings, 'resume_context'):
+        resume_context = build_resume_context(resume_text)
     
     # 2. Extract technical skills and domain-specific keywords
-    job_keywords = extract_keywords_by_domain(job_description)
+    job_keywords = job_profile['keywords']
     
     # 3. Find matched and missing keywords with context awareness
-    matched_keywords, missing_keywords = find_keyword_matches(resume_text.lower(), job_keywords)
+    with timed_stage(timings, 'keyword_matching'):
+        matched_keywords, missing_keywords = find_keyword_matches(
+            resume_context['text_lower'], job_keywords, resume_context['keyword_bits'])
     
     # 4. Calculate overall match score
-    match_score = calculate_match_score(matched_keywords, missing_keywords)
-    
-    # 5. Extract experience level requirements
-    experience_requirements = extract_experience_requirements(job_description)
-    
-    # 6. Extract education requirements
-    education_requirements = extract_education_requirements(job_description)
-    
-    # 7. Generate personalized suggestions
-    suggestions = generate_personalized_suggestions(
-        matched_keywords, 
-        missing_keywords, 
-        resume_text, 
-        job_description,
-        resume_entities,
-        job_entities,
-        experience_requirements,
-        education_requirements
-    )
-    
-    # 8. Extract key sections that might be missing in the resume
-    missing_sections = identify_missing_sections(resume_text)
+    with timed_stage(timings, 'match_score'):
+        match_score = calculate_match_score(matched_keywords, missing_keywords)
+    
+    # Blend in the TF-IDF similarity, if enabled (batch analysis passes it in)
+    if SIMILARITY_WEIGHT > 0:
+        if semantic_similarity is None:
+            with timed_stage(timings, 'similarity'):
+                semantic_similarity = similarity_scores(job_description, [resume_text])[0]
+        match_score = blend_match_score(match_score, semantic_similarity)
+    
+    # 5. Check experience level requirements
+    experience_requirements = job_profile['experience_requirements']
+    with timed_stage(timings, 'experience_match'):
+        experience_match = check_experience_match(resume_ir, experience_requirements)
+    
+    # 6. Check education requirements
+    education_requirements = job_profile['education_requirements']
+    with timed_stage(timings, 'education_match'):
+        # Lines of the education section, or spaCy's education sentences when the resume has no such section
+        education_entries = resume_ir['education'] or resume_entities.get('education', [])
+        education_match = check_education_match(education_entries, education_requirements)
+    
+    # 7. Extract key sections that might be missing in the resume
+    with timed_stage(timings, 'missing_sections'):
+        missing_sections = identify_missing_sections(resume_text, resume_ir['sections'])
+    
+    # 8. Generate personalized suggestions from the facts above
+    with timed_stage(timings, 'suggestions'):
+        suggestions = generate_personalized_suggestions(
+            matched_keywords,
+            missing_keywords,
+            resume_context,
+            experience_requirements,
+            education_requirements,
+            experience_match,
+            education_match,
+            missing_sections
+        )
     
-    return {
+    analysis_result = {
         'matched_keywords': matched_keywords,
         'missing_keywords': missing_keywords,
         'match_score': match_score,
         'suggestions': suggestions,
         'missing_sections': missing_sections,
-        'experience_match': check_experience_match(resume_text, experience_requirements),
-        'education_match': check_education_match(resume_entities.get('education', []), education_requirements)
+        'experience_match': experience_match,
+        'education_match': education_match
+    }
+    if semantic_similarity is not None:
+        analysis_result['semantic_similarity'] = round(semantic_similarity, 4)
+    
+    return analysis_result
+
+@contextmanager
+def timed_stage(timings, stage):
+    """Add the time spent in the block to timings[stage] (in ms), if timings is a dict"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + (time.perf_counter() - start) * 1000
+
+def log_stage_timings(timings):
+    """Log stage timings as a structured trace that Application Insights can chart as custom metrics"""
+    logging.info("ResumeAnalysisStageTimings %s",
+                 json.dumps({stage: round(elapsed_ms, 3) for stage, elapsed_ms in timings.items()}))
+
+def build_resume_context(resume_text):
+    """Facts about the resume text shared by every analysis stage"""
+    text_lower = resume_text.lower()
+    # One pass over the resume covers every indexed keyword and synonym
+    _, word_hits = scan_keywords(text_lower)
+    return {
+        'text': resume_text,
+        'text_lower': text_lower,
+        'keyword_bits': resume_keyword_bits(word_hits)
+    }
+
+def analyze_resumes_batch(resume_texts, job_description, job_profile=None):
+    """Analyze many resumes against one job description, computing the job side once.
+    
+    Results are yielded in input order as soon as each resume is done.
+    """
+    if job_profile is None:
+        job_profile = build_job_profile(job_description)
+    
+    # Similarity of every resume to the job description in one sparse matrix product
+    if SIMILARITY_WEIGHT > 0:
+        similarities = similarity_scores(job_description, resume_texts)
+    else:
+        similarities = [None] * len(resume_texts)
+    
+    docs = pipe_documents(resume_texts)
+    for resume_text, semantic_similarity in zip(resume_texts, similarities):
+        timings = {}
+        with timed_stage(timings, 'entities'):
+            resume_entities = extract_entities(next(docs))
+        analysis_result = analyze_resume_comprehensively(resume_text, job_description, job_profile, resume_entities, timings,
+                                                         semantic_similarity)
+        log_stage_timings(timings)
+        yield analysis_result
+
+def pipe_documents(texts):
+    """Run texts through spaCy in batches, using several processes for large batches"""
+    # Starting worker processes only pays off once there are a few batches to share
+    n_process = SPACY_N_PROCESS if len(texts) >= SPACY_BATCH_SIZE * 2 else 1
+    return get_nlp().pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=n_process)
+
+def rank_analysis_results(results):
+    """Order results by match score, best first, and number them"""
+    ranked = sorted(results, key=lambda result: result['match_score'], reverse=True)
+    for rank, result in enumerate(ranked, start=1):
+        result['rank'] = rank
+    return ranked
+
+def build_job_profile(job_description):
+    """Everything derived from the job description alone"""
+    return {
+        'keywords': extract_keywords_by_domain(job_description),
+        'domain_scores': count_domain_keywords(scan_keywords(job_description.lower())[0]),
+        'experience_requirements': extract_experience_requirements(job_description),
+        'education_requirements': extract_education_requirements(job_description)
     }
 
 def extract_entities(doc):
@@ -156,7 +593,9 @@ def extract_entities(doc):
     # Extract entities from the document
     for ent in doc.ents:
         if ent.label_ == "ORG":
-            entities['companies'].append(ent.text)
+            # A section header at the start of a text often passes for an organisation
+            if classify_section_header(ent.text.lower()) is None:
+                entities['companies'].append(ent.text)
         elif ent.label_ == "PRODUCT" or ent.label_ == "WORK_OF_ART":
             # These often contain technical skills or tools
             if len(ent.text) > 3 and ent.text.lower() not in [s.lower() for s in entities['skills']]:
@@ -169,11 +608,12 @@ def extract_entities(doc):
     for sent in edu_sentences:
         entities['education'].append(sent.text.strip())
     
-    # Look for job titles
+    # Look for job titles (noun chunks need the parser, which senter mode skips)
     job_title_patterns = ["engineer", "developer", "manager", "director", "specialist", "analyst", "consultant", "designer"]
-    for chunk in doc.noun_chunks:
-        if any(title in chunk.text.lower() for title in job_title_patterns) and len(chunk.text) < 50:
-            entities['job_titles'].append(chunk.text.strip())
+    if doc.has_annotation("DEP"):
+        for chunk in doc.noun_chunks:
+            if any(title in chunk.text.lower() for title in job_title_patterns) and len(chunk.text) < 50:
+                entities['job_titles'].append(chunk.text.strip())
     
     # Deduplicate lists
     for key in entities:
@@ -181,101 +621,240 @@ def extract_entities(doc):
     
     return entities
 
+# Keyword tables are module-level so they are built once per process rather
+# than on every request. The skills taxonomy itself (domain keyword lists,
+# common skills, synonyms, aliases and education terms) is data in TAXONOMY_PATH
+def load_taxonomy(path):
+    """The taxonomy file's tables"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+TAXONOMY = load_taxonomy(TAXONOMY_PATH)
+DOMAIN_KEYWORDS = TAXONOMY['domains']
+COMMON_SKILLS = TAXONOMY['common_skills']
+SYNONYMS = TAXONOMY['synonyms']
+
+# Other spellings of a keyword ("k8s" for kubernetes), as alias -> keyword. A
+# text mentioning an alias is treated exactly as if it mentioned the keyword
+ALIASES = {alias.lower(): keyword.lower()
+           for keyword, keyword_aliases in TAXONOMY.get('aliases', {}).items() for alias in keyword_aliases}
+
+# Education levels from highest to lowest, with the terms job descriptions
+# and resumes use for each
+EDUCATION_LEVELS = TAXONOMY['education']['levels']
+EDUCATION_JOB_TERMS = TAXONOMY['education']['job_terms']
+EDUCATION_RESUME_TERMS = TAXONOMY['education']['resume_terms']
+
+JOB_EXPERIENCE_PATTERN = re.compile(r'(\d+)\s*(?:\+\s*)?years?\s+(?:of\s+)?experience')
+JOB_EDUCATION_PATTERNS = [re.compile(pattern) for pattern in TAXONOMY['education']['requirement_patterns']]
+
+class EducationClassifier:
+    """The highest education level a text mentions, found with one pattern over every level's terms"""
+    
+    def __init__(self, levels, level_terms):
+        # Levels are listed highest first, so a lower rank is a higher level
+        self.levels = levels
+        self._term_ranks = {}
+        for rank, level in enumerate(levels):
+            for term in level_terms[level]:
+                self._term_ranks.setdefault(term.lower(), rank)
+        # Whole terms, plural or possessive too ("bachelors", "master's"); longest
+        # first, so "high school diploma" wins over "diploma" where both match
+        terms = sorted(self._term_ranks, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + '|'.join(re.escape(term) for term in terms) + r")(?:'?s)?\b")
+    
+    def classify(self, text):
+        """(level, span) of the first mention of the highest level in lowercase text, or None if it mentions none"""
+        best_rank, best_span = len(self.levels), None
+        for match in self._pattern.finditer(text):
+            rank = self._term_ranks[match.group(1)]
+            if rank < best_rank:
+                best_rank, best_span = rank, match.span()
+                if rank == 0:
+                    break
+        if best_span is None:
+            return None
+        return self.levels[best_rank], best_span
+
+EDUCATION_JOB_CLASSIFIER = EducationClassifier(EDUCATION_LEVELS, EDUCATION_JOB_TERMS)
+EDUCATION_RESUME_CLASSIFIER = EducationClassifier(EDUCATION_LEVELS, EDUCATION_RESUME_TERMS)
+
+# Marks the end of a keyword in the trie (never a valid character key)
+TRIE_END = None
+
+def build_keyword_trie(keywords):
+    """Build a character trie where each keyword's last node maps TRIE_END to the keyword"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[TRIE_END] = keyword
+    return trie
+
+def trie_to_regex(node):
+    """Turn a keyword trie into a regex that matches wherever any keyword starts"""
+    if TRIE_END in node:
+        # The shortest keyword on this path is enough to mark a start position
+        return ''
+    branches = [re.escape(char) + trie_to_regex(child) for char, child in sorted(node.items())]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+def is_word_boundary(text, index):
+    """Same semantics as the regex \\b assertion at position index of text"""
+    before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == '_')
+    after = index < len(text) and (text[index].isalnum() or text[index] == '_')
+    return before != after
+
+def scan_keywords(text):
+    """Find every indexed keyword in text with a single pass.
+
+    Returns (substring_hits, word_hits): keywords occurring anywhere in the
+    text, and keywords occurring as whole words (what r'\\b' + keyword + r'\\b'
+    would match). The lookahead pattern jumps straight to positions where some
+    keyword starts and the trie walk then yields every keyword starting there.
+    An alias counts as its keyword, but only as a whole word.
+    """
+    substring_hits = set()
+    word_hits = set()
+    text_length = len(text)
+    for match in KEYWORD_START_PATTERN.finditer(text):
+        start = match.start()
+        start_is_boundary = is_word_boundary(text, start)
+        node = KEYWORD_TRIE
+        position = start
+        while position < text_length and text[position] in node:
+            node = node[text[position]]
+            position += 1
+            if TRIE_END in node:
+                keyword = node[TRIE_END]
+                if start_is_boundary and is_word_boundary(text, position):
+                    keyword = ALIASES.get(keyword, keyword)
+                    substring_hits.add(keyword)
+                    word_hits.add(keyword)
+                elif keyword not in ALIASES:
+                    substring_hits.add(keyword)
+    return substring_hits, word_hits
+
+# Every keyword we ever look for: domain keywords, common skills and synonyms
+INDEXED_KEYWORDS = set(COMMON_SKILLS)
+for domain_keywords in DOMAIN_KEYWORDS.values():
+    INDEXED_KEYWORDS.update(domain_keywords)
+for keyword, keyword_synonyms in SYNONYMS.items():
+    INDEXED_KEYWORDS.add(keyword.lower())
+    INDEXED_KEYWORDS.update(synonym.lower() for synonym in keyword_synonyms)
+
+# Aliases go into the trie too, so they are found in the same pass
+KEYWORD_TRIE = build_keyword_trie(INDEXED_KEYWORDS | set(ALIASES))
+KEYWORD_START_PATTERN = re.compile('(?=' + trie_to_regex(KEYWORD_TRIE) + ')')
+
+# Keyword ids are positions in the sorted keyword list. OTHER_KEYWORD_ID
+# stands for job keywords outside the index, i.e. the experience ("5+ years
+# experience") and degree requirements extract_keywords_by_domain adds
+KEYWORD_VOCABULARY = sorted(INDEXED_KEYWORDS)
+KEYWORD_IDS = {keyword: keyword_id for keyword_id, keyword in enumerate(KEYWORD_VOCABULARY)}
+OTHER_KEYWORD_ID = len(KEYWORD_VOCABULARY)
+
+# A set of keywords is a bitset: an int with bit i set for keyword id i, so
+# intersections and differences of keyword sets are single bitwise operations
+def keyword_bits(keywords):
+    """Bitset of the indexed keywords among keywords"""
+    bits = 0
+    for keyword in keywords:
+        keyword_id = KEYWORD_IDS.get(keyword)
+        if keyword_id is not None:
+            bits |= 1 << keyword_id
+    return bits
+
+def bits_to_keywords(bits):
+    """The keywords of a bitset, in id order"""
+    keywords = []
+    while bits:
+        lowest_bit = bits & -bits
+        keywords.append(KEYWORD_VOCABULARY[lowest_bit.bit_length() - 1])
+        bits ^= lowest_bit
+    return keywords
+
+# Each keyword with synonyms, as (keyword id, bitset of its synonyms)
+SYNONYM_BITS = [(KEYWORD_IDS[keyword.lower()], keyword_bits(synonym.lower() for synonym in synonyms))
+                for keyword, synonyms in SYNONYMS.items()]
+
+def resume_keyword_bits(word_hits):
+    """Bitset of the keywords a resume counts as having: whole word hits, plus keywords one of whose synonyms is hit"""
+    bits = keyword_bits(word_hits)
+    for keyword_id, synonym_bits in SYNONYM_BITS:
+        if bits & synonym_bits:
+            bits |= 1 << keyword_id
+    return bits
+
+# Soft skills (and synonyms) count half as much as technical keywords, and a
+# technical keyword listed by n domains is discounted to 1 / (1 + 0.25 * (n - 1))
+SOFT_SKILL_WEIGHT = 0.5
+SHARED_KEYWORD_DISCOUNT = 0.25
+REQUIREMENT_WEIGHT = 1.0
+
+# The weight table is loaded once per worker by get_keyword_weights()
+keyword_weights = None
+_keyword_weights_lock = threading.Lock()
+
+def compute_keyword_weights():
+    """Weight of every keyword id from the keyword lists alone"""
+    import numpy as np
+
+    domain_counts = np.zeros(OTHER_KEYWORD_ID + 1)
+    for keywords in DOMAIN_KEYWORDS.values():
+        domain_counts[[KEYWORD_IDS[keyword] for keyword in set(keywords)]] += 1
+
+    weights = np.full(OTHER_KEYWORD_ID + 1, SOFT_SKILL_WEIGHT)
+    technical = domain_counts > 0
+    weights[technical] = 1 / (1 + SHARED_KEYWORD_DISCOUNT * (domain_counts[technical] - 1))
+    weights[OTHER_KEYWORD_ID] = REQUIREMENT_WEIGHT
+    return weights.astype(np.float32)
+
+def load_keyword_weights(path):
+    """The weight table written by backend/fit_keyword_weights.py, or the default one if there is no such file"""
+    import numpy as np
+
+    weights = compute_keyword_weights()
+    if os.path.exists(path):
+        with np.load(path) as table:
+            vocabulary = table['vocabulary'].tolist()
+            stored_weights = table['weights']
+        # Keywords added since the table was built keep their default weight
+        for keyword, weight in zip(vocabulary, stored_weights[:-1]):
+            if keyword in KEYWORD_IDS:
+                weights[KEYWORD_IDS[keyword]] = weight
+        weights[OTHER_KEYWORD_ID] = stored_weights[-1]
+    return weights
+
+def get_keyword_weights():
+    """Return the worker-wide keyword weight table, loading it on first use"""
+    global keyword_weights
+    if keyword_weights is None:
+        with _keyword_weights_lock:
+            if keyword_weights is None:
+                keyword_weights = load_keyword_weights(KEYWORD_WEIGHTS_PATH)
+    return keyword_weights
+
+def keyword_ids(keywords):
+    """Ids of job keywords, with OTHER_KEYWORD_ID for anything outside the index"""
+    return [KEYWORD_IDS.get(keyword, OTHER_KEYWORD_ID) for keyword in keywords]
+
 def extract_keywords_by_domain(text):
     """Extract relevant keywords by domain from text"""
-    # Define domains and their associated keywords
-    domains = {
-        'software_development': [
-            "python", "javascript", "java", "c++", "c#", "ruby", "php", "swift", "kotlin", "typescript", 
-            "react", "angular", "vue", "node", "django", "flask", "spring", "express", "laravel", 
-            "html", "css", "sass", "less", "bootstrap", "tailwind", "material-ui", "responsive design",
-            "restful api", "graphql", "soap", "microservices", "monolith", "serverless", 
-            "git", "svn", "github", "gitlab", "bitbucket", "ci/cd", "jenkins", "travis", "circle ci",
-            "agile", "scrum", "kanban", "waterfall", "jira", "confluence", "trello", "asana",
-            "oop", "functional programming", "design patterns", "solid principles", "mvc", "mvvm",
-            "tdd", "bdd", "unit testing", "integration testing", "end-to-end testing", "jest", "pytest", "junit",
-            "debugging", "refactoring", "code review", "pair programming", "technical documentation"
-        ],
-        'data_science': [
-            "python", "r", "sql", "tableau", "power bi", "excel", "pandas", "numpy", "scipy", "matplotlib", 
-            "seaborn", "scikit-learn", "tensorflow", "keras", "pytorch", "machine learning", "deep learning", 
-            "neural networks", "nlp", "computer vision", "time series analysis", "regression", "classification", 
-            "clustering", "dimensionality reduction", "feature engineering", "data cleaning", "data visualization", 
-            "statistics", "probability", "hypothesis testing", "a/b testing", "etl", "big data", "hadoop", 
-            "spark", "kafka", "airflow", "data warehouse", "data lake", "data mining", "predictive modeling",
-            "forecasting", "anomaly detection", "recommendation systems", "reinforcement learning"
-        ],
-        'marketing': [
-            "digital marketing", "content marketing", "seo", "sem", "ppc", "google ads", "facebook ads", 
-            "social media marketing", "email marketing", "affiliate marketing", "influencer marketing", 
-            "brand management", "market research", "customer segmentation", "customer journey", "sales funnel", 
-            "conversion rate optimization", "analytics", "google analytics", "facebook pixel", "utm parameters", 
-            "a/b testing", "copywriting", "content strategy", "editorial calendar", "blogging", "lead generation", 
-            "marketing automation", "hubspot", "mailchimp", "constant contact", "marketo", "hootsuite", "buffer", 
-            "canva", "adobe creative suite", "video marketing", "podcast marketing", "public relations"
-        ],
-        'finance': [
-            "accounting", "bookkeeping", "financial analysis", "financial modeling", "financial reporting", 
-            "budgeting", "forecasting", "variance analysis", "cost accounting", "tax preparation", "audit", 
-            "compliance", "risk management", "financial statements", "balance sheet", "income statement", 
-            "cash flow statement", "ratio analysis", "liquidity", "solvency", "profitability", "quickbooks", 
-            "xero", "sage", "sap", "oracle financials", "microsoft dynamics", "excel", "pivot tables", 
-            "vlookup", "macros", "investment analysis", "portfolio management", "equity valuation", 
-            "discounted cash flow", "capital budgeting", "wacc", "banking", "lending", "underwriting"
-        ],
-        'healthcare': [
-            "patient care", "clinical experience", "medical terminology", "electronic health records", "ehr", 
-            "epic", "cerner", "meditech", "allscripts", "icd-10", "cpt coding", "hipaa", "patient safety", 
-            "quality improvement", "care coordination", "case management", "discharge planning", "medication administration", 
-            "vital signs", "assessment", "treatment planning", "patient education", "infection control", 
-            "sterilization", "medical equipment", "diagnostic procedures", "therapeutic procedures", "rehabilitation", 
-            "acute care", "primary care", "specialty care", "emergency care", "telehealth", "medical research", 
-            "clinical trials", "healthcare compliance", "healthcare policy", "healthcare administration", "billing", "coding"
-        ],
-        'education': [
-            "curriculum development", "lesson planning", "classroom management", "student assessment", 
-            "differentiated instruction", "special education", "individualized education plan", "iep", 
-            "learning management system", "lms", "canvas", "blackboard", "google classroom", "educational technology", 
-            "e-learning", "blended learning", "remote teaching", "formative assessment", "summative assessment", 
-            "rubrics", "student engagement", "behavior management", "parent communication", "student advising", 
-            "educational psychology", "child development", "adolescent development", "group facilitation", 
-            "project-based learning", "inquiry-based learning", "cooperative learning", "bloom's taxonomy", 
-            "universal design for learning", "udl", "common core standards", "state standards", "accreditation"
-        ],
-        'project_management': [
-            "project planning", "project scheduling", "project execution", "project monitoring", "project closing", 
-            "scope management", "time management", "cost management", "quality management", "resource management", 
-            "risk management", "communication management", "stakeholder management", "procurement management", 
-            "pmp", "prince2", "agile", "scrum", "kanban", "waterfall", "hybrid", "ms project", "primavera", 
-            "jira", "asana", "trello", "basecamp", "gantt charts", "pert charts", "wbs", "critical path method", 
-            "earned value management", "kpis", "project governance", "project documentation", "status reporting", 
-            "issue resolution", "change management", "benefits realization", "lessons learned", "project portfolio management"
-        ],
-        'customer_service': [
-            "customer support", "client relations", "call center", "help desk", "technical support", 
-            "customer retention", "customer satisfaction", "customer experience", "complaint resolution", 
-            "conflict resolution", "de-escalation", "active listening", "empathy", "patience", "communication skills", 
-            "problem-solving", "product knowledge", "service recovery", "crm", "salesforce", "zendesk", 
-            "freshdesk", "live chat", "ticketing system", "phone etiquette", "email communication", 
-            "social media support", "customer feedback", "customer surveys", "nps", "csat", "first call resolution", 
-            "average handle time", "quality assurance", "service level agreements", "sla", "customer onboarding"
-        ],
-    }
-    
     # Process the text
     processed_text = text.lower()
     
+    # Find all indexed keywords in one pass over the text
+    substring_hits, word_hits = scan_keywords(processed_text)
+    
     # Find all domain-specific keywords in the text
     found_keywords = []
     
     # First, try to detect which domain the job is most related to
-    domain_counts = {}
-    for domain, keywords in domains.items():
-        count = 0
-        for keyword in keywords:
-            if keyword in processed_text:
-                count += 1
-        domain_counts[domain] = count
+    domain_counts = count_domain_keywords(substring_hits)
     
     # Sort domains by relevance
     sorted_domains = sorted(domain_counts.items(), key=lambda x: x[1], reverse=True)
@@ -284,100 +863,92 @@ def extract_keywords_by_domain(text):
     primary_domains = [domain for domain, count in sorted_domains[:3] if count > 0]
     
     for domain in primary_domains:
-        for keyword in domains[domain]:
-            # Use regex to find whole word matches only
-            if re.search(r'\b' + re.escape(keyword) + r'\b', processed_text):
+        for keyword in DOMAIN_KEYWORDS[domain]:
+            # Whole word matches only
+            if keyword in word_hits:
                 found_keywords.append(keyword)
     
     # Add common skills across all fields
-    common_skills = [
-        "leadership", "teamwork", "communication", "written communication", "verbal communication",
-        "presentation skills", "public speaking", "interpersonal skills", "problem solving",
-        "critical thinking", "analytical skills", "detail oriented", "organization",
-        "time management", "multitasking", "prioritization", "decision making",
-        "adaptability", "flexibility", "creativity", "innovation"
-    ]
-    
-    for skill in common_skills:
-        if re.search(r'\b' + re.escape(skill) + r'\b', processed_text):
+    for skill in COMMON_SKILLS:
+        if skill in word_hits:
             found_keywords.append(skill)
     
     # Extract experience requirements (e.g., "5+ years")
-    experience_matches = re.findall(r'(\d+)\s*(?:\+\s*)?years?\s+(?:of\s+)?experience', processed_text)
+    experience_matches = JOB_EXPERIENCE_PATTERN.findall(processed_text)
     if experience_matches:
         years = max([int(y) for y in experience_matches])
         found_keywords.append(f"{years}+ years experience")
     
     # Extract education requirements
-    education_patterns = [
-        r"bachelor'?s degree", r"master'?s degree", r"phd", r"doctoral degree", 
-        r"high school diploma", r"associate'?s degree", r"certificate"
-    ]
-    
-    for pattern in education_patterns:
-        if re.search(pattern, processed_text):
-            match = re.search(pattern, processed_text).group(0)
-            found_keywords.append(match)
+    for pattern in JOB_EDUCATION_PATTERNS:
+        match = pattern.search(processed_text)
+        if match:
+            found_keywords.append(match.group(0))
     
-    # Remove duplicates
-    found_keywords = list(set(found_keywords))
+    # Remove duplicates (a keyword listed by several domains), keeping the order found
+    found_keywords = list(dict.fromkeys(found_keywords))
     
     return found_keywords
 
-def find_keyword_matches(resume_text, job_keywords):
+def count_domain_keywords(substring_hits):
+    """How many of each domain's keywords appear in the text"""
+    return {domain: sum(1 for keyword in keywords if keyword in substring_hits)
+            for domain, keywords in DOMAIN_KEYWORDS.items()}
+
+def find_keyword_matches(resume_text, job_keywords, resume_bits=None):
     """Find matched and missing keywords with context awareness"""
     matched = []
     missing = []
     
+    # One pass over the resume covers every indexed keyword and synonym
+    if resume_bits is None:
+        _, word_hits = scan_keywords(resume_text)
+        resume_bits = resume_keyword_bits(word_hits)
+    
+    # Indexed keywords are matched with one bitwise AND
+    matched_bits = keyword_bits(job_keywords) & resume_bits
+    
     for keyword in job_keywords:
-        # Use regex for more accurate matching (whole word match)
-        if re.search(r'\b' + re.escape(keyword.lower()) + r'\b', resume_text):
+        keyword_id = KEYWORD_IDS.get(keyword)
+        if keyword_id is not None:
+            found = matched_bits >> keyword_id & 1
+        else:
+            # Keywords outside the index (e.g. "5+ years experience") use a direct whole word match
+            found = re.search(r'\b' + re.escape(keyword.lower()) + r'\b', resume_text) is not None
+        
+        if found:
             matched.append(keyword)
         else:
-            # Check for potential synonyms or related terms
-            if is_synonym_present(keyword, resume_text):
-                matched.append(keyword)
-            else:
-                missing.append(keyword)
+            missing.append(keyword)
     
     return matched, missing
 
-def is_synonym_present(keyword, text):
-    """Check if a synonym of the keyword is present in the text"""
-    # Dictionary of common synonyms in professional contexts
-    synonyms = {
-        "develop": ["code", "program", "engineer", "implement", "build"],
-        "analyze": ["examine", "investigate", "assess", "evaluate", "review"],
-        "manage": ["oversee", "supervise", "direct", "lead", "coordinate"],
-        "communication": ["interpersonal", "articulate", "verbal", "present", "write"],
-        "problem solving": ["troubleshoot", "debug", "resolve", "solution"],
-        "leadership": ["guide", "direct", "mentor", "influence"],
-        "teamwork": ["collaboration", "cooperative", "cross-functional"],
-        # Add more as needed
-    }
-    
-    # Check if keyword is in our synonym dictionary
-    if keyword.lower() in synonyms:
-        for synonym in synonyms[keyword.lower()]:
-            if re.search(r'\b' + re.escape(synonym.lower()) + r'\b', text):
-                return True
-    
-    return False
+def similarity_scores(job_description, resume_texts):
+    """Cosine similarity of each resume to the job description under the TF-IDF model"""
+    vectorizer = get_tfidf_model()['vectorizer']
+    # Rows are L2-normalised, so one sparse matrix product gives every cosine similarity
+    resume_matrix = vectorizer.transform(resume_texts)
+    job_vector = vectorizer.transform([job_description])
+    return (resume_matrix @ job_vector.T).toarray().ravel().tolist()
+
+def blend_match_score(keyword_score, semantic_similarity):
+    """Weighted mix of the keyword match score and the TF-IDF similarity (0-1), on the same 0-100 scale"""
+    return round((1 - SIMILARITY_WEIGHT) * keyword_score + SIMILARITY_WEIGHT * semantic_similarity * 100)
 
 def calculate_match_score(matched_keywords, missing_keywords):
-    """Calculate overall match score based on matched and missing keywords"""
+    """Calculate overall match score: the share of the job's keyword weight the resume matches"""
     total_keywords = len(matched_keywords) + len(missing_keywords)
     if total_keywords == 0:
         return 0
     
-    # Base score from percentage of matched keywords
-    base_score = (len(matched_keywords) / total_keywords) * 100
+    if MATCH_SCORING != "weighted":
+        return round((len(matched_keywords) / total_keywords) * 100)
     
-    # Weight some keywords higher than others (e.g., technical skills might be more important)
-    # This is a simplified implementation - a real system would have a more nuanced approach
-    weighted_score = base_score
+    # A single array lookup for all the keywords, so weighting costs microseconds
+    weights = get_keyword_weights()[keyword_ids(matched_keywords + missing_keywords)]
+    matched_weight = weights[:len(matched_keywords)].sum()
     
-    return round(weighted_score)
+    return round(float(matched_weight / weights.sum()) * 100)
 
 def extract_experience_requirements(job_description):
     """Extract experience requirements from job description"""
@@ -395,8 +966,10 @@ def extract_experience_requirements(job_description):
         r'at\s+least\s+(\d+)[\+]?\s+years?\s+(?:of\s+)?experience'
     ]
     
+    job_description_lower = job_description.lower()
+    
     for pattern in experience_patterns:
-        matches = re.findall(pattern, job_description.lower())
+        matches = re.findall(pattern, job_description_lower)
         if matches:
             # Convert all matches to integers and find the maximum
             years = max([int(y) for y in matches])
@@ -407,6 +980,8 @@ def extract_experience_requirements(job_description):
     
     return experience_info
 
+SENTENCE_END_PATTERN = re.compile(r'[.!?]')
+
 def extract_education_requirements(job_description):
     """Extract education requirements from job description"""
     education_info = {
@@ -415,40 +990,61 @@ def extract_education_requirements(job_description):
         'description': ''
     }
     
-    # Define education levels from highest to lowest
-    education_levels = {
-        'phd': ['phd', 'doctorate', 'doctoral degree'],
-        'masters': ['master', 'ms', 'ma', 'msc', 'mba', 'master\'s'],
-        'bachelors': ['bachelor', 'bs', 'ba', 'bsc', 'bachelor\'s', 'undergraduate degree'],
-        'associates': ['associate', 'as', 'aa', 'associate\'s', 'associate degree'],
-        'certificate': ['certificate', 'certification', 'diploma'],
-        'high school': ['high school', 'hs', 'high school diploma', 'ged']
-    }
-    
-    job_description_lower = job_description.lower()
-    
     # Find the highest level of education mentioned
-    for level, terms in education_levels.items():
-        for term in terms:
-            if re.search(r'\b' + re.escape(term) + r'\b', job_description_lower):
-                education_info['level'] = level
-                education_info['has_requirement'] = True
-                
-                # Extract the full context
-                pattern = r'[^.!?]*\b' + re.escape(term) + r'\b[^.!?]*[.!?]'
-                context_matches = re.findall(pattern, job_description_lower)
-                
-                if context_matches:
-                    education_info['description'] = context_matches[0].strip()
-                else:
-                    education_info['description'] = f"{level.capitalize()} degree required"
-                
-                # Return after finding the highest level
-                return education_info
+    job_description_lower = job_description.lower()
+    education = EDUCATION_JOB_CLASSIFIER.classify(job_description_lower)
+    if education is None:
+        return education_info
+    
+    level, (start, end) = education
+    education_info['level'] = level
+    education_info['has_requirement'] = True
+    
+    # The full sentence the level is mentioned in, when it has an end
+    sentence_end = SENTENCE_END_PATTERN.search(job_description_lower, end)
+    if sentence_end:
+        sentence_start = max(job_description_lower.rfind(mark, 0, start) for mark in '.!?') + 1
+        education_info['description'] = job_description_lower[sentence_start:sentence_end.end()].strip()
+    else:
+        education_info['description'] = f"{level.capitalize()} degree required"
     
     return education_info
 
-def check_experience_match(resume_text, experience_requirements):
+def date_range_months(date_range, current_month):
+    """A date range as [start, end) in months since year 0, or None if it isn't a plausible range"""
+    start_year, start_month = date_range['start']
+    start = start_year * 12 + (start_month or 1) - 1
+    if date_range['end'] is None:
+        # Running to the present includes this month
+        end = current_month + 1
+    else:
+        end_year, end_month = date_range['end']
+        # "Jan 2016 - Mar 2016" includes March; "2016 - 2018" is two years, as the years alone say
+        end = end_year * 12 + end_month if end_month else end_year * 12
+    if start_year < EARLIEST_YEAR or start >= end or end > current_month + 1:
+        return None
+    return start, end
+
+def experience_timeline(date_ranges, today=None):
+    """Total and longest continuous experience, in months, over date ranges that may overlap"""
+    today = today or datetime.date.today()
+    current_month = today.year * 12 + today.month - 1
+    intervals = sorted(filter(None, (date_range_months(date_range, current_month) for date_range in date_ranges)))
+    
+    # Merge overlapping and back-to-back ranges, so concurrent roles count once
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    
+    return {
+        'total_months': sum(end - start for start, end in merged),
+        'longest_months': max((end - start for start, end in merged), default=0)
+    }
+
+def check_experience_match(resume_ir, experience_requirements):
     """Check if resume appears to meet experience requirements"""
     if not experience_requirements['has_requirement']:
         return {
@@ -459,70 +1055,40 @@ def check_experience_match(resume_text, experience_requirements):
     
     required_years = experience_requirements['years']
     
-    # Look for experience mentions in resume
-    experience_patterns = [
-        r'(\d+)[\+]?\s+years?\s+(?:of\s+)?experience',
-        r'(\d{4})\s*[-–]\s*(?:present|current|now|\d{4})',  # Date ranges like 2018-present
-        r'(\d{4})\s*[-–]\s*(\d{4})'  # Date ranges like 2018-2022
-    ]
-    
-    years_mentioned = []
-    date_ranges = []
+    # Date ranges from the experience section, or from anywhere in a resume
+    # without an experience header (so study years don't count as experience)
+    date_ranges = resume_ir['date_ranges']
+    if 'experience' in resume_ir['sections']['spans']:
+        date_ranges = [date_range for date_range in date_ranges if date_range['section'] == 'experience']
+    timeline = experience_timeline(date_ranges)
+    total_years = round(timeline['total_months'] / 12, 1)
+    longest_years = round(timeline['longest_months'] / 12, 1)
     
-    for pattern in experience_patterns:
-        if pattern.endswith('experience'):
-            # Direct mentions of years of experience
-            matches = re.findall(pattern, resume_text.lower())
-            if matches:
-                years_mentioned.extend([int(y) for y in matches])
-        else:
-            # Date ranges
-            matches = re.findall(pattern, resume_text)
-            if matches:
-                for match in matches:
-                    if isinstance(match, tuple):
-                        if len(match) == 2 and match[1].lower() in ['present', 'current', 'now']:
-                            # Calculate years from start year to current year
-                            import datetime
-                            current_year = datetime.datetime.now().year
-                            start_year = int(match[0])
-                            if start_year <= current_year:
-                                years = current_year - start_year
-                                date_ranges.append(years)
-                        elif len(match) == 2:
-                            # Calculate range between two years
-                            start_year = int(match[0])
-                            end_year = int(match[1])
-                            if start_year <= end_year:
-                                years = end_year - start_year
-                                date_ranges.append(years)
-    
-    # Determine longest continuous experience
-    max_years = 0
-    if years_mentioned:
-        max_years = max(years_mentioned)
-    if date_ranges:
-        max_years = max(max_years, max(date_ranges))
+    # Total experience across every role, or what the resume states outright if that is more
+    years = max([total_years] + resume_ir['experience_years'])
     
     # Determine if experience matches requirement
-    if max_years >= required_years:
-        return {
+    if years >= required_years:
+        experience_match = {
             'match': True,
             'confidence': 'high',
-            'message': f'Resume indicates {max_years} years of experience, meeting the requirement of {required_years}+ years'
+            'message': f'Resume indicates {years:g} years of experience, meeting the requirement of {required_years}+ years'
         }
-    elif max_years > 0:
-        return {
+    elif years > 0:
+        experience_match = {
             'match': False,
             'confidence': 'medium',
-            'message': f'Resume indicates {max_years} years of experience, which is less than the required {required_years}+ years'
+            'message': f'Resume indicates {years:g} years of experience, which is less than the required {required_years}+ years'
         }
     else:
-        return {
+        experience_match = {
             'match': False,
             'confidence': 'low',
             'message': f'Could not determine years of experience from resume. Job requires {required_years}+ years'
         }
+    experience_match['total_years'] = total_years
+    experience_match['longest_continuous_years'] = longest_years
+    return experience_match
 
 def check_education_match(education_entities, education_requirements):
     """Check if resume appears to meet education requirements"""
@@ -535,40 +1101,15 @@ def check_education_match(education_entities, education_requirements):
     
     required_level = education_requirements['level']
     
-    # Education level hierarchy for comparison
-    education_hierarchy = {
-        'phd': 5,
-        'masters': 4,
-        'bachelors': 3,
-        'associates': 2,
-        'certificate': 1,
-        'high school': 0
-    }
+    # Education level hierarchy for comparison: the lowest level is 0
+    education_hierarchy = {level: value for value, level in enumerate(reversed(EDUCATION_LEVELS))}
     
     required_value = education_hierarchy.get(required_level, 0)
     
-    # Check education entities for matches
-    education_keywords = {
-        'phd': ['phd', 'doctorate', 'doctoral'],
-        'masters': ['master', 'ms', 'ma', 'msc', 'mba'],
-        'bachelors': ['bachelor', 'bs', 'ba', 'bsc', 'undergraduate'],
-        'associates': ['associate', 'as', 'aa'],
-        'certificate': ['certificate', 'certification', 'diploma'],
-        'high school': ['high school', 'hs', 'ged']
-    }
-    
-    # Find the highest education level in the resume
-    highest_level = 'none'
-    highest_value = -1
-    
-    for entity in education_entities:
-        entity_lower = entity.lower()
-        for level, keywords in education_keywords.items():
-            if any(keyword in entity_lower for keyword in keywords):
-                level_value = education_hierarchy.get(level, 0)
-                if level_value > highest_value:
-                    highest_level = level
-                    highest_value = level_value
+    # Find the highest education level in the resume, over all its education entities at once
+    education = EDUCATION_RESUME_CLASSIFIER.classify('\n'.join(education_entities).lower())
+    highest_level = education[0] if education else 'none'
+    highest_value = education_hierarchy.get(highest_level, -1)
     
     # Compare resume education with requirements
     if highest_value >= required_value:
@@ -590,9 +1131,10 @@ def check_education_match(education_entities, education_requirements):
             'message': f'Could not determine education level from resume. Job requires {required_level.capitalize()} level'
         }
 
-def generate_personalized_suggestions(matched_keywords, missing_keywords, resume_text, job_description, resume_entities, job_entities, experience_req, education_req):
+def generate_personalized_suggestions(matched_keywords, missing_keywords, resume_context, experience_req, education_req, experience_match, education_match, missing_sections):
     """Generate personalized suggestions based on comprehensive analysis"""
     suggestions = []
+    resume_text_lower = resume_context['text_lower']
     
     # Suggestion 1: Missing keywords
     if missing_keywords:
@@ -602,32 +1144,27 @@ def generate_personalized_suggestions(matched_keywords, missing_keywords, resume
             suggestions.append(f"Add these critical keywords to your resume: {', '.join(missing_keywords)}.")
     
     # Suggestion 2: Experience match
-    if experience_req['has_requirement']:
-        exp_check = check_experience_match(resume_text, experience_req)
-        if not exp_check['match']:
-            suggestions.append(f"Highlight your experience more clearly. This job requires {experience_req['years']}+ years of experience.")
+    if experience_req['has_requirement'] and not experience_match['match']:
+        suggestions.append(f"Highlight your experience more clearly. This job requires {experience_req['years']}+ years of experience.")
     
     # Suggestion 3: Education match
-    if education_req['has_requirement']:
-        edu_check = check_education_match(resume_entities.get('education', []), education_req)
-        if not edu_check['match']:
-            suggestions.append(f"Ensure your education section clearly shows your {education_req['level'].capitalize()} degree.")
+    if education_req['has_requirement'] and not education_match['match']:
+        suggestions.append(f"Ensure your education section clearly shows your {education_req['level'].capitalize()} degree.")
     
     # Suggestion 4: Skills section
     if len(missing_keywords) > 0:
         suggestions.append("Create a dedicated 'Skills' section that highlights your technical and soft skills using keywords from the job description.")
     
     # Suggestion 5: Quantifiable achievements
-    if "achiev" not in resume_text.lower() and "accomplish" not in resume_text.lower():
+    if "achiev" not in resume_text_lower and "accomplish" not in resume_text_lower:
         suggestions.append("Add quantifiable achievements to demonstrate the impact of your work (e.g., 'increased efficiency by 20%').")
     
     # Suggestion 6: Action verbs
     action_verbs = ["implemented", "developed", "managed", "created", "designed", "coordinated", "analyzed", "resolved"]
-    if not any(verb in resume_text.lower() for verb in action_verbs):
+    if not any(verb in resume_text_lower for verb in action_verbs):
         suggestions.append("Use strong action verbs at the beginning of your bullet points (e.g., 'Implemented', 'Developed', 'Managed').")
     
     # Suggestion 7: Missing sections check
-    missing_sections = identify_missing_sections(resume_text)
     if missing_sections:
         suggestions.append(f"Add these important sections to your resume: {', '.join(missing_sections)}.")
     
@@ -643,44 +1180,162 @@ def generate_personalized_suggestions(matched_keywords, missing_keywords, resume
     
     return suggestions
 
-def identify_missing_sections(resume_text):
-    """Identify important sections that might be missing from the resume"""
-    # Define important sections to check for
-    important_sections = [
-        "education", 
-        "experience", 
-        "work experience", 
-        "professional experience",
-        "skills", 
-        "technical skills",
-        "projects",
-        "certifications", 
-        "achievements"
-    ]
-    
-    # Check which sections are missing
-    missing_sections = []
-    for section in important_sections:
-        # Check for section headers (common formatting)
-        patterns = [
-            r'\b' + re.escape(section) + r'\b\s*:',  # "Education:" format
-            r'\b' + re.escape(section) + r'\b\s*$',  # "Education" at end of line
-            r'^\s*\b' + re.escape(section) + r'\b',  # "Education" at start of line
-            r'[^a-zA-Z]' + re.escape(section) + r'[^a-zA-Z]'  # Section surrounded by non-letters
-        ]
+# Section header lines, by what they read once lowercased and stripped of
+# bullets, a trailing colon and extra spaces, and the section each one starts
+SECTION_HEADERS = {}
+for section, headers in {
+    'summary': ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"],
+    'experience': ["experience", "work experience", "professional experience", "relevant experience",
+                   "employment", "employment history", "work history", "career history"],
+    'education': ["education", "academic background", "education and training", "academic qualifications"],
+    'skills': ["skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "skills and abilities"],
+    'projects': ["projects", "personal projects", "key projects", "selected projects", "academic projects"],
+    'certifications': ["certifications", "certificates", "licenses and certifications", "certifications and licenses"],
+    'achievements': ["achievements", "key achievements", "accomplishments", "awards", "honors",
+                     "awards and honors", "honors and awards"],
+    'publications': ["publications"],
+    'volunteering': ["volunteering", "volunteer experience", "volunteer work"],
+    'languages': ["languages"],
+    'interests': ["interests", "hobbies", "hobbies and interests"],
+    'references': ["references"]
+}.items():
+    SECTION_HEADERS.update(dict.fromkeys(headers, section))
+
+# Longer lines are never headers
+SECTION_HEADER_MAX_LENGTH = 40
+SECTION_HEADER_STRIP = " \t#*-•·▪●>|"
+
+# Sections every resume should have. A section counts as present when it has a
+# header line or its name appears anywhere as a word ("5 years of experience")
+IMPORTANT_SECTIONS = ["education", "experience", "skills", "projects", "certifications", "achievements"]
+SECTION_NAME_PATTERN = re.compile(r'(?<![a-z])(' + '|'.join(IMPORTANT_SECTIONS) + r')(?![a-z])')
+
+def classify_section_header(line_lower):
+    """The section a lowercased line starts, or None if it isn't a section header"""
+    # "Skills: Python, SQL" starts a section too
+    header = line_lower.split(':', 1)[0].strip(SECTION_HEADER_STRIP)
+    if not header or len(header) > SECTION_HEADER_MAX_LENGTH:
+        return None
+    return SECTION_HEADERS.get(' '.join(header.replace('&', 'and').split()))
+
+BULLET_PATTERN = re.compile(r'\s*(?:[•·▪●◦‣*>-]|\d{1,2}[.)])\s+')
+MONTHS = {'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+          'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'sept': 9,
+          'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12}
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+def _date_pattern(name):
+    """A year, optionally after a month name ("Jan 2016", "March 2018") or number ("03/2018")"""
+    return rf'(?:(?P<{name}_month_name>{MONTH_NAMES})\.?\s+|(?P<{name}_month>\d{{1,2}})\s*/\s*)?(?P<{name}_year>\d{{4}})'
+
+# Every kind of date range in one pattern: "2016 - 2020", "Jan 2016 – Mar 2020",
+# "03/2018 to present", so a line is searched once whatever the format
+DATE_RANGE_PATTERN = re.compile(r'\b' + _date_pattern('start') + r'\s*(?:[-–—]|to|until)\s*(?:'
+                                + _date_pattern('end') + r'|(?P<present>present|current|now|today))\b')
+# Most lines have no range, and this rules them out much faster than the full pattern
+DATE_RANGE_HINT = re.compile(r'\d{4}\s*(?:[-–—]|to|until)')
+
+# Years outside this range are phone numbers, ids and the like
+EARLIEST_YEAR = 1950
+
+def _match_date(match, name):
+    """[year, month] of one end of a DATE_RANGE_PATTERN match, month None when only the year is given"""
+    year = int(match.group(f'{name}_year'))
+    month_name = match.group(f'{name}_month_name')
+    month = MONTHS[month_name] if month_name else match.group(f'{name}_month')
+    month = int(month) if month is not None else None
+    if month is not None and not 1 <= month <= 12:
+        return None
+    return [year, month]
+
+RESUME_EXPERIENCE_PATTERN = re.compile(r'(\d+)[\+]?\s+years?\s+(?:of\s+)?experience')
+SKILL_SEPARATOR_PATTERN = re.compile(r'[,;|•·▪●]')
+
+# Longer items in a skills section are sentences rather than skills
+SKILL_MAX_LENGTH = 40
+
+def build_resume_ir(resume_text):
+    """Structured representation of a resume, built in a single line-by-line pass.
+    
+    It is plain JSON, so the Flask backend caches it by the resume's content
+    hash and reuses it for every later analysis of the same resume:
+    
+    - sections: the sections present, in order of first appearance, and the
+      character spans of each section with a header line, from its header to
+      the next header or the end of the text
+    - bullets: character spans of bullet point lines
+    - date_ranges: date ranges ("2016 - 2020", "Jan 2016 - Mar 2020",
+      "03/2018 - present") as [year, month] pairs, month None when only the
+      year is given and end None for "present", and the section each is in
+    - experience_years: the numbers in "5 years of experience" and the like
+    - skills: the items listed in skills sections
+    - education: the lines of education sections
+    """
+    present = {}
+    headers = []
+    bullets = []
+    date_ranges = []
+    experience_years = []
+    skills = {}
+    education = []
+    section = None
+    offset = 0
+    for line in resume_text.splitlines(keepends=True):
+        line_lower = line.lower()
+        content = line
+        header = classify_section_header(line_lower)
+        if header is not None:
+            section = header
+            headers.append((section, offset))
+            present[section] = True
+            # Whatever follows "Skills:" on the header line belongs to the section
+            content = line.split(':', 1)[1] if ':' in line else ''
+        else:
+            bullet = BULLET_PATTERN.match(line)
+            if bullet:
+                bullets.append([offset, offset + len(line.rstrip('\r\n'))])
+                content = line[bullet.end():]
         
-        if not any(re.search(pattern, resume_text, re.IGNORECASE | re.MULTILINE) for pattern in patterns):
-            # For simplicity, group related sections
-            if section in ["experience", "work experience", "professional experience"]:
-                if "experience" not in missing_sections:
-                    missing_sections.append("Experience")
-            elif section in ["skills", "technical skills"]:
-                if "Skills" not in missing_sections:
-                    missing_sections.append("Skills")
-            else:
-                missing_sections.append(section.capitalize())
-    
-    # Remove duplicates due to grouping
-    missing_sections = list(set(missing_sections))
+        for match in SECTION_NAME_PATTERN.finditer(line_lower):
+            present[match.group(1)] = True
+        date_matches = DATE_RANGE_PATTERN.finditer(line_lower) if DATE_RANGE_HINT.search(line_lower) else ()
+        for match in date_matches:
+            start = _match_date(match, 'start')
+            end = None if match.group('present') else _match_date(match, 'end')
+            if start is None or (end is None and not match.group('present')):
+                continue
+            date_ranges.append({'start': start, 'end': end, 'span': [offset + match.start(), offset + match.end()],
+                                'section': section})
+        experience_years.extend(int(years) for years in RESUME_EXPERIENCE_PATTERN.findall(line_lower))
+        
+        content = content.strip()
+        if content and section == 'skills':
+            for item in SKILL_SEPARATOR_PATTERN.split(content):
+                item = item.strip(SECTION_HEADER_STRIP + '.')
+                if item and len(item) <= SKILL_MAX_LENGTH:
+                    skills.setdefault(item.lower(), item)
+        elif content and section == 'education':
+            education.append(content)
+        offset += len(line)
+    
+    spans = {}
+    for index, (section, start) in enumerate(headers):
+        end = headers[index + 1][1] if index + 1 < len(headers) else len(resume_text)
+        spans.setdefault(section, []).append([start, end])
     
-    return missing_sections
+    return {
+        'sections': {'present': list(present), 'spans': spans},
+        'bullets': bullets,
+        'date_ranges': date_ranges,
+        'experience_years': experience_years,
+        'skills': list(skills.values()),
+        'education': education
+    }
+
+def identify_missing_sections(resume_text, sections=None):
+    """Identify important sections that might be missing from the resume"""
+    if sections is None:
+        sections = build_resume_ir(resume_text)['sections']
+    return [section.capitalize() for section in IMPORTANT_SECTIONS if section not in sections['present']]
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Content-addressed cache for analysis results and per-document intermediates.
+# Entries are JSON files stored under CACHE_DIR/<namespace>/<sha256>.json, so
+# every gunicorn worker on the box shares the same cache. A file's mtime is
+# bumped on every hit and eviction removes the least recently used files once
+# the total size passes CACHE_MAX_BYTES. Entries older than CACHE_TTL_SECONDS
+# are treated as misses and removed.
+CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", "cache")
+CACHE_MAX_BYTES = int(os.environ.get("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+# Each worker adds its own writes to a running total of the cache size, and
+# adds up the files on disk again every CACHE_RESCAN_SECONDS to take in what
+# the other workers wrote. Together they can only pass the cap by what they
+# write in that time before one of them evicts
+CACHE_RESCAN_SECONDS = float(os.environ.get("ANALYSIS_CACHE_RESCAN_SECONDS", "30"))
+
+# Bump whenever the analysis output changes so stale entries are never served
+CACHE_VERSION = "6"
+
+# Evict down to this fraction of the cap so we don't evict on every write
+EVICTION_TARGET_RATIO = 0.9
+
+_lock = threading.Lock()
+_cache_size = None
+_scanned_at = 0.0
+
+def cache_enabled():
+    """The cache is disabled by setting ANALYSIS_CACHE_MAX_BYTES to 0"""
+    return CACHE_MAX_BYTES > 0
+
+# Seekable file parts are hashed in chunks of this size
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def content_hash(*parts):
+    """Hash any mix of bytes, str and seekable file parts into a hex cache key"""
+    digest = hashlib.sha256(CACHE_VERSION.encode('utf-8'))
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        if hasattr(part, 'read'):
+            _update_from_stream(digest, part)
+            continue
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        digest.update(str(len(part)).encode('ascii') + b':')
+        digest.update(part)
+    return digest.hexdigest()
+
+def _update_from_stream(digest, stream):
+    """Hash a file the same way as its bytes, without reading it into memory"""
+    stream.seek(0, os.SEEK_END)
+    digest.update(str(stream.tell()).encode('ascii') + b':')
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+        digest.update(chunk)
+    stream.seek(0)
+
+def normalize_job_description(job_description):
+    """Normalise a job description so cosmetic differences share a cache entry"""
+    return ' '.join(job_description.split()).lower()
+
+def _entry_path(namespace, key):
+    return os.path.join(CACHE_DIR, namespace, key + '.json')
+
+def cache_get(namespace, key):
+    """Return the cached value for key, or None on a miss or expired entry"""
+    if not cache_enabled():
+        return None
+
+    path = _entry_path(namespace, key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    now = time.time()
+    if now - entry.get('created', 0) > CACHE_TTL_SECONDS:
+        _remove_entry(path)
+        return None
+
+    try:
+        # Record the access for LRU eviction
+        os.utime(path, (now, now))
+    except OSError:
+        pass
+
+    return entry['value']
+
+def cache_put(namespace, key, value):
+    """Store a JSON-serialisable value under key"""
+    if not cache_enabled():
+        return
+
+    path = _entry_path(namespace, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = json.dumps({'created': time.time(), 'value': value}).encode('utf-8')
+
+    # Write to a temporary file and rename so readers never see partial entries
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error writing cache entry: {str(e)}")
+        _remove_entry(temp_path)
+        return
+
+    _track_size(len(data))
+
+def cached(namespace, key, compute):
+    """Return the cached value for key, computing and storing it on a miss"""
+    value = cache_get(namespace, key)
+    if value is None:
+        value = compute()
+        cache_put(namespace, key, value)
+    return value
+
+def _remove_entry(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _scan_entries():
+    """List (mtime, size, path) for every cache entry on disk"""
+    entries = []
+    if not os.path.isdir(CACHE_DIR):
+        return entries
+    for namespace in os.scandir(CACHE_DIR):
+        if not namespace.is_dir():
+            continue
+        for entry in os.scandir(namespace.path):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+def _track_size(added_bytes):
+    """Keep a running total of the cache size and evict when it passes the cap"""
+    global _cache_size, _scanned_at
+    with _lock:
+        now = time.monotonic()
+        if _cache_size is None or now - _scanned_at >= CACHE_RESCAN_SECONDS:
+            # Other workers write to the same directory, so count from disk
+            _cache_size = sum(size for _, size, _ in _scan_entries())
+            _scanned_at = now
+        else:
+            _cache_size += added_bytes
+        if _cache_size > CACHE_MAX_BYTES:
+            _cache_size = evict_cache_entries()
+            _scanned_at = now
+
+def evict_cache_entries():
+    """Remove expired entries, then least recently used ones until under the target size"""
+    entries = _scan_entries()
+    now = time.time()
+    target = CACHE_MAX_BYTES * EVICTION_TARGET_RATIO
+
+    # Oldest access first
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        # An entry untouched for longer than the TTL is certainly expired
+        if total <= target and now - mtime <= CACHE_TTL_SECONDS:
+            break
+        _remove_entry(path)
+        total -= size
+
+    return total
@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Where /analyze runs the CPU-bound analysis. "inline" runs it on the request
+# thread. "process" hands it to a pool of ANALYSIS_POOL_WORKERS processes, so
+# request threads only receive uploads and wait. At most
+# ANALYSIS_POOL_MAX_PENDING analyses may be running or queued per gunicorn
+# worker; past that, requests are turned away with a 429 and Retry-After
+# rather than queueing without bound. A pool whose process died (killed for
+# running out of memory, say) is replaced, and the analyses it lost are run
+# once more in the new pool.
+ANALYSIS_EXECUTOR = os.environ.get("ANALYSIS_EXECUTOR", "inline")
+ANALYSIS_POOL_WORKERS = int(os.environ.get("ANALYSIS_POOL_WORKERS", str(os.cpu_count() or 1)))
+ANALYSIS_POOL_MAX_PENDING = int(os.environ.get("ANALYSIS_POOL_MAX_PENDING", str(ANALYSIS_POOL_WORKERS * 2)))
+ANALYSIS_RETRY_AFTER_SECONDS = int(os.environ.get("ANALYSIS_RETRY_AFTER_SECONDS", "5"))
+
+_lock = threading.Lock()
+_slot_freed = threading.Condition(_lock)
+_pool = None
+_pending = 0
+
+class AnalysisPoolFullError(Exception):
+    """Raised when the analysis pool already has ANALYSIS_POOL_MAX_PENDING analyses"""
+
+class AnalysisPoolBrokenError(Exception):
+    """Raised when an analysis broke the pool again after it was replaced"""
+
+def pool_enabled():
+    return ANALYSIS_EXECUTOR == "process"
+
+def start_analysis_pool():
+    """Create the pool and fork all its processes now (gunicorn.conf.py calls this before threads start)"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ANALYSIS_POOL_WORKERS)
+    # With the fork start method every process is started on the first submit,
+    # so they inherit the worker's loaded models and no request pays for it
+    _pool.submit(os.getpid).result()
+    return _pool
+
+def _replace_broken_pool(broken_pool):
+    """Swap a pool with a dead process for a new one, unless another thread already has"""
+    global _pool
+    with _lock:
+        if _pool is broken_pool:
+            _pool = None
+    # Its remaining processes exit once they see the pool is broken
+    broken_pool.shutdown(wait=False)
+    return start_analysis_pool()
+
+def run_analysis(function, *args, wait=False):
+    """Run function(*args) in the analysis pool, or inline when the pool is disabled"""
+    # A full pool is turned away unless the caller would rather wait, as
+    # background jobs do since there is no client to retry them
+    global _pending
+    if not pool_enabled():
+        return function(*args)
+
+    with _slot_freed:
+        while _pending >= ANALYSIS_POOL_MAX_PENDING:
+            if not wait:
+                raise AnalysisPoolFullError("The server is busy analyzing other resumes. Please try again shortly.")
+            _slot_freed.wait()
+        _pending += 1
+
+    try:
+        pool = _pool if _pool is not None else start_analysis_pool()
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            # The process may have died of this very analysis, so it gets one
+            # more try in a new pool, and the pool is replaced again if it fails
+            pool = _replace_broken_pool(pool)
+            try:
+                return pool.submit(function, *args).result()
+            except BrokenProcessPool:
+                _replace_broken_pool(pool)
+                raise AnalysisPoolBrokenError("The analysis stopped unexpectedly. Please try again.")
+    finally:
+        with _slot_freed:
+            _pending -= 1
+            _slot_freed.notify()
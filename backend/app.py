@@ -1,124 +1,1068 @@
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import PyPDF2
 import re
-import nltk
-import spacy
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
+import io
 import json
+import datetime
+import importlib.util
+import pickle
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from analysis_pool import ANALYSIS_RETRY_AFTER_SECONDS, AnalysisPoolBrokenError, AnalysisPoolFullError, run_analysis
+from analysis_cache import CACHE_DIR, cache_get, cache_put, cached, content_hash, normalize_job_description
+from job_profiles import JobProfileNotFoundError, job_profile_id, load_job_profile, save_job_profile
+from job_queue import JobQueueFullError, get_job, register_job_handler, submit_job
+from metrics import observe_stage_timings, render_metrics
+from resume_index import add_resumes, count_resumes, get_resume, remove_resume, search_resumes
+from taxonomy import get_taxonomy
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS to allow requests from frontend
 
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('averaged_perceptron_tagger')
+# Sentence segmentation for the spaCy pipeline: "parser" uses the dependency
+# parser (also gives us noun chunks for job titles), "senter" uses the much
+# faster statistical sentence recognizer and skips parsing altogether
+SPACY_MODEL = "en_core_web_sm"
+SPACY_SENTENCE_SEGMENTATION = os.environ.get("SPACY_SENTENCE_SEGMENTATION", "parser")
 
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    # If model not found, download it
-    os.system("python -m spacy download en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+# Batch analysis feeds resumes through nlp.pipe in batches of SPACY_BATCH_SIZE,
+# fanning out to SPACY_N_PROCESS processes once there are enough of them
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", "16"))
+SPACY_N_PROCESS = int(os.environ.get("SPACY_N_PROCESS", str(os.cpu_count() or 1)))
 
-# Create a directory for caching analysis results
-os.makedirs("cache", exist_ok=True)
+# Resumes go through spaCy in blocks of lines, and each block's entities are
+# cached by its own text, so an edited resume only has its changed blocks
+# parsed again. A block ends before every section header and after any line
+# whose CRC is a multiple of ENTITY_BLOCK_LINES (the average block length), so
+# boundaries depend only on the lines around them: an edit changes one block,
+# or two if it moves a boundary, and every other block is found again as is
+ENTITY_BLOCK_LINES = int(os.environ.get("ENTITY_BLOCK_LINES", "8"))
+
+# PDF text extraction: PDF_EXTRACTION_ENGINE is "pypdfium2", "pdfminer" or
+# "pypdf2", and "auto" uses pypdfium2 if it is installed. Uploads over
+# PDF_MAX_BYTES or PDF_MAX_PAGES are rejected (0 disables a cap), and PDFs
+# with at least PDF_PARALLEL_MIN_PAGES pages are split across
+# PDF_EXTRACTION_WORKERS processes
+PDF_EXTRACTION_ENGINE = os.environ.get("PDF_EXTRACTION_ENGINE", "auto")
+PDF_MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "50"))
+PDF_EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Resume text sent to /analyze/incremental, as is or after its edits, is
+# capped like PDFs are: about PDF_MAX_PAGES pages of text (0 disables the cap)
+RESUME_TEXT_MAX_CHARS = int(os.environ.get("RESUME_TEXT_MAX_CHARS", str(200 * 1000)))
+
+# Job descriptions stored by POST /jobs are capped too: a long posting is a
+# few thousand characters (0 disables the cap)
+JOB_DESCRIPTION_MAX_CHARS = int(os.environ.get("JOB_DESCRIPTION_MAX_CHARS", str(50 * 1000)))
+
+# Optional semantic similarity: a TF-IDF model fitted once on a reference
+# corpus (see fit_tfidf_model.py) and loaded from TFIDF_MODEL_PATH. With
+# SIMILARITY_WEIGHT above 0, the match score blends the keyword score with
+# the cosine similarity between the resume and the job description
+TFIDF_MODEL_PATH = os.environ.get("TFIDF_MODEL_PATH", "tfidf_model.pkl")
+SIMILARITY_WEIGHT = float(os.environ.get("SIMILARITY_WEIGHT", "0"))
+
+# Match scoring: "weighted" counts each job keyword by its entry in a weight
+# table indexed by keyword id, so technical keywords outweigh soft skills and
+# keywords specific to one domain outweigh ones several domains share. A table
+# built by fit_keyword_weights.py from past job descriptions (KEYWORD_WEIGHTS_PATH)
+# also favours keywords that are rare across jobs. "ratio" counts every keyword equally
+MATCH_SCORING = os.environ.get("MATCH_SCORING", "weighted")
+KEYWORD_WEIGHTS_PATH = os.environ.get("KEYWORD_WEIGHTS_PATH", "keyword_weights.npz")
+
+# POST /resumes/search returns at most RESUME_SEARCH_MAX_TOP_K resumes, which
+# also keeps its lookup of them within SQLite's limit on query parameters
+RESUME_SEARCH_MAX_TOP_K = 1000
+
+# Default priorities for /analyze/jobs: a single resume usually has someone
+# waiting on it, so it goes ahead of batch screenings. A client may pick its
+# own priority, but only within this range, so no job can jump ahead of them all
+JOB_PRIORITIES = {'analyze': 10, 'batch': 0}
+JOB_PRIORITY_RANGE = (min(JOB_PRIORITIES.values()), max(JOB_PRIORITIES.values()))
+
+def load_spacy_pipeline(model_name):
+    """Load spaCy with only the components extract_entities needs"""
+    # spaCy itself takes a while to import, so it is only imported when needed
+    import spacy
+    
+    try:
+        if SPACY_SENTENCE_SEGMENTATION == "senter":
+            pipeline = spacy.load(model_name, exclude=["parser", "tagger", "attribute_ruler", "lemmatizer"])
+            pipeline.enable_pipe("senter")
+        else:
+            # The tagger and attribute ruler stay because noun chunks need POS tags
+            pipeline = spacy.load(model_name, exclude=["lemmatizer", "senter"])
+    except OSError:
+        # Never download at runtime: a cold start must not depend on the network
+        raise RuntimeError(f"spaCy model '{model_name}' is not installed. "
+                           f"Install it with: python -m spacy download {model_name}")
+    
+    # Drop the shared token-to-vector layer if no remaining component listens to it
+    if "tok2vec" in pipeline.pipe_names and not pipeline.get_pipe("tok2vec").listening_components:
+        pipeline.remove_pipe("tok2vec")
+    
+    return pipeline
+
+# The spaCy model is loaded lazily by get_nlp(), once per process, so
+# importing this module stays fast and never touches the network
+nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Return the process-wide spaCy pipeline, loading it on first use"""
+    global nlp
+    if nlp is None:
+        with _nlp_lock:
+            if nlp is None:
+                nlp = load_spacy_pipeline(SPACY_MODEL)
+    return nlp
+
+# Entities depend on the pipeline that found them: "senter" and "parser"
+# segment sentences differently, so each caches its own
+SPACY_PIPELINE_ID = f"spacy:{SPACY_MODEL}:{SPACY_SENTENCE_SEGMENTATION}"
+
+def entity_cache_key(text):
+    """Cache key of the entities of text, as found by this process's pipeline"""
+    return content_hash(text, SPACY_PIPELINE_ID)
+
+# The TF-IDF model is loaded the same way, by get_tfidf_model()
+tfidf_model = None
+_tfidf_lock = threading.Lock()
+
+def load_tfidf_model(path):
+    """Load a model written by fit_tfidf_model.py: the fitted vectorizer and its fingerprint"""
+    try:
+        # Unpickling the vectorizer imports scikit-learn, so this only happens on first use
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except OSError:
+        raise RuntimeError(f"TF-IDF model '{path}' not found. Fit one with: python fit_tfidf_model.py <corpus>")
+
+def get_tfidf_model():
+    """Return the process-wide TF-IDF model, loading it on first use"""
+    global tfidf_model
+    if tfidf_model is None:
+        with _tfidf_lock:
+            if tfidf_model is None:
+                tfidf_model = load_tfidf_model(TFIDF_MODEL_PATH)
+    return tfidf_model
+
+def preload_models():
+    """Load everything a request needs up front (gunicorn.conf.py calls this before forking)"""
+    if nlp is None:
+        # Running one document through builds any state spaCy initialises lazily
+        get_nlp()("Preloading the pipeline.")
+    if SIMILARITY_WEIGHT > 0:
+        get_tfidf_model()
+    get_taxonomy()
+    if MATCH_SCORING == "weighted":
+        get_keyword_weights()
+
+# Create a directory for caching analysis results (see analysis_cache.py)
+os.makedirs(CACHE_DIR, exist_ok=True)
 
 @app.route('/analyze', methods=['POST'])
 def analyze_resume():
     try:
-        if 'resume' not in request.files or 'jobDescription' not in request.form:
+        if 'resume' not in request.files or not has_job_description(request.form):
             return jsonify({'error': 'Missing resume file or job description'}), 400
         
-        # Get resume file and job description
+        # Get resume file and job description (or the profile stored by POST /jobs)
         resume_file = request.files['resume']
-        job_description = request.form['jobDescription']
+        job_description, job_profile = job_description_from_form(request.form)
         
         # Validate file is PDF
         if not resume_file.filename.endswith('.pdf'):
             return jsonify({'error': 'Please upload a PDF file'}), 400
         
-        # Extract text from PDF
-        resume_text = extract_text_from_pdf(resume_file)
+        # Milliseconds per stage, exported on /metrics
+        timings = {}
+        
+        with timed_stage(timings, 'total'):
+            # The upload is hashed and parsed straight from its stream, never
+            # copied into memory as a whole
+            analysis_result = analyze_pdf(resume_file.stream, job_description, timings, job_profile=job_profile)
+        
+        observe_stage_timings(timings)
         
-        # Analyze the resume against job description
-        analysis_result = analyze_resume_comprehensively(resume_text, job_description)
+        # ?debug_timings=1 adds this request's stage timings to the response
+        if request.args.get('debug_timings') == '1':
+            analysis_result = {**analysis_result, 'debug_timings': timings}
         
         return jsonify(analysis_result)
     
+    except PdfLimitError as e:
+        return jsonify({'error': str(e)}), 413
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except AnalysisPoolFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(ANALYSIS_RETRY_AFTER_SECONDS)}
+    except AnalysisPoolBrokenError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(ANALYSIS_RETRY_AFTER_SECONDS)}
     except Exception as e:
         print(f"Error during analysis: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text content from uploaded PDF file"""
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_resume_batch():
+    try:
+        resume_files = request.files.getlist('resumes')
+        if not resume_files or not has_job_description(request.form):
+            return jsonify({'error': 'Missing resume files or job description'}), 400
+        
+        job_description, job_profile = job_description_from_form(request.form)
+        
+        # Uploaded files are closed when the request ends, which for a
+        # streamed response is before the generator has finished with them
+        uploads = [(resume_file.filename, resume_file.read()) for resume_file in resume_files]
+        
+        # ?stream=1 emits one NDJSON line per resume as soon as it is analyzed
+        if request.args.get('stream') == '1':
+            lines = stream_batch_analyses(uploads, job_description, job_profile)
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        
+        return jsonify(collect_batch_analyses(uploads, job_description, job_profile))
+    
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        print(f"Error during batch analysis: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    try:
+        if not has_job_description(request.form) or not ('resume' in request.files or 'resumes' in request.files):
+            return jsonify({'error': 'Missing resume file or job description'}), 400
+        
+        job_description, job_profile = job_description_from_form(request.form)
+        
+        # One "resume" file is an /analyze job, several "resumes" files an
+        # /analyze/batch job. The uploads are kept with the job until it runs
+        if 'resumes' in request.files:
+            uploads = [(resume_file.filename, resume_file.read()) for resume_file in request.files.getlist('resumes')]
+            kind, payload = 'batch', {'uploads': uploads, 'job_description': job_description, 'job_profile': job_profile}
+        else:
+            resume_file = request.files['resume']
+            if not resume_file.filename.endswith('.pdf'):
+                return jsonify({'error': 'Please upload a PDF file'}), 400
+            pdf_bytes = resume_file.read()
+            check_pdf_size(len(pdf_bytes))
+            kind, payload = 'analyze', {'pdf_bytes': pdf_bytes, 'job_description': job_description,
+                                        'job_profile': job_profile}
+        
+        priority = request.form.get('priority', JOB_PRIORITIES[kind], type=int)
+        priority = min(max(priority, JOB_PRIORITY_RANGE[0]), JOB_PRIORITY_RANGE[1])
+        job_id = submit_job(kind, payload, priority)
+        
+        return jsonify(get_job(job_id)), 202, {'Location': f'/analyze/jobs/{job_id}'}
+    
+    except PdfLimitError as e:
+        return jsonify({'error': str(e)}), 413
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(ANALYSIS_RETRY_AFTER_SECONDS)}
+    except Exception as e:
+        print(f"Error submitting analysis job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+def run_analysis_job(payload):
+    """Job handler for a single resume, same as POST /analyze"""
+    timings = {}
+    with timed_stage(timings, 'total'):
+        # Jobs wait for a free slot in the analysis pool rather than fail
+        analysis_result = analyze_pdf(io.BytesIO(payload['pdf_bytes']), payload['job_description'], timings,
+                                      wait=True, job_profile=payload['job_profile'])
+    observe_stage_timings(timings)
+    return analysis_result
+
+def run_batch_job(payload):
+    """Job handler for a batch of resumes, same as POST /analyze/batch"""
+    return collect_batch_analyses(payload['uploads'], payload['job_description'], payload['job_profile'])
+
+register_job_handler('analyze', run_analysis_job)
+register_job_handler('batch', run_batch_job)
+
+@app.route('/analyze/incremental', methods=['POST'])
+def analyze_resume_incremental():
+    try:
+        # A JSON body: the resume text with a job description or job_id, or an
+        # earlier response's analysis_id with the new text or edits to the old
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        previous = None
+        if 'analysis_id' in body:
+            previous = cache_get('resume_revisions', str(body['analysis_id']))
+            if previous is None:
+                return jsonify({'error': 'Unknown or expired analysis_id, send the whole resume_text instead'}), 404
+        
+        # Any of these that are given must be strings
+        for field in ('resume_text', 'jobDescription', 'job_id'):
+            if field in body and not isinstance(body[field], str):
+                return jsonify({'error': f'{field} must be a string'}), 400
+        
+        if 'resume_text' in body:
+            resume_text = body['resume_text']
+        elif 'edits' in body and previous is not None:
+            try:
+                resume_text = apply_text_edits(previous['resume_text'], body['edits'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            return jsonify({'error': 'Missing resume_text, or analysis_id and edits'}), 400
+        if RESUME_TEXT_MAX_CHARS and len(resume_text) > RESUME_TEXT_MAX_CHARS:
+            return jsonify({'error': f'Resume text is {len(resume_text)} characters; '
+                                     f'the limit is {RESUME_TEXT_MAX_CHARS} characters.'}), 413
+        
+        # The previous analysis's job, unless the request names another
+        job_form = body if has_job_description(body) else previous and previous['job']
+        if not job_form:
+            return jsonify({'error': 'Missing job description'}), 400
+        job_description, job_profile = job_description_from_form(job_form)
+        job = {'job_id': job_form['job_id']} if 'job_id' in job_form else {'jobDescription': job_description}
+        
+        timings = {}
+        with timed_stage(timings, 'total'):
+            # Blocks of the resume that were parsed before come from the cache
+            analysis_result, analysis_timings = run_analysis(analyze_with_timings, resume_text, job_description,
+                                                             job_profile)
+        timings.update(analysis_timings)
+        observe_stage_timings(timings)
+        
+        analysis_result = {**analysis_result, 'analysis_id': save_resume_revision(resume_text, job)}
+        if request.args.get('debug_timings') == '1':
+            analysis_result['debug_timings'] = timings
+        
+        return jsonify(analysis_result)
+    
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except AnalysisPoolFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(ANALYSIS_RETRY_AFTER_SECONDS)}
+    except AnalysisPoolBrokenError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(ANALYSIS_RETRY_AFTER_SECONDS)}
+    except Exception as e:
+        print(f"Error during incremental analysis: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def create_job_profile():
+    try:
+        # Form data like the other endpoints, or a JSON object
+        if 'jobDescription' in request.form:
+            job_description = request.form['jobDescription']
+        else:
+            body = request.get_json(silent=True)
+            if body is not None and not isinstance(body, dict):
+                return jsonify({'error': 'Expected a JSON object'}), 400
+            job_description = (body or {}).get('jobDescription')
+        if job_description is not None and not isinstance(job_description, str):
+            return jsonify({'error': 'jobDescription must be a string'}), 400
+        if not job_description or not job_description.strip():
+            return jsonify({'error': 'Missing job description'}), 400
+        if JOB_DESCRIPTION_MAX_CHARS and len(job_description) > JOB_DESCRIPTION_MAX_CHARS:
+            return jsonify({'error': f'Job description is {len(job_description)} characters; '
+                                     f'the limit is {JOB_DESCRIPTION_MAX_CHARS} characters.'}), 413
+        
+        # Posting a job description that is already stored returns it as is
+        job_description = normalize_job_description(job_description)
+        try:
+            return jsonify(load_job_profile(job_profile_id(job_description), build_job_profile,
+                                            get_taxonomy().fingerprint))
+        except JobProfileNotFoundError:
+            pass
+        
+        record = save_job_profile(job_description, build_job_profile(job_description), get_taxonomy().fingerprint)
+        return jsonify(record), 201, {'Location': f"/jobs/{record['job_id']}"}
+    
+    except Exception as e:
+        print(f"Error creating job profile: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_profile(job_id):
+    try:
+        return jsonify(load_job_profile(job_id, build_job_profile, get_taxonomy().fingerprint))
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/resumes', methods=['POST'])
+def index_resumes():
+    try:
+        resume_files = request.files.getlist('resumes') or request.files.getlist('resume')
+        if not resume_files:
+            return jsonify({'error': 'Missing resume files'}), 400
+        
+        # Resumes are stored under the given resume_id, or by default a hash
+        # of the PDF, so adding the same file twice replaces the first copy
+        if 'resume_id' in request.form and len(resume_files) > 1:
+            return jsonify({'error': 'resume_id can only be given with a single resume'}), 400
+        
+        indexed = []
+        errors = []
+        for resume_file in resume_files:
+            if not resume_file.filename.endswith('.pdf'):
+                errors.append({'filename': resume_file.filename, 'error': 'Please upload a PDF file'})
+                continue
+            try:
+                pdf_bytes = resume_file.read()
+                check_pdf_size(len(pdf_bytes))
+                resume_text = cached('pdf_text', content_hash(pdf_bytes), lambda: extract_text_from_pdf(pdf_bytes))
+                resume_entities = cached('resume_entities', entity_cache_key(resume_text),
+                                         lambda: extract_resume_entities(resume_text))
+            except Exception as e:
+                errors.append({'filename': resume_file.filename, 'error': str(e)})
+                continue
+            
+            resume_id = request.form.get('resume_id') or content_hash(pdf_bytes)[:32]
+            indexed.append({
+                'resume_id': resume_id,
+                'filename': resume_file.filename,
+                'keywords': resume_keywords(resume_text),
+                'entities': resume_entities
+            })
+        
+        # One transaction for the whole upload
+        add_resumes([(resume['resume_id'], resume['keywords'], resume['entities']) for resume in indexed])
+        
+        return jsonify({'indexed': indexed, 'errors': errors, 'total_resumes': count_resumes()}), 201
+    
+    except Exception as e:
+        print(f"Error indexing resumes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/resumes/<resume_id>', methods=['GET'])
+def get_indexed_resume(resume_id):
+    resume = get_resume(resume_id)
+    if resume is None:
+        return jsonify({'error': 'Unknown resume_id'}), 404
+    return jsonify(resume)
+
+@app.route('/resumes/<resume_id>', methods=['DELETE'])
+def delete_indexed_resume(resume_id):
+    if not remove_resume(resume_id):
+        return jsonify({'error': 'Unknown resume_id'}), 404
+    return '', 204
+
+@app.route('/resumes/search', methods=['POST'])
+def search_indexed_resumes():
+    try:
+        if not has_job_description(request.form):
+            return jsonify({'error': 'Missing job description'}), 400
+        
+        top_k = request.form.get('top_k', 20, type=int)
+        if not 1 <= top_k <= RESUME_SEARCH_MAX_TOP_K:
+            return jsonify({'error': f'top_k must be between 1 and {RESUME_SEARCH_MAX_TOP_K}'}), 400
+        
+        job_description, job_profile = job_description_from_form(request.form)
+        if job_profile is None:
+            job_profile = cached_job_profile(job_description)
+        
+        # Only indexed keywords have postings. Phrases like "5+ years
+        # experience" need the resume text, so they are left to /analyze
+        job_keywords = {keyword.lower(): keyword for keyword in job_profile['keywords']}
+        taxonomy = get_taxonomy()
+        scored_keywords = [keyword for keyword in job_keywords if keyword in taxonomy.keyword_ids]
+        # Rank by the same keyword weights the match score uses
+        search_weights = None
+        if MATCH_SCORING == "weighted":
+            weights = get_keyword_weights(taxonomy)['weights'][taxonomy.ids(scored_keywords)]
+            search_weights = dict(zip(scored_keywords, weights.tolist()))
+        
+        results = []
+        for rank, match in enumerate(search_resumes(scored_keywords, top_k, search_weights), start=1):
+            matched = set(match['matched_keywords'])
+            matched_keywords = [job_keywords[keyword] for keyword in scored_keywords if keyword in matched]
+            missing_keywords = [job_keywords[keyword] for keyword in scored_keywords if keyword not in matched]
+            results.append({
+                'resume_id': match['resume_id'],
+                'rank': rank,
+                'match_score': calculate_match_score(matched_keywords, missing_keywords),
+                'matched_keywords': matched_keywords,
+                'missing_keywords': missing_keywords
+            })
+        
+        unscored_keywords = [job_keywords[keyword] for keyword in job_keywords if keyword not in taxonomy.keyword_ids]
+        return jsonify({'results': results, 'unscored_keywords': unscored_keywords})
+    
+    except JobProfileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        print(f"Error searching resumes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def resume_keywords(resume_text):
+    """Every indexed keyword a job description could list that find_keyword_matches would find in this resume"""
+    taxonomy = get_taxonomy()
+    _, word_hits = taxonomy.scan(resume_text.lower())
+    return taxonomy.bits_to_keywords(taxonomy.resume_keyword_bits(word_hits))
+
+def has_job_description(form):
+    return 'jobDescription' in form or 'job_id' in form
+
+def job_description_from_form(form):
+    """The normalised job description and its stored profile (None when sent as text)"""
+    # A job_id from POST /jobs skips parsing the job description altogether
+    if 'job_id' in form:
+        record = load_job_profile(form['job_id'], build_job_profile, get_taxonomy().fingerprint)
+        return record['job_description'], record['profile']
+    return normalize_job_description(form['jobDescription']), None
+
+def analyze_pdf(pdf_file, job_description, timings=None, wait=False, job_profile=None):
+    """Analyze an uploaded PDF (seekable file) against a job description, using the cache"""
+    # Identical resume + job description pairs are served from the cache
+    pdf_file.seek(0, os.SEEK_END)
+    check_pdf_size(pdf_file.tell())
+    job_description = normalize_job_description(job_description)
+    analysis_key = analysis_cache_key(pdf_file, job_description)
+    analysis_result = cache_get('analysis', analysis_key)
+    if analysis_result is not None:
+        return analysis_result
+    
+    # Extract text from PDF (cached per PDF so a new job description skips this)
+    with timed_stage(timings, 'pdf_extraction'):
+        resume_text = cached('pdf_text', content_hash(pdf_file),
+                             lambda: extract_text_from_pdf(pdf_file))
+    
+    # Analyze the resume against job description (in the analysis pool, if enabled)
+    analysis_result, analysis_timings = run_analysis(analyze_with_timings, resume_text, job_description, job_profile,
+                                                     wait=wait)
+    if timings is not None:
+        timings.update(analysis_timings)
+    cache_put('analysis', analysis_key, analysis_result)
+    return analysis_result
+
+def apply_text_edits(text, edits):
+    """text with edits applied, each {"start", "end", "text"} replacing text[start:end] of the original text"""
+    if not (isinstance(edits, list) and all(
+            isinstance(edit, dict) and isinstance(edit.get('start'), int) and isinstance(edit.get('end'), int)
+            and isinstance(edit.get('text', ''), str) for edit in edits)):
+        raise ValueError("edits must be a list of {start, end, text} objects with integer offsets")
+    
+    pieces = []
+    position = 0
+    for edit in sorted(edits, key=lambda edit: (edit['start'], edit['end'])):
+        start, end = edit['start'], edit['end']
+        if not position <= start <= end <= len(text):
+            raise ValueError(f"Edit {start}-{end} overlaps another edit or is outside the resume text")
+        pieces.append(text[position:start])
+        pieces.append(edit.get('text', ''))
+        position = end
+    pieces.append(text[position:])
+    return ''.join(pieces)
+
+def save_resume_revision(resume_text, job):
+    """Keep a resume text and the job it was analyzed against for POST /analyze/incremental; returns its analysis_id"""
+    analysis_id = content_hash(resume_text, json.dumps(job, sort_keys=True))[:32]
+    cache_put('resume_revisions', analysis_id, {'resume_text': resume_text, 'job': job})
+    return analysis_id
+
+def analysis_cache_key(pdf_file, job_description):
+    """Cache key of an analysis: the PDF, the job description, the spaCy pipeline, the taxonomy and the scoring models"""
+    models = [f"taxonomy:{get_taxonomy().fingerprint}", SPACY_PIPELINE_ID]
+    if MATCH_SCORING == "weighted":
+        models.append(f"weights:{get_keyword_weights()['fingerprint']}")
+    if SIMILARITY_WEIGHT > 0:
+        models.append(f"tfidf:{SIMILARITY_WEIGHT}:{get_tfidf_model()['fingerprint']}")
+    return content_hash(pdf_file, job_description, *models)
+
+def collect_batch_analyses(uploads, job_description, job_profile=None):
+    """All results of a batch, ranked, and the files that failed"""
+    results = []
+    errors = []
+    for result in iter_batch_analyses(uploads, job_description, job_profile):
+        if 'error' in result:
+            errors.append(result)
+        else:
+            results.append(result)
+    
+    return {'results': rank_analysis_results(results), 'errors': errors}
+
+def stream_batch_analyses(uploads, job_description, job_profile=None):
+    """NDJSON lines for a batch: one per resume, then a summary with the ranking"""
+    # Only filenames and scores are kept for the summary, so memory stays flat
+    ranking = []
+    failed = 0
     try:
+        for result in iter_batch_analyses(uploads, job_description, job_profile):
+            if 'error' in result:
+                failed += 1
+                yield json.dumps({'type': 'error', **result}) + '\n'
+            else:
+                ranking.append({'filename': result['filename'], 'match_score': result['match_score']})
+                yield json.dumps({'type': 'result', **result}) + '\n'
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band
+        print(f"Error during batch analysis: {str(e)}")
+        yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+    
+    summary = {
+        'type': 'summary',
+        'analyzed': len(ranking),
+        'failed': failed,
+        'ranking': rank_analysis_results(ranking)
+    }
+    yield json.dumps(summary) + '\n'
+
+def iter_batch_analyses(uploads, job_description, job_profile=None):
+    """Analyze (filename, pdf_bytes) uploads chunk by chunk, yielding each result as soon as it is ready"""
+    # The job description side is computed once for the whole batch. Chunks
+    # are large enough for nlp.pipe to fan out across every process
+    chunk_size = SPACY_BATCH_SIZE * max(SPACY_N_PROCESS, 1)
+    if job_profile is None:
+        job_profile = cached_job_profile(job_description)
+    
+    for chunk_start in range(0, len(uploads), chunk_size):
+        pending = []
+        
+        for filename, pdf_bytes in uploads[chunk_start:chunk_start + chunk_size]:
+            # A bad file is reported on its own rather than failing the whole batch
+            if not filename.endswith('.pdf'):
+                yield {'filename': filename, 'error': 'Please upload a PDF file'}
+                continue
+            
+            try:
+                check_pdf_size(len(pdf_bytes))
+                analysis_key = analysis_cache_key(pdf_bytes, job_description)
+                analysis_result = cache_get('analysis', analysis_key)
+                if analysis_result is not None:
+                    yield {'filename': filename, **analysis_result}
+                    continue
+                
+                timings = {}
+                with timed_stage(timings, 'pdf_extraction'):
+                    resume_text = cached('pdf_text', content_hash(pdf_bytes),
+                                         lambda: extract_text_from_pdf(pdf_bytes))
+                observe_stage_timings(timings)
+            except Exception as e:
+                yield {'filename': filename, 'error': str(e)}
+                continue
+            
+            pending.append((filename, analysis_key, resume_text))
+        
+        resume_texts = [resume_text for _, _, resume_text in pending]
+        analysis_results = analyze_resumes_batch(resume_texts, job_description, job_profile)
+        for (filename, analysis_key, _), analysis_result in zip(pending, analysis_results):
+            cache_put('analysis', analysis_key, analysis_result)
+            yield {'filename': filename, **analysis_result}
+
+class PdfLimitError(Exception):
+    """Raised when an uploaded PDF is over PDF_MAX_BYTES or PDF_MAX_PAGES"""
+
+def check_pdf_size(size):
+    """Reject a PDF before any work is done on it if it is over PDF_MAX_BYTES"""
+    if PDF_MAX_BYTES and size > PDF_MAX_BYTES:
+        raise PdfLimitError(f"PDF is {size} bytes; the limit is {PDF_MAX_BYTES} bytes.")
+
+def check_pdf_page_count(page_count):
+    if PDF_MAX_PAGES and page_count > PDF_MAX_PAGES:
+        raise PdfLimitError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}.")
+
+def select_pdf_engine():
+    """The PDF engine to use: PDF_EXTRACTION_ENGINE, or pypdfium2 when it is installed"""
+    if PDF_EXTRACTION_ENGINE != "auto":
+        return PDF_EXTRACTION_ENGINE
+    # pdfminer is never picked automatically: it copes better with some
+    # unusual layouts but is slower than PyPDF2. find_spec checks for
+    # pypdfium2 without paying for the import
+    if importlib.util.find_spec("pypdfium2") is not None:
+        return "pypdfium2"
+    return "pypdf2"
+
+def pages_to_read(page_count, page_numbers, split_from):
+    """page_numbers, or every page after checking the page cap; None for a document of split_from pages or more"""
+    if page_numbers is not None:
+        return page_numbers
+    check_pdf_page_count(page_count)
+    if split_from is not None and page_count >= split_from:
+        return None
+    return range(page_count)
+
+def read_pdf_pages(engine, pdf_file, page_numbers=None, split_from=None):
+    """Return (page_count, page texts) for page_numbers, or every page after checking the page cap.
+    
+    With split_from, a document of that many pages or more is only counted
+    and its texts are None, so its pages can be split across processes.
+    """
+    if engine == "pypdfium2":
+        import pypdfium2
+        document = pypdfium2.PdfDocument(pdf_file)
+        try:
+            page_count = len(document)
+            page_numbers = pages_to_read(page_count, page_numbers, split_from)
+            if page_numbers is None:
+                return page_count, None
+            texts = []
+            for page_number in page_numbers:
+                page = document[page_number]
+                text_page = page.get_textpage()
+                # pdfium ends lines with \r\n; the other engines use \n
+                texts.append(text_page.get_text_range().replace('\r\n', '\n'))
+                text_page.close()
+                page.close()
+            return page_count, texts
+        finally:
+            document.close()
+    
+    if engine == "pdfminer":
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        # The document is parsed once; page contents are only read when interpreted
+        pages = list(PDFPage.get_pages(pdf_file))
+        page_count = len(pages)
+        page_numbers = pages_to_read(page_count, page_numbers, split_from)
+        if page_numbers is None:
+            return page_count, None
+        resource_manager = PDFResourceManager()
+        texts = []
+        for page_number in page_numbers:
+            output = io.StringIO()
+            device = TextConverter(resource_manager, output, laparams=LAParams())
+            PDFPageInterpreter(resource_manager, device).process_page(pages[page_number])
+            device.close()
+            texts.append(output.getvalue())
+        return page_count, texts
+    
+    if engine == "pypdf2":
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        page_count = len(pdf_reader.pages)
+        page_numbers = pages_to_read(page_count, page_numbers, split_from)
+        if page_numbers is None:
+            return page_count, None
+        return page_count, [pdf_reader.pages[page_number].extract_text() for page_number in page_numbers]
+    
+    raise ValueError(f"Unknown PDF extraction engine '{engine}'")
+
+def extract_pdf_page_range(engine, pdf_bytes, start, stop):
+    """Worker-process entry point: texts of pages start..stop-1"""
+    return read_pdf_pages(engine, io.BytesIO(pdf_bytes), range(start, stop))[1]
+
+# Page-level parallelism runs in a process pool (every engine holds the GIL
+# or, for pdfium, is not thread-safe), created on first use in each worker
+# and created again if one of its processes dies
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACTION_WORKERS)
+    return _pdf_pool
+
+def reset_pdf_pool(broken_pool):
+    """Drop a pool with a dead process, so get_pdf_pool creates a new one"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is broken_pool:
+            _pdf_pool = None
+    broken_pool.shutdown(wait=False)
+
+def extract_pages_in_pool(engine, pdf_bytes, page_count):
+    """Texts of every page, read in one contiguous range of pages per pool process"""
+    pages_per_worker = -(-page_count // PDF_EXTRACTION_WORKERS)
+    for attempt in range(2):
+        pool = get_pdf_pool()
+        try:
+            futures = [pool.submit(extract_pdf_page_range, engine, pdf_bytes, start,
+                                   min(start + pages_per_worker, page_count))
+                       for start in range(0, page_count, pages_per_worker)]
+            return [text for future in futures for text in future.result()]
+        except BrokenProcessPool:
+            # The PDF may be what killed the process, so it only gets one
+            # more try, but the next upload gets a new pool either way
+            reset_pdf_pool(pool)
+            if attempt == 1:
+                raise
+
+def extract_text_from_pdf(pdf_file):
+    """Extract text content from an uploaded PDF (a seekable file object or bytes)"""
+    if isinstance(pdf_file, bytes):
+        # BytesIO shares the buffer with the bytes object rather than copying it
+        pdf_file = io.BytesIO(pdf_file)
+    
+    # Enforce the byte cap from the stream's size without reading it
+    pdf_file.seek(0, os.SEEK_END)
+    check_pdf_size(pdf_file.tell())
+    pdf_file.seek(0)
+    
+    engine = select_pdf_engine()
+    try:
+        # Typical resumes are a page or two, which is quicker to read
+        # in-process from the document opened to count them. Longer ones
+        # only have their pages counted here and are split across the pool
+        split_from = PDF_PARALLEL_MIN_PAGES if PDF_EXTRACTION_WORKERS > 1 else None
+        page_count, texts = read_pdf_pages(engine, pdf_file, split_from=split_from)
+        if texts is None:
+            pdf_file.seek(0)
+            texts = extract_pages_in_pool(engine, pdf_file.read(), page_count)
+        
+        # Join once instead of concatenating page by page
+        return ''.join(texts)
+    except PdfLimitError:
+        raise
     except Exception as e:
         print(f"Error extracting PDF text: {str(e)}")
         raise Exception("Could not extract text from the PDF. Please ensure it's a valid PDF file.")
 
-def analyze_resume_comprehensively(resume_text, job_description):
-    """Comprehensive resume analysis using multiple NLP techniques"""
-    # Process texts with spaCy for better entity recognition
-    resume_doc = nlp(resume_text)
-    job_doc = nlp(job_description)
+def analyze_resume_comprehensively(resume_text, job_description, job_profile=None, resume_entities=None, timings=None,
+                                   semantic_similarity=None):
+    """Comprehensive resume analysis using multiple NLP techniques.
+    
+    Every derived fact is computed exactly once. Pass a dict as timings to
+    get the time spent in each stage, in milliseconds.
+    """
+    # The resume and job description halves are cached separately, so a new
+    # resume against a known job description only pays for the resume half.
+    # Batch analysis passes both in precomputed.
+    if job_profile is None:
+        with timed_stage(timings, 'job_profile'):
+            job_profile = cached_job_profile(job_description)
     
     # 1. Extract skills, experience, education and other entities
-    resume_entities = extract_entities(resume_doc)
-    job_entities = extract_entities(job_doc)
+    # (spaCy gives us better entity recognition). Only the resume is parsed:
+    # no output field depends on entities from the job description.
+    if resume_entities is None:
+        with timed_stage(timings, 'entities'):
+            resume_entities = cached('resume_entities', entity_cache_key(resume_text),
+                                     lambda: extract_resume_entities(resume_text))
+    
+    # Structured resume: sections, bullets, date ranges, skills and education,
+    # cached like the entities so it is built once per resume
+    with timed_stage(timings, 'resume_ir'):
+        resume_ir = cached('resume_ir', content_hash(resume_text, f"ir:{RESUME_IR_VERSION}"),
+                           lambda: build_resume_ir(resume_text))
+    
+    # Lowercased text and keyword hits shared by the stages below
+    with timed_stage(timings, 'resume_context'):
+        resume_context = build_resume_context(resume_text)
     
     # 2. Extract technical skills and domain-specific keywords
-    job_keywords = extract_keywords_by_domain(job_description)
+    job_keywords = job_profile['keywords']
     
     # 3. Find matched and missing keywords with context awareness
-    matched_keywords, missing_keywords = find_keyword_matches(resume_text.lower(), job_keywords)
+    with timed_stage(timings, 'keyword_matching'):
+        matched_keywords, missing_keywords = find_keyword_matches(
+            resume_context['text_lower'], job_keywords, resume_context['keyword_bits'], resume_context['taxonomy'])
     
     # 4. Calculate overall match score
-    match_score = calculate_match_score(matched_keywords, missing_keywords)
-    
-    # 5. Extract experience level requirements
-    experience_requirements = extract_experience_requirements(job_description)
-    
-    # 6. Extract education requirements
-    education_requirements = extract_education_requirements(job_description)
-    
-    # 7. Generate personalized suggestions
-    suggestions = generate_personalized_suggestions(
-        matched_keywords, 
-        missing_keywords, 
-        resume_text, 
-        job_description,
-        resume_entities,
-        job_entities,
-        experience_requirements,
-        education_requirements
-    )
-    
-    # 8. Extract key sections that might be missing in the resume
-    missing_sections = identify_missing_sections(resume_text)
-    
-    return {
+    with timed_stage(timings, 'match_score'):
+        match_score = calculate_match_score(matched_keywords, missing_keywords)
+    
+    # Blend in the TF-IDF similarity, if enabled (batch analysis passes it in)
+    if SIMILARITY_WEIGHT > 0:
+        if semantic_similarity is None:
+            with timed_stage(timings, 'similarity'):
+                semantic_similarity = similarity_scores(job_description, [resume_text])[0]
+        match_score = blend_match_score(match_score, semantic_similarity)
+    
+    # 5. Check experience level requirements
+    experience_requirements = job_profile['experience_requirements']
+    with timed_stage(timings, 'experience_match'):
+        experience_match = check_experience_match(resume_ir, experience_requirements)
+    
+    # 6. Check education requirements
+    education_requirements = job_profile['education_requirements']
+    with timed_stage(timings, 'education_match'):
+        # Lines of the education section, or spaCy's education sentences when the resume has no such section
+        education_entries = resume_ir['education'] or resume_entities.get('education', [])
+        education_match = check_education_match(education_entries, education_requirements)
+    
+    # 7. Extract key sections that might be missing in the resume
+    with timed_stage(timings, 'missing_sections'):
+        missing_sections = identify_missing_sections(resume_text, resume_ir['sections'])
+    
+    # 8. Generate personalized suggestions from the facts above
+    with timed_stage(timings, 'suggestions'):
+        suggestions = generate_personalized_suggestions(
+            matched_keywords,
+            missing_keywords,
+            resume_context,
+            experience_requirements,
+            education_requirements,
+            experience_match,
+            education_match,
+            missing_sections
+        )
+    
+    analysis_result = {
         'matched_keywords': matched_keywords,
         'missing_keywords': missing_keywords,
         'match_score': match_score,
         'suggestions': suggestions,
         'missing_sections': missing_sections,
-        'experience_match': check_experience_match(resume_text, experience_requirements),
-        'education_match': check_education_match(resume_entities.get('education', []), education_requirements)
+        'experience_match': experience_match,
+        'education_match': education_match
+    }
+    if semantic_similarity is not None:
+        analysis_result['semantic_similarity'] = round(semantic_similarity, 4)
+    
+    return analysis_result
+
+def analyze_with_timings(resume_text, job_description, job_profile=None):
+    """Analysis pool entry point: the analysis and its stage timings, which can't be shared across processes"""
+    timings = {}
+    analysis_result = analyze_resume_comprehensively(resume_text, job_description, job_profile, timings=timings)
+    return analysis_result, timings
+
+@contextmanager
+def timed_stage(timings, stage):
+    """Add the time spent in the block to timings[stage] (in ms), if timings is a dict"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + (time.perf_counter() - start) * 1000
+
+def build_resume_context(resume_text):
+    """Facts about the resume text shared by every analysis stage"""
+    taxonomy = get_taxonomy()
+    text_lower = resume_text.lower()
+    # One pass over the resume covers every indexed keyword and synonym
+    _, word_hits = taxonomy.scan(text_lower)
+    return {
+        'text': resume_text,
+        'text_lower': text_lower,
+        # The keyword bits are only meaningful with the taxonomy they were made with
+        'taxonomy': taxonomy,
+        'keyword_bits': taxonomy.resume_keyword_bits(word_hits)
+    }
+
+def analyze_resumes_batch(resume_texts, job_description, job_profile=None):
+    """Analyze many resumes against one job description, computing the job side once.
+    
+    Results are yielded in input order as soon as each resume is done.
+    """
+    if job_profile is None:
+        job_profile = cached_job_profile(job_description)
+    
+    # Only resumes without cached entities go through spaCy, and only their uncached blocks
+    entity_keys = [entity_cache_key(resume_text) for resume_text in resume_texts]
+    resume_entities = [cache_get('resume_entities', key) for key in entity_keys]
+    uncached_entities = iter_resume_entities(
+        [resume_texts[i] for i, entities in enumerate(resume_entities) if entities is None])
+    
+    # Similarity of every resume to the job description in one sparse matrix product
+    if SIMILARITY_WEIGHT > 0:
+        similarities = similarity_scores(job_description, resume_texts)
+    else:
+        similarities = [None] * len(resume_texts)
+    
+    for resume_text, entity_key, entities, semantic_similarity in zip(resume_texts, entity_keys, resume_entities,
+                                                                      similarities):
+        timings = {}
+        if entities is None:
+            # Entities come back in the same order as the uncached resumes went in
+            with timed_stage(timings, 'entities'):
+                entities = next(uncached_entities)
+            cache_put('resume_entities', entity_key, entities)
+        analysis_result = analyze_resume_comprehensively(resume_text, job_description, job_profile, entities, timings,
+                                                         semantic_similarity)
+        observe_stage_timings(timings)
+        yield analysis_result
+
+def pipe_documents(texts, n_resumes):
+    """Run texts (the blocks of n_resumes resumes) through spaCy in batches, using several processes for large batches"""
+    # Starting worker processes only pays off once there are a few batches of resumes to share
+    n_process = SPACY_N_PROCESS if n_resumes >= SPACY_BATCH_SIZE * 2 else 1
+    return get_nlp().pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=n_process)
+
+def split_entity_blocks(resume_text):
+    """The resume as blocks of whole lines, which join back into it (see ENTITY_BLOCK_LINES)"""
+    blocks = []
+    block = []
+    for line in resume_text.splitlines(keepends=True):
+        if block and classify_section_header(line.lower()) is not None:
+            blocks.append(''.join(block))
+            block = []
+        block.append(line)
+        if zlib.crc32(line.encode('utf-8')) % ENTITY_BLOCK_LINES == 0:
+            blocks.append(''.join(block))
+            block = []
+    if block:
+        blocks.append(''.join(block))
+    # An empty resume is still parsed once, so its entities have every key
+    return blocks or [resume_text]
+
+def iter_resume_entities(resume_texts):
+    """extract_entities of each resume, in order, parsing only the blocks that aren't cached yet"""
+    resume_blocks = [split_entity_blocks(resume_text) for resume_text in resume_texts]
+    block_keys = [[entity_cache_key(block) for block in blocks] for blocks in resume_blocks]
+    block_entities = [[cache_get('entity_blocks', key) for key in keys] for keys in block_keys]
+    docs = pipe_documents([block for blocks, entities in zip(resume_blocks, block_entities)
+                           for block, cached_entities in zip(blocks, entities) if cached_entities is None],
+                          len(resume_texts))
+    
+    for keys, entities in zip(block_keys, block_entities):
+        for i, key in enumerate(keys):
+            if entities[i] is None:
+                # Docs come back in the same order as the uncached blocks went in
+                entities[i] = extract_entities(next(docs))
+                cache_put('entity_blocks', key, entities[i])
+        yield merge_entities(entities)
+
+def extract_resume_entities(resume_text):
+    """extract_entities of one resume, parsing only the blocks that aren't cached yet"""
+    return next(iter_resume_entities([resume_text]))
+
+def merge_entities(block_entities):
+    """One resume's entities from those of its blocks, without duplicates"""
+    merged = {}
+    for entities in block_entities:
+        for key, values in entities.items():
+            unique = merged.setdefault(key, {})
+            for value in values:
+                # Skills are told apart regardless of case, as extract_entities does
+                unique.setdefault(value.lower() if key == 'skills' else value, value)
+    return {key: list(unique.values()) for key, unique in merged.items()}
+
+def rank_analysis_results(results):
+    """Order results by match score, best first, and number them"""
+    ranked = sorted(results, key=lambda result: result['match_score'], reverse=True)
+    for rank, result in enumerate(ranked, start=1):
+        result['rank'] = rank
+    return ranked
+
+def cached_job_profile(job_description):
+    """build_job_profile through the cache, which keeps one profile per job description and taxonomy"""
+    return cached('job_profile', content_hash(job_description, get_taxonomy().fingerprint),
+                  lambda: build_job_profile(job_description))
+
+def build_job_profile(job_description):
+    """Everything derived from the job description alone"""
+    return {
+        'keywords': extract_keywords_by_domain(job_description),
+        'domain_scores': count_domain_keywords(scan_keywords(job_description.lower())[0]),
+        'experience_requirements': extract_experience_requirements(job_description),
+        'education_requirements': extract_education_requirements(job_description)
     }
 
 def extract_entities(doc):
@@ -134,7 +1078,9 @@ def extract_entities(doc):
     # Extract entities from the document
     for ent in doc.ents:
         if ent.label_ == "ORG":
-            entities['companies'].append(ent.text)
+            # A section header at the start of a text often passes for an organisation
+            if classify_section_header(ent.text.lower()) is None:
+                entities['companies'].append(ent.text)
         elif ent.label_ == "PRODUCT" or ent.label_ == "WORK_OF_ART":
             # These often contain technical skills or tools
             if len(ent.text) > 3 and ent.text.lower() not in [s.lower() for s in entities['skills']]:
@@ -147,11 +1093,12 @@ def extract_entities(doc):
     for sent in edu_sentences:
         entities['education'].append(sent.text.strip())
     
-    # Look for job titles
+    # Look for job titles (noun chunks need the parser, which senter mode skips)
     job_title_patterns = ["engineer", "developer", "manager", "director", "specialist", "analyst", "consultant", "designer"]
-    for chunk in doc.noun_chunks:
-        if any(title in chunk.text.lower() for title in job_title_patterns) and len(chunk.text) < 50:
-            entities['job_titles'].append(chunk.text.strip())
+    if doc.has_annotation("DEP"):
+        for chunk in doc.noun_chunks:
+            if any(title in chunk.text.lower() for title in job_title_patterns) and len(chunk.text) < 50:
+                entities['job_titles'].append(chunk.text.strip())
     
     # Deduplicate lists
     for key in entities:
@@ -159,102 +1106,92 @@ def extract_entities(doc):
     
     return entities
 
+# The keyword tables (domain keywords, common skills, synonyms and education
+# terms) live in taxonomy.json, compiled and hot-reloaded by taxonomy.py
+JOB_EXPERIENCE_PATTERN = re.compile(r'(\d+)\s*(?:\+\s*)?years?\s+(?:of\s+)?experience')
+
+def scan_keywords(text):
+    """Find every indexed keyword in text with a single pass: (substring_hits, word_hits)"""
+    return get_taxonomy().scan(text)
+
+# Soft skills (and synonyms) count half as much as technical keywords, and a
+# technical keyword listed by n domains is discounted to 1 / (1 + 0.25 * (n - 1))
+SOFT_SKILL_WEIGHT = 0.5
+SHARED_KEYWORD_DISCOUNT = 0.25
+REQUIREMENT_WEIGHT = 1.0
+
+# Each taxonomy's weight table is built once per process by get_keyword_weights()
+_keyword_weights_lock = threading.Lock()
+
+def compute_keyword_weights(taxonomy, job_keyword_sets=()):
+    """Weight of every keyword id, optionally scaled by how rare each keyword is across past job descriptions"""
+    import numpy as np
+
+    other_keyword_id = taxonomy.other_keyword_id
+    domain_counts = np.zeros(other_keyword_id + 1)
+    for keywords in taxonomy.domain_keywords.values():
+        domain_counts[[taxonomy.keyword_ids[keyword] for keyword in set(keywords)]] += 1
+
+    weights = np.full(other_keyword_id + 1, SOFT_SKILL_WEIGHT)
+    technical = domain_counts > 0
+    weights[technical] = 1 / (1 + SHARED_KEYWORD_DISCOUNT * (domain_counts[technical] - 1))
+    weights[other_keyword_id] = REQUIREMENT_WEIGHT
+
+    if job_keyword_sets:
+        # Smoothed inverse document frequency, scaled to average 1 so rarity
+        # reorders keywords without changing the overall weight
+        document_counts = np.zeros(other_keyword_id)
+        for keywords in job_keyword_sets:
+            ids = [taxonomy.keyword_ids[keyword] for keyword in set(keywords) if keyword in taxonomy.keyword_ids]
+            document_counts[ids] += 1
+        rarity = np.log((1 + len(job_keyword_sets)) / (1 + document_counts)) + 1
+        weights[:other_keyword_id] *= rarity / rarity.mean()
+
+    return weights.astype(np.float32)
+
+def load_keyword_weights(path, taxonomy):
+    """The weight table written by fit_keyword_weights.py, or the default one if there is no such file"""
+    import numpy as np
+
+    weights = compute_keyword_weights(taxonomy)
+    if os.path.exists(path):
+        with np.load(path) as table:
+            vocabulary = table['vocabulary'].tolist()
+            stored_weights = table['weights']
+        # Keywords added since the table was built keep their default weight
+        for keyword, weight in zip(vocabulary, stored_weights[:-1]):
+            if keyword in taxonomy.keyword_ids:
+                weights[taxonomy.keyword_ids[keyword]] = weight
+        weights[taxonomy.other_keyword_id] = stored_weights[-1]
+
+    # The fingerprint goes into cache keys, so scores from another table are never reused
+    return {'weights': weights, 'fingerprint': content_hash(weights.tobytes())[:16]}
+
+def get_keyword_weights(taxonomy=None):
+    """Return the keyword weight table for a taxonomy (by default the current one), loading it on first use"""
+    if taxonomy is None:
+        taxonomy = get_taxonomy()
+    if taxonomy.keyword_weights is None:
+        with _keyword_weights_lock:
+            if taxonomy.keyword_weights is None:
+                taxonomy.keyword_weights = load_keyword_weights(KEYWORD_WEIGHTS_PATH, taxonomy)
+    return taxonomy.keyword_weights
+
 def extract_keywords_by_domain(text):
     """Extract relevant keywords by domain from text"""
-    # Define domains and their associated keywords
-    domains = {
-        'software_development': [
-            "python", "javascript", "java", "c++", "c#", "ruby", "php", "swift", "kotlin", "typescript", 
-            "react", "angular", "vue", "node", "django", "flask", "spring", "express", "laravel", 
-            "html", "css", "sass", "less", "bootstrap", "tailwind", "material-ui", "responsive design",
-            "restful api", "graphql", "soap", "microservices", "monolith", "serverless", 
-            "git", "svn", "github", "gitlab", "bitbucket", "ci/cd", "jenkins", "travis", "circle ci",
-            "agile", "scrum", "kanban", "waterfall", "jira", "confluence", "trello", "asana",
-            "oop", "functional programming", "design patterns", "solid principles", "mvc", "mvvm",
-            "tdd", "bdd", "unit testing", "integration testing", "end-to-end testing", "jest", "pytest", "junit",
-            "debugging", "refactoring", "code review", "pair programming", "technical documentation"
-        ],
-        'data_science': [
-            "python", "r", "sql", "tableau", "power bi", "excel", "pandas", "numpy", "scipy", "matplotlib", 
-            "seaborn", "scikit-learn", "tensorflow", "keras", "pytorch", "machine learning", "deep learning", 
-            "neural networks", "nlp", "computer vision", "time series analysis", "regression", "classification", 
-            "clustering", "dimensionality reduction", "feature engineering", "data cleaning", "data visualization", 
-            "statistics", "probability", "hypothesis testing", "a/b testing", "etl", "big data", "hadoop", 
-            "spark", "kafka", "airflow", "data warehouse", "data lake", "data mining", "predictive modeling",
-            "forecasting", "anomaly detection", "recommendation systems", "reinforcement learning"
-        ],
-        'marketing': [
-            "digital marketing", "content marketing", "seo", "sem", "ppc", "google ads", "facebook ads", 
-            "social media marketing", "email marketing", "affiliate marketing", "influencer marketing", 
-            "brand management", "market research", "customer segmentation", "customer journey", "sales funnel", 
-            "conversion rate optimization", "analytics", "google analytics", "facebook pixel", "utm parameters", 
-            "a/b testing", "copywriting", "content strategy", "editorial calendar", "blogging", "lead generation", 
-            "marketing automation", "hubspot", "mailchimp", "constant contact", "marketo", "hootsuite", "buffer", 
-            "canva", "adobe creative suite", "video marketing", "podcast marketing", "public relations"
-        ],
-        'finance': [
-            "accounting", "bookkeeping", "financial analysis", "financial modeling", "financial reporting", 
-            "budgeting", "forecasting", "variance analysis", "cost accounting", "tax preparation", "audit", 
-            "compliance", "risk management", "financial statements", "balance sheet", "income statement", 
-            "cash flow statement", "ratio analysis", "liquidity", "solvency", "profitability", "quickbooks", 
-            "xero", "sage", "sap", "oracle financials", "microsoft dynamics", "excel", "pivot tables", 
-            "vlookup", "macros", "investment analysis", "portfolio management", "equity valuation", 
-            "discounted cash flow", "capital budgeting", "wacc", "banking", "lending", "underwriting"
-        ],
-        'healthcare': [
-            "patient care", "clinical experience", "medical terminology", "electronic health records", "ehr", 
-            "epic", "cerner", "meditech", "allscripts", "icd-10", "cpt coding", "hipaa", "patient safety", 
-            "quality improvement", "care coordination", "case management", "discharge planning", "medication administration", 
-            "vital signs", "assessment", "treatment planning", "patient education", "infection control", 
-            "sterilization", "medical equipment", "diagnostic procedures", "therapeutic procedures", "rehabilitation", 
-            "acute care", "primary care", "specialty care", "emergency care", "telehealth", "medical research", 
-            "clinical trials", "healthcare compliance", "healthcare policy", "healthcare administration", "billing", "coding"
-        ],
-        'education': [
-            "curriculum development", "lesson planning", "classroom management", "student assessment", 
-            "differentiated instruction", "special education", "individualized education plan", "iep", 
-            "learning management system", "lms", "canvas", "blackboard", "google classroom", "educational technology", 
-            "e-learning", "blended learning", "remote teaching", "formative assessment", "summative assessment", 
-            "rubrics", "student engagement", "behavior management", "parent communication", "student advising", 
-            "educational psychology", "child development", "adolescent development", "group facilitation", 
-            "project-based learning", "inquiry-based learning", "cooperative learning", "bloom's taxonomy", 
-            "universal design for learning", "udl", "common core standards", "state standards", "accreditation"
-        ],
-        'project_management': [
-            "project planning", "project scheduling", "project execution", "project monitoring", "project closing", 
-            "scope management", "time management", "cost management", "quality management", "resource management", 
-            "risk management", "communication management", "stakeholder management", "procurement management", 
-            "pmp", "prince2", "agile", "scrum", "kanban", "waterfall", "hybrid", "ms project", "primavera", 
-            "jira", "asana", "trello", "basecamp", "gantt charts", "pert charts", "wbs", "critical path method", 
-            "earned value management", "kpis", "project governance", "project documentation", "status reporting", 
-            "issue resolution", "change management", "benefits realization", "lessons learned", "project portfolio management"
-        ],
-        'customer_service': [
-            "customer support", "client relations", "call center", "help desk", "technical support", 
-            "customer retention", "customer satisfaction", "customer experience", "complaint resolution", 
-            "conflict resolution", "de-escalation", "active listening", "empathy", "patience", "communication skills", 
-            "problem-solving", "product knowledge", "service recovery", "crm", "salesforce", "zendesk", 
-            "freshdesk", "live chat", "ticketing system", "phone etiquette", "email communication", 
-            "social media support", "customer feedback", "customer surveys", "nps", "csat", "first call resolution", 
-            "average handle time", "quality assurance", "service level agreements", "sla", "customer onboarding"
-        ],
-        # Add more domains as needed
-    }
+    taxonomy = get_taxonomy()
     
     # Process the text
     processed_text = text.lower()
     
+    # Find all indexed keywords in one pass over the text
+    substring_hits, word_hits = taxonomy.scan(processed_text)
+    
     # Find all domain-specific keywords in the text
     found_keywords = []
     
     # First, try to detect which domain the job is most related to
-    domain_counts = {}
-    for domain, keywords in domains.items():
-        count = 0
-        for keyword in keywords:
-            if keyword in processed_text:
-                count += 1
-        domain_counts[domain] = count
+    domain_counts = count_domain_keywords(substring_hits, taxonomy)
     
     # Sort domains by relevance
     sorted_domains = sorted(domain_counts.items(), key=lambda x: x[1], reverse=True)
@@ -263,100 +1200,98 @@ def extract_keywords_by_domain(text):
     primary_domains = [domain for domain, count in sorted_domains[:3] if count > 0]
     
     for domain in primary_domains:
-        for keyword in domains[domain]:
-            # Use regex to find whole word matches only
-            if re.search(r'\b' + re.escape(keyword) + r'\b', processed_text):
+        for keyword in taxonomy.domain_keywords[domain]:
+            # Whole word matches only
+            if keyword in word_hits:
                 found_keywords.append(keyword)
     
     # Add common skills across all fields
-    common_skills = [
-        "leadership", "teamwork", "communication", "written communication", "verbal communication",
-        "presentation skills", "public speaking", "interpersonal skills", "problem solving",
-        "critical thinking", "analytical skills", "detail oriented", "organization",
-        "time management", "multitasking", "prioritization", "decision making",
-        "adaptability", "flexibility", "creativity", "innovation"
-    ]
-    
-    for skill in common_skills:
-        if re.search(r'\b' + re.escape(skill) + r'\b', processed_text):
+    for skill in taxonomy.common_skills:
+        if skill in word_hits:
             found_keywords.append(skill)
     
     # Extract experience requirements (e.g., "5+ years")
-    experience_matches = re.findall(r'(\d+)\s*(?:\+\s*)?years?\s+(?:of\s+)?experience', processed_text)
+    experience_matches = JOB_EXPERIENCE_PATTERN.findall(processed_text)
     if experience_matches:
         years = max([int(y) for y in experience_matches])
         found_keywords.append(f"{years}+ years experience")
     
     # Extract education requirements
-    education_patterns = [
-        r"bachelor'?s degree", r"master'?s degree", r"phd", r"doctoral degree", 
-        r"high school diploma", r"associate'?s degree", r"certificate"
-    ]
-    
-    for pattern in education_patterns:
-        if re.search(pattern, processed_text):
-            match = re.search(pattern, processed_text).group(0)
-            found_keywords.append(match)
+    for pattern in taxonomy.education_requirement_patterns:
+        match = pattern.search(processed_text)
+        if match:
+            found_keywords.append(match.group(0))
     
-    # Remove duplicates
-    found_keywords = list(set(found_keywords))
+    # Remove duplicates (a keyword listed by several domains), keeping the order found
+    found_keywords = list(dict.fromkeys(found_keywords))
     
     return found_keywords
 
-def find_keyword_matches(resume_text, job_keywords):
+def count_domain_keywords(substring_hits, taxonomy=None):
+    """How many of each domain's keywords appear in the text"""
+    if taxonomy is None:
+        taxonomy = get_taxonomy()
+    return {domain: sum(1 for keyword in keywords if keyword in substring_hits)
+            for domain, keywords in taxonomy.domain_keywords.items()}
+
+def find_keyword_matches(resume_text, job_keywords, resume_bits=None, taxonomy=None):
     """Find matched and missing keywords with context awareness"""
+    # resume_bits must come from the same taxonomy, as keyword ids differ between taxonomies
+    if taxonomy is None:
+        taxonomy = get_taxonomy()
     matched = []
     missing = []
     
+    # One pass over the resume covers every indexed keyword and synonym
+    if resume_bits is None:
+        _, word_hits = taxonomy.scan(resume_text)
+        resume_bits = taxonomy.resume_keyword_bits(word_hits)
+    
+    # Indexed keywords are matched with one bitwise AND
+    matched_bits = taxonomy.keyword_bits(job_keywords) & resume_bits
+    
     for keyword in job_keywords:
-        # Use regex for more accurate matching (whole word match)
-        if re.search(r'\b' + re.escape(keyword.lower()) + r'\b', resume_text):
+        keyword_id = taxonomy.keyword_ids.get(keyword)
+        if keyword_id is not None:
+            found = matched_bits >> keyword_id & 1
+        else:
+            # Keywords outside the index (e.g. "5+ years experience") use a direct whole word match
+            found = re.search(r'\b' + re.escape(keyword.lower()) + r'\b', resume_text) is not None
+        
+        if found:
             matched.append(keyword)
         else:
-            # Check for potential synonyms or related terms
-            if is_synonym_present(keyword, resume_text):
-                matched.append(keyword)
-            else:
-                missing.append(keyword)
+            missing.append(keyword)
     
     return matched, missing
 
-def is_synonym_present(keyword, text):
-    """Check if a synonym of the keyword is present in the text"""
-    # Dictionary of common synonyms in professional contexts
-    synonyms = {
-        "develop": ["code", "program", "engineer", "implement", "build"],
-        "analyze": ["examine", "investigate", "assess", "evaluate", "review"],
-        "manage": ["oversee", "supervise", "direct", "lead", "coordinate"],
-        "communication": ["interpersonal", "articulate", "verbal", "present", "write"],
-        "problem solving": ["troubleshoot", "debug", "resolve", "solution"],
-        "leadership": ["guide", "direct", "mentor", "influence"],
-        "teamwork": ["collaboration", "cooperative", "cross-functional"],
-        # Add more as needed
-    }
-    
-    # Check if keyword is in our synonym dictionary
-    if keyword.lower() in synonyms:
-        for synonym in synonyms[keyword.lower()]:
-            if re.search(r'\b' + re.escape(synonym.lower()) + r'\b', text):
-                return True
-    
-    return False
+def similarity_scores(job_description, resume_texts):
+    """Cosine similarity of each resume to the job description under the TF-IDF model"""
+    vectorizer = get_tfidf_model()['vectorizer']
+    # Rows are L2-normalised, so one sparse matrix product gives every cosine similarity
+    resume_matrix = vectorizer.transform(resume_texts)
+    job_vector = vectorizer.transform([job_description])
+    return (resume_matrix @ job_vector.T).toarray().ravel().tolist()
+
+def blend_match_score(keyword_score, semantic_similarity):
+    """Weighted mix of the keyword match score and the TF-IDF similarity (0-1), on the same 0-100 scale"""
+    return round((1 - SIMILARITY_WEIGHT) * keyword_score + SIMILARITY_WEIGHT * semantic_similarity * 100)
 
 def calculate_match_score(matched_keywords, missing_keywords):
-    """Calculate overall match score based on matched and missing keywords"""
+    """Calculate overall match score: the share of the job's keyword weight the resume matches"""
     total_keywords = len(matched_keywords) + len(missing_keywords)
     if total_keywords == 0:
         return 0
     
-    # Base score from percentage of matched keywords
-    base_score = (len(matched_keywords) / total_keywords) * 100
+    if MATCH_SCORING != "weighted":
+        return round((len(matched_keywords) / total_keywords) * 100)
     
-    # Weight some keywords higher than others (e.g., technical skills might be more important)
-    # This is a simplified implementation - a real system would have a more nuanced approach
-    weighted_score = base_score
+    # A single array lookup for all the keywords, so weighting costs microseconds
+    taxonomy = get_taxonomy()
+    weights = get_keyword_weights(taxonomy)['weights'][taxonomy.ids(matched_keywords + missing_keywords)]
+    matched_weight = weights[:len(matched_keywords)].sum()
     
-    return round(weighted_score)
+    return round(float(matched_weight / weights.sum()) * 100)
 
 def extract_experience_requirements(job_description):
     """Extract experience requirements from job description"""
@@ -374,8 +1309,10 @@ def extract_experience_requirements(job_description):
         r'at\s+least\s+(\d+)[\+]?\s+years?\s+(?:of\s+)?experience'
     ]
     
+    job_description_lower = job_description.lower()
+    
     for pattern in experience_patterns:
-        matches = re.findall(pattern, job_description.lower())
+        matches = re.findall(pattern, job_description_lower)
         if matches:
             # Convert all matches to integers and find the maximum
             years = max([int(y) for y in matches])
@@ -386,6 +1323,8 @@ def extract_experience_requirements(job_description):
     
     return experience_info
 
+SENTENCE_END_PATTERN = re.compile(r'[.!?]')
+
 def extract_education_requirements(job_description):
     """Extract education requirements from job description"""
     education_info = {
@@ -394,40 +1333,61 @@ def extract_education_requirements(job_description):
         'description': ''
     }
     
-    # Define education levels from highest to lowest
-    education_levels = {
-        'phd': ['phd', 'doctorate', 'doctoral degree'],
-        'masters': ['master', 'ms', 'ma', 'msc', 'mba', 'master\'s'],
-        'bachelors': ['bachelor', 'bs', 'ba', 'bsc', 'bachelor\'s', 'undergraduate degree'],
-        'associates': ['associate', 'as', 'aa', 'associate\'s', 'associate degree'],
-        'certificate': ['certificate', 'certification', 'diploma'],
-        'high school': ['high school', 'hs', 'high school diploma', 'ged']
-    }
-    
-    job_description_lower = job_description.lower()
-    
     # Find the highest level of education mentioned
-    for level, terms in education_levels.items():
-        for term in terms:
-            if re.search(r'\b' + re.escape(term) + r'\b', job_description_lower):
-                education_info['level'] = level
-                education_info['has_requirement'] = True
-                
-                # Extract the full context
-                pattern = r'[^.!?]*\b' + re.escape(term) + r'\b[^.!?]*[.!?]'
-                context_matches = re.findall(pattern, job_description_lower)
-                
-                if context_matches:
-                    education_info['description'] = context_matches[0].strip()
-                else:
-                    education_info['description'] = f"{level.capitalize()} degree required"
-                
-                # Return after finding the highest level
-                return education_info
+    job_description_lower = job_description.lower()
+    education = get_taxonomy().education_job_classifier.classify(job_description_lower)
+    if education is None:
+        return education_info
+    
+    level, (start, end) = education
+    education_info['level'] = level
+    education_info['has_requirement'] = True
+    
+    # The full sentence the level is mentioned in, when it has an end
+    sentence_end = SENTENCE_END_PATTERN.search(job_description_lower, end)
+    if sentence_end:
+        sentence_start = max(job_description_lower.rfind(mark, 0, start) for mark in '.!?') + 1
+        education_info['description'] = job_description_lower[sentence_start:sentence_end.end()].strip()
+    else:
+        education_info['description'] = f"{level.capitalize()} degree required"
     
     return education_info
 
-def check_experience_match(resume_text, experience_requirements):
+def date_range_months(date_range, current_month):
+    """A date range as [start, end) in months since year 0, or None if it isn't a plausible range"""
+    start_year, start_month = date_range['start']
+    start = start_year * 12 + (start_month or 1) - 1
+    if date_range['end'] is None:
+        # Running to the present includes this month
+        end = current_month + 1
+    else:
+        end_year, end_month = date_range['end']
+        # "Jan 2016 - Mar 2016" includes March; "2016 - 2018" is two years, as the years alone say
+        end = end_year * 12 + end_month if end_month else end_year * 12
+    if start_year < EARLIEST_YEAR or start >= end or end > current_month + 1:
+        return None
+    return start, end
+
+def experience_timeline(date_ranges, today=None):
+    """Total and longest continuous experience, in months, over date ranges that may overlap"""
+    today = today or datetime.date.today()
+    current_month = today.year * 12 + today.month - 1
+    intervals = sorted(filter(None, (date_range_months(date_range, current_month) for date_range in date_ranges)))
+    
+    # Merge overlapping and back-to-back ranges, so concurrent roles count once
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    
+    return {
+        'total_months': sum(end - start for start, end in merged),
+        'longest_months': max((end - start for start, end in merged), default=0)
+    }
+
+def check_experience_match(resume_ir, experience_requirements):
     """Check if resume appears to meet experience requirements"""
     if not experience_requirements['has_requirement']:
         return {
@@ -438,70 +1398,40 @@ def check_experience_match(resume_text, experience_requirements):
     
     required_years = experience_requirements['years']
     
-    # Look for experience mentions in resume
-    experience_patterns = [
-        r'(\d+)[\+]?\s+years?\s+(?:of\s+)?experience',
-        r'(\d{4})\s*[-–]\s*(?:present|current|now|\d{4})',  # Date ranges like 2018-present
-        r'(\d{4})\s*[-–]\s*(\d{4})'  # Date ranges like 2018-2022
-    ]
+    # Date ranges from the experience section, or from anywhere in a resume
+    # without an experience header (so study years don't count as experience)
+    date_ranges = resume_ir['date_ranges']
+    if 'experience' in resume_ir['sections']['spans']:
+        date_ranges = [date_range for date_range in date_ranges if date_range['section'] == 'experience']
+    timeline = experience_timeline(date_ranges)
+    total_years = round(timeline['total_months'] / 12, 1)
+    longest_years = round(timeline['longest_months'] / 12, 1)
     
-    years_mentioned = []
-    date_ranges = []
-    
-    for pattern in experience_patterns:
-        if pattern.endswith('experience'):
-            # Direct mentions of years of experience
-            matches = re.findall(pattern, resume_text.lower())
-            if matches:
-                years_mentioned.extend([int(y) for y in matches])
-        else:
-            # Date ranges
-            matches = re.findall(pattern, resume_text)
-            if matches:
-                for match in matches:
-                    if isinstance(match, tuple):
-                        if len(match) == 2 and match[1].lower() in ['present', 'current', 'now']:
-                            # Calculate years from start year to current year
-                            import datetime
-                            current_year = datetime.datetime.now().year
-                            start_year = int(match[0])
-                            if start_year <= current_year:
-                                years = current_year - start_year
-                                date_ranges.append(years)
-                        elif len(match) == 2:
-                            # Calculate range between two years
-                            start_year = int(match[0])
-                            end_year = int(match[1])
-                            if start_year <= end_year:
-                                years = end_year - start_year
-                                date_ranges.append(years)
-    
-    # Determine longest continuous experience
-    max_years = 0
-    if years_mentioned:
-        max_years = max(years_mentioned)
-    if date_ranges:
-        max_years = max(max_years, max(date_ranges))
+    # Total experience across every role, or what the resume states outright if that is more
+    years = max([total_years] + resume_ir['experience_years'])
     
     # Determine if experience matches requirement
-    if max_years >= required_years:
-        return {
+    if years >= required_years:
+        experience_match = {
             'match': True,
             'confidence': 'high',
-            'message': f'Resume indicates {max_years} years of experience, meeting the requirement of {required_years}+ years'
+            'message': f'Resume indicates {years:g} years of experience, meeting the requirement of {required_years}+ years'
         }
-    elif max_years > 0:
-        return {
+    elif years > 0:
+        experience_match = {
             'match': False,
             'confidence': 'medium',
-            'message': f'Resume indicates {max_years} years of experience, which is less than the required {required_years}+ years'
+            'message': f'Resume indicates {years:g} years of experience, which is less than the required {required_years}+ years'
         }
     else:
-        return {
+        experience_match = {
             'match': False,
             'confidence': 'low',
             'message': f'Could not determine years of experience from resume. Job requires {required_years}+ years'
         }
+    experience_match['total_years'] = total_years
+    experience_match['longest_continuous_years'] = longest_years
+    return experience_match
 
 def check_education_match(education_entities, education_requirements):
     """Check if resume appears to meet education requirements"""
@@ -513,41 +1443,17 @@ def check_education_match(education_entities, education_requirements):
         }
     
     required_level = education_requirements['level']
+    taxonomy = get_taxonomy()
     
-    # Education level hierarchy for comparison
-    education_hierarchy = {
-        'phd': 5,
-        'masters': 4,
-        'bachelors': 3,
-        'associates': 2,
-        'certificate': 1,
-        'high school': 0
-    }
+    # Education level hierarchy for comparison: the lowest level is 0
+    education_hierarchy = {level: value for value, level in enumerate(reversed(taxonomy.education_levels))}
     
     required_value = education_hierarchy.get(required_level, 0)
     
-    # Check education entities for matches
-    education_keywords = {
-        'phd': ['phd', 'doctorate', 'doctoral'],
-        'masters': ['master', 'ms', 'ma', 'msc', 'mba'],
-        'bachelors': ['bachelor', 'bs', 'ba', 'bsc', 'undergraduate'],
-        'associates': ['associate', 'as', 'aa'],
-        'certificate': ['certificate', 'certification', 'diploma'],
-        'high school': ['high school', 'hs', 'ged']
-    }
-    
-    # Find the highest education level in the resume
-    highest_level = 'none'
-    highest_value = -1
-    
-    for entity in education_entities:
-        entity_lower = entity.lower()
-        for level, keywords in education_keywords.items():
-            if any(keyword in entity_lower for keyword in keywords):
-                level_value = education_hierarchy.get(level, 0)
-                if level_value > highest_value:
-                    highest_level = level
-                    highest_value = level_value
+    # Find the highest education level in the resume, over all its education entities at once
+    education = taxonomy.education_resume_classifier.classify('\n'.join(education_entities).lower())
+    highest_level = education[0] if education else 'none'
+    highest_value = education_hierarchy.get(highest_level, -1)
     
     # Compare resume education with requirements
     if highest_value >= required_value:
@@ -569,9 +1475,10 @@ def check_education_match(education_entities, education_requirements):
             'message': f'Could not determine education level from resume. Job requires {required_level.capitalize()} level'
         }
 
-def generate_personalized_suggestions(matched_keywords, missing_keywords, resume_text, job_description, resume_entities, job_entities, experience_req, education_req):
+def generate_personalized_suggestions(matched_keywords, missing_keywords, resume_context, experience_req, education_req, experience_match, education_match, missing_sections):
     """Generate personalized suggestions based on comprehensive analysis"""
     suggestions = []
+    resume_text_lower = resume_context['text_lower']
     
     # Suggestion 1: Missing keywords
     if missing_keywords:
@@ -581,32 +1488,27 @@ def generate_personalized_suggestions(matched_keywords, missing_keywords, resume
             suggestions.append(f"Add these critical keywords to your resume: {', '.join(missing_keywords)}.")
     
     # Suggestion 2: Experience match
-    if experience_req['has_requirement']:
-        exp_check = check_experience_match(resume_text, experience_req)
-        if not exp_check['match']:
-            suggestions.append(f"Highlight your experience more clearly. This job requires {experience_req['years']}+ years of experience.")
+    if experience_req['has_requirement'] and not experience_match['match']:
+        suggestions.append(f"Highlight your experience more clearly. This job requires {experience_req['years']}+ years of experience.")
     
     # Suggestion 3: Education match
-    if education_req['has_requirement']:
-        edu_check = check_education_match(resume_entities.get('education', []), education_req)
-        if not edu_check['match']:
-            suggestions.append(f"Ensure your education section clearly shows your {education_req['level'].capitalize()} degree.")
+    if education_req['has_requirement'] and not education_match['match']:
+        suggestions.append(f"Ensure your education section clearly shows your {education_req['level'].capitalize()} degree.")
     
     # Suggestion 4: Skills section
     if len(missing_keywords) > 0:
         suggestions.append("Create a dedicated 'Skills' section that highlights your technical and soft skills using keywords from the job description.")
     
     # Suggestion 5: Quantifiable achievements
-    if "achiev" not in resume_text.lower() and "accomplish" not in resume_text.lower():
+    if "achiev" not in resume_text_lower and "accomplish" not in resume_text_lower:
         suggestions.append("Add quantifiable achievements to demonstrate the impact of your work (e.g., 'increased efficiency by 20%').")
     
     # Suggestion 6: Action verbs
     action_verbs = ["implemented", "developed", "managed", "created", "designed", "coordinated", "analyzed", "resolved"]
-    if not any(verb in resume_text.lower() for verb in action_verbs):
+    if not any(verb in resume_text_lower for verb in action_verbs):
         suggestions.append("Use strong action verbs at the beginning of your bullet points (e.g., 'Implemented', 'Developed', 'Managed').")
     
     # Suggestion 7: Missing sections check
-    missing_sections = identify_missing_sections(resume_text)
     if missing_sections:
         suggestions.append(f"Add these important sections to your resume: {', '.join(missing_sections)}.")
     
@@ -622,47 +1524,168 @@ def generate_personalized_suggestions(matched_keywords, missing_keywords, resume
     
     return suggestions
 
-def identify_missing_sections(resume_text):
-    """Identify important sections that might be missing from the resume"""
-    # Define important sections to check for
-    important_sections = [
-        "education", 
-        "experience", 
-        "work experience", 
-        "professional experience",
-        "skills", 
-        "technical skills",
-        "projects",
-        "certifications", 
-        "achievements"
-    ]
-    
-    # Check which sections are missing
-    missing_sections = []
-    for section in important_sections:
-        # Check for section headers (common formatting)
-        patterns = [
-            r'\b' + re.escape(section) + r'\b\s*:',  # "Education:" format
-            r'\b' + re.escape(section) + r'\b\s*$',  # "Education" at end of line
-            r'^\s*\b' + re.escape(section) + r'\b',  # "Education" at start of line
-            r'[^a-zA-Z]' + re.escape(section) + r'[^a-zA-Z]'  # Section surrounded by non-letters
-        ]
-        
-        if not any(re.search(pattern, resume_text, re.IGNORECASE | re.MULTILINE) for pattern in patterns):
-            # For simplicity, group related sections
-            if section in ["experience", "work experience", "professional experience"]:
-                if "experience" not in missing_sections:
-                    missing_sections.append("Experience")
-            elif section in ["skills", "technical skills"]:
-                if "Skills" not in missing_sections:
-                    missing_sections.append("Skills")
-            else:
-                missing_sections.append(section.capitalize())
-    
-    # Remove duplicates due to grouping
-    missing_sections = list(set(missing_sections))
+# Section header lines, by what they read once lowercased and stripped of
+# bullets, a trailing colon and extra spaces, and the section each one starts
+SECTION_HEADERS = {}
+for section, headers in {
+    'summary': ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"],
+    'experience': ["experience", "work experience", "professional experience", "relevant experience",
+                   "employment", "employment history", "work history", "career history"],
+    'education': ["education", "academic background", "education and training", "academic qualifications"],
+    'skills': ["skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "skills and abilities"],
+    'projects': ["projects", "personal projects", "key projects", "selected projects", "academic projects"],
+    'certifications': ["certifications", "certificates", "licenses and certifications", "certifications and licenses"],
+    'achievements': ["achievements", "key achievements", "accomplishments", "awards", "honors",
+                     "awards and honors", "honors and awards"],
+    'publications': ["publications"],
+    'volunteering': ["volunteering", "volunteer experience", "volunteer work"],
+    'languages': ["languages"],
+    'interests': ["interests", "hobbies", "hobbies and interests"],
+    'references': ["references"]
+}.items():
+    SECTION_HEADERS.update(dict.fromkeys(headers, section))
+
+# Longer lines are never headers
+SECTION_HEADER_MAX_LENGTH = 40
+SECTION_HEADER_STRIP = " \t#*-•·▪●>|"
+
+# Sections every resume should have. A section counts as present when it has a
+# header line or its name appears anywhere as a word ("5 years of experience")
+IMPORTANT_SECTIONS = ["education", "experience", "skills", "projects", "certifications", "achievements"]
+SECTION_NAME_PATTERN = re.compile(r'(?<![a-z])(' + '|'.join(IMPORTANT_SECTIONS) + r')(?![a-z])')
+
+def classify_section_header(line_lower):
+    """The section a lowercased line starts, or None if it isn't a section header"""
+    # "Skills: Python, SQL" starts a section too
+    header = line_lower.split(':', 1)[0].strip(SECTION_HEADER_STRIP)
+    if not header or len(header) > SECTION_HEADER_MAX_LENGTH:
+        return None
+    return SECTION_HEADERS.get(' '.join(header.replace('&', 'and').split()))
+
+# Bump whenever build_resume_ir's output changes, so cached representations are rebuilt
+RESUME_IR_VERSION = 2
+
+BULLET_PATTERN = re.compile(r'\s*(?:[•·▪●◦‣*>-]|\d{1,2}[.)])\s+')
+MONTHS = {'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+          'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'sept': 9,
+          'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12}
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+def _date_pattern(name):
+    """A year, optionally after a month name ("Jan 2016", "March 2018") or number ("03/2018")"""
+    return rf'(?:(?P<{name}_month_name>{MONTH_NAMES})\.?\s+|(?P<{name}_month>\d{{1,2}})\s*/\s*)?(?P<{name}_year>\d{{4}})'
+
+# Every kind of date range in one pattern: "2016 - 2020", "Jan 2016 – Mar 2020",
+# "03/2018 to present", so a line is searched once whatever the format
+DATE_RANGE_PATTERN = re.compile(r'\b' + _date_pattern('start') + r'\s*(?:[-–—]|to|until)\s*(?:'
+                                + _date_pattern('end') + r'|(?P<present>present|current|now|today))\b')
+# Most lines have no range, and this rules them out much faster than the full pattern
+DATE_RANGE_HINT = re.compile(r'\d{4}\s*(?:[-–—]|to|until)')
+
+# Years outside this range are phone numbers, ids and the like
+EARLIEST_YEAR = 1950
+
+def _match_date(match, name):
+    """[year, month] of one end of a DATE_RANGE_PATTERN match, month None when only the year is given"""
+    year = int(match.group(f'{name}_year'))
+    month_name = match.group(f'{name}_month_name')
+    month = MONTHS[month_name] if month_name else match.group(f'{name}_month')
+    month = int(month) if month is not None else None
+    if month is not None and not 1 <= month <= 12:
+        return None
+    return [year, month]
+
+RESUME_EXPERIENCE_PATTERN = re.compile(r'(\d+)[\+]?\s+years?\s+(?:of\s+)?experience')
+SKILL_SEPARATOR_PATTERN = re.compile(r'[,;|•·▪●]')
+
+# Longer items in a skills section are sentences rather than skills
+SKILL_MAX_LENGTH = 40
+
+def build_resume_ir(resume_text):
+    """Structured representation of a resume, built in a single line-by-line pass.
+    
+    It is plain JSON, so it is cached by the resume's content hash and reused
+    by every later analysis of the same resume:
+    
+    - sections: the sections present, in order of first appearance, and the
+      character spans of each section with a header line, from its header to
+      the next header or the end of the text
+    - bullets: character spans of bullet point lines
+    - date_ranges: date ranges ("2016 - 2020", "Jan 2016 - Mar 2020",
+      "03/2018 - present") as [year, month] pairs, month None when only the
+      year is given and end None for "present", and the section each is in
+    - experience_years: the numbers in "5 years of experience" and the like
+    - skills: the items listed in skills sections
+    - education: the lines of education sections
+    """
+    present = {}
+    headers = []
+    bullets = []
+    date_ranges = []
+    experience_years = []
+    skills = {}
+    education = []
+    section = None
+    offset = 0
+    for line in resume_text.splitlines(keepends=True):
+        line_lower = line.lower()
+        content = line
+        header = classify_section_header(line_lower)
+        if header is not None:
+            section = header
+            headers.append((section, offset))
+            present[section] = True
+            # Whatever follows "Skills:" on the header line belongs to the section
+            content = line.split(':', 1)[1] if ':' in line else ''
+        else:
+            bullet = BULLET_PATTERN.match(line)
+            if bullet:
+                bullets.append([offset, offset + len(line.rstrip('\r\n'))])
+                content = line[bullet.end():]
+        
+        for match in SECTION_NAME_PATTERN.finditer(line_lower):
+            present[match.group(1)] = True
+        date_matches = DATE_RANGE_PATTERN.finditer(line_lower) if DATE_RANGE_HINT.search(line_lower) else ()
+        for match in date_matches:
+            start = _match_date(match, 'start')
+            end = None if match.group('present') else _match_date(match, 'end')
+            if start is None or (end is None and not match.group('present')):
+                continue
+            date_ranges.append({'start': start, 'end': end, 'span': [offset + match.start(), offset + match.end()],
+                                'section': section})
+        experience_years.extend(int(years) for years in RESUME_EXPERIENCE_PATTERN.findall(line_lower))
+        
+        content = content.strip()
+        if content and section == 'skills':
+            for item in SKILL_SEPARATOR_PATTERN.split(content):
+                item = item.strip(SECTION_HEADER_STRIP + '.')
+                if item and len(item) <= SKILL_MAX_LENGTH:
+                    skills.setdefault(item.lower(), item)
+        elif content and section == 'education':
+            education.append(content)
+        offset += len(line)
+    
+    spans = {}
+    for index, (section, start) in enumerate(headers):
+        end = headers[index + 1][1] if index + 1 < len(headers) else len(resume_text)
+        spans.setdefault(section, []).append([start, end])
     
-    return missing_sections
+    return {
+        'sections': {'present': list(present), 'spans': spans},
+        'bullets': bullets,
+        'date_ranges': date_ranges,
+        'experience_years': experience_years,
+        'skills': list(skills.values()),
+        'education': education
+    }
+
+def identify_missing_sections(resume_text, sections=None):
+    """Identify important sections that might be missing from the resume"""
+    if sections is None:
+        sections = build_resume_ir(resume_text)['sections']
+    return [section.capitalize() for section in IMPORTANT_SECTIONS if section not in sections['present']]
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
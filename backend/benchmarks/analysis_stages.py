@@ -0,0 +1,55 @@
+"""Per-stage timing breakdown of analyze_resume_comprehensively.
+
+Every stage now runs exactly once per request. Before the single-pass
+restructuring, the experience check, the education check and the missing
+section scan each ran twice (once for the suggestions and once for the
+response), and the resume was lowercased several times; the last line
+shows how much time per request the repeated stages cost.
+
+The analysis cache is disabled so every request does the full work. Run
+from the backend directory:
+
+    python benchmarks/analysis_stages.py [--requests 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ANALYSIS_CACHE_MAX_BYTES"] = "0"
+
+import app
+from spacy_pipeline import JOB_DESCRIPTION, make_resume
+
+# Stages the old code computed a second time inside the suggestions step
+PREVIOUSLY_REPEATED = ["experience_match", "education_match", "missing_sections"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="number of simulated requests")
+    args = parser.parse_args()
+
+    resumes = [make_resume(1 + i % 3) for i in range(args.requests)]
+
+    # Warm up the model and the keyword index
+    app.analyze_resume_comprehensively(resumes[0], JOB_DESCRIPTION)
+
+    stage_timings = {}
+    for resume_text in resumes:
+        timings = {}
+        app.analyze_resume_comprehensively(resume_text, JOB_DESCRIPTION, timings=timings)
+        for stage, elapsed in timings.items():
+            stage_timings.setdefault(stage, []).append(elapsed)
+
+    total = sum(statistics.mean(values) for values in stage_timings.values())
+    for stage, values in stage_timings.items():
+        mean = statistics.mean(values)
+        print(f"{stage:<18} {mean:8.3f} ms  {mean / total * 100:5.1f}%")
+    print(f"{'total':<18} {total:8.3f} ms")
+
+    repeated = sum(statistics.mean(stage_timings[stage]) for stage in PREVIOUSLY_REPEATED)
+    print(f"\nsaved per request by no longer repeating {', '.join(PREVIOUSLY_REPEATED)}: {repeated:.3f} ms")
+
+if __name__ == "__main__":
+    main()
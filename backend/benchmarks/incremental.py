@@ -0,0 +1,69 @@
+"""Re-analysis latency after small edits: POST /analyze/incremental vs a full analysis.
+
+Analyzes each resume of the synthetic benchmark corpus once in full, then
+applies a series of one-line edits through POST /analyze/incremental, so only
+the blocks around each edit go through spaCy again. Reports the median
+latency of both per resume size. Uses a fresh cache directory. Run from the
+backend directory:
+
+    python benchmarks/incremental.py [--edits 10] [--seed 0]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ANALYSIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="incremental-benchmark-")
+
+import app
+# The suite turns the cache off for the processes it starts, after app has read its settings
+from suite import build_corpus, resume_job_pairs
+
+def post(client, body):
+    """Latency of one POST /analyze/incremental in milliseconds, and its analysis_id"""
+    start = time.perf_counter()
+    response = client.post('/analyze/incremental', json=body)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f"/analyze/incremental returned {response.status_code}: {response.get_data(as_text=True)}")
+    return elapsed, response.get_json()['analysis_id']
+
+def line_edit(rng, text):
+    """An edit rewriting a random line of text, as POST /analyze/incremental takes it"""
+    starts = [0] + [index + 1 for index, char in enumerate(text) if char == '\n']
+    line = rng.randrange(len(starts) - 1)
+    start, end = starts[line], starts[line + 1] - 1
+    return {'start': start, 'end': end, 'text': text[start:end] + f" Led a migration that cut costs by {rng.randint(5, 60)}%."}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edits", type=int, default=10, help="edits applied to each resume")
+    parser.add_argument("--seed", type=int, default=0, help="corpus and edit seed")
+    args = parser.parse_args()
+
+    app.preload_models()
+    client = app.app.test_client()
+    rng = random.Random(args.seed)
+    full, incremental = {}, {}
+    for resume, job_description in resume_job_pairs(*build_corpus(args.seed)):
+        text = resume["text"]
+        elapsed, analysis_id = post(client, {'resume_text': text, 'jobDescription': job_description})
+        full.setdefault(resume["pages"], []).append(elapsed)
+        for _ in range(args.edits):
+            edit = line_edit(rng, text)
+            elapsed, analysis_id = post(client, {'analysis_id': analysis_id, 'edits': [edit]})
+            incremental.setdefault(resume["pages"], []).append(elapsed)
+            text = text[:edit['start']] + edit['text'] + text[edit['end']:]
+
+    print(f"{'pages':>5}  {'full p50 ms':>12}  {'edit p50 ms':>12}  {'speedup':>8}")
+    for pages in sorted(full):
+        full_p50 = statistics.median(full[pages])
+        edit_p50 = statistics.median(incremental[pages])
+        print(f"{pages:>5}  {full_p50:>12.1f}  {edit_p50:>12.1f}  {full_p50 / edit_p50:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
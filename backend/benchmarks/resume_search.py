@@ -0,0 +1,68 @@
+"""Reverse search latency of the resume index over a synthetic corpus.
+
+Builds an index of synthetic resumes (each a random sample of the indexed
+keywords) in a temporary file, then times scoring a job description's
+keywords against the whole corpus, plus adding and removing one resume.
+Run from the backend directory:
+
+    python benchmarks/resume_search.py [--resumes 50000] [--searches 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["RESUME_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "resume_index.sqlite3")
+
+import app
+import resume_index
+from spacy_pipeline import JOB_DESCRIPTION
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=50000, help="number of resumes in the corpus")
+    parser.add_argument("--keywords", type=int, default=40, help="keywords per synthetic resume")
+    parser.add_argument("--searches", type=int, default=50, help="number of timed searches")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    taxonomy = app.get_taxonomy()
+    vocabulary = taxonomy.vocabulary
+    keywords_per_resume = min(args.keywords, len(vocabulary))
+
+    start = time.perf_counter()
+    resume_index.add_resumes([(f"resume-{i}", rng.sample(vocabulary, keywords_per_resume), {})
+                              for i in range(args.resumes)])
+    build_seconds = time.perf_counter() - start
+    print(f"Indexed {args.resumes} resumes in {build_seconds:.1f} s "
+          f"({os.path.getsize(resume_index.RESUME_INDEX_PATH) / 1024 / 1024:.1f} MB on disk)")
+
+    job_keywords = [keyword.lower() for keyword in app.build_job_profile(JOB_DESCRIPTION.lower())['keywords']
+                    if keyword.lower() in taxonomy.keyword_ids]
+
+    # The first search decodes the postings; later ones reuse them
+    start = time.perf_counter()
+    resume_index.search_resumes(job_keywords)
+    print(f"First search ({len(job_keywords)} keywords): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    timings = []
+    for _ in range(args.searches):
+        start = time.perf_counter()
+        resume_index.search_resumes(job_keywords)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"Search: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
+
+    start = time.perf_counter()
+    resume_index.add_resumes([("resume-new", rng.sample(vocabulary, keywords_per_resume), {})])
+    print(f"Add one resume: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    resume_index.remove_resume("resume-0")
+    print(f"Remove one resume: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Per-request spaCy latency: full pipeline vs the trimmed pipelines in app.py.
+
+The "full" flow is what analyze_resume_comprehensively used to do: run the
+complete en_core_web_sm pipeline over both the resume and the job description.
+The trimmed flows parse only the resume with the components extract_entities
+needs, once with parser-based and once with senter-based sentence segmentation.
+
+Run from the backend directory:
+
+    python benchmarks/spacy_pipeline.py [--requests 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy
+
+import app
+
+RESUME_PARAGRAPHS = [
+    "Jane Smith\nSenior Software Engineer\njane.smith@example.com\n",
+    "Experience\nAcme Corp, Software Engineer, 2016 - 2020\n"
+    "Developed microservices in Python and Java, managed a team of five engineers "
+    "and implemented CI/CD pipelines with Jenkins and GitHub Actions.\n",
+    "Globex Inc, Senior Developer, 2020 - present\n"
+    "Designed a React and TypeScript front end, led code reviews and "
+    "improved test coverage with pytest and Jest by 40%.\n",
+    "Education\nBachelor of Science in Computer Science, State University, 2016\n",
+    "Skills\nPython, Java, JavaScript, React, Docker, Kubernetes, SQL, agile, scrum, "
+    "leadership, communication, problem solving\n",
+    "Projects\nBuilt an open source library for data visualization used by 2,000 developers.\n",
+]
+
+JOB_DESCRIPTION = (
+    "We are looking for a Senior Software Engineer with 5+ years of experience "
+    "building web applications in Python and JavaScript. Experience with React, "
+    "Django, REST APIs, Docker and CI/CD is required. A Bachelor's degree in "
+    "Computer Science or a related field is preferred. Strong communication, "
+    "teamwork and problem solving skills are essential."
+)
+
+def make_resume(repeat):
+    """Build a resume of roughly repeat pages from the sample paragraphs"""
+    return "\n".join(RESUME_PARAGRAPHS * repeat)
+
+def time_requests(run_request, resumes):
+    """Per-request latency in milliseconds for each resume"""
+    timings = []
+    for resume_text in resumes:
+        start = time.perf_counter()
+        run_request(resume_text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def full_pipeline_flow(full_nlp):
+    def run_request(resume_text):
+        app.extract_entities(full_nlp(resume_text))
+        app.extract_entities(full_nlp(JOB_DESCRIPTION))
+    return run_request
+
+def trimmed_pipeline_flow(trimmed_nlp):
+    def run_request(resume_text):
+        app.extract_entities(trimmed_nlp(resume_text))
+    return run_request
+
+def report(name, pipeline, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<10} mean {statistics.mean(timings):8.2f} ms   p50 {statistics.median(timings):8.2f} ms   "
+          f"p95 {p95:8.2f} ms   components: {', '.join(pipeline.pipe_names)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="number of simulated requests")
+    args = parser.parse_args()
+
+    resumes = [make_resume(1 + i % 3) for i in range(args.requests)]
+
+    pipelines = {"full": spacy.load(app.SPACY_MODEL)}
+    for mode in ("parser", "senter"):
+        app.SPACY_SENTENCE_SEGMENTATION = mode
+        pipelines[mode] = app.load_spacy_pipeline(app.SPACY_MODEL)
+
+    flows = {
+        "full": full_pipeline_flow(pipelines["full"]),
+        "parser": trimmed_pipeline_flow(pipelines["parser"]),
+        "senter": trimmed_pipeline_flow(pipelines["senter"]),
+    }
+
+    # Warm up every pipeline before timing
+    for run_request in flows.values():
+        run_request(resumes[0])
+
+    for name, run_request in flows.items():
+        report(name, pipelines[name], time_requests(run_request, resumes))
+
+if __name__ == "__main__":
+    main()
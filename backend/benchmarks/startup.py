@@ -0,0 +1,71 @@
+"""Startup-time budget check for the Flask backend.
+
+Imports app.py in fresh interpreters and fails (exit status 1) if the median
+import time exceeds the budget, or if importing the module loaded spaCy or
+anything that reaches for the network. Gunicorn worker boots and Azure
+Functions cold starts pay this cost before the first request.
+
+Run from the backend directory:
+
+    python benchmarks/startup.py [--budget 0.5] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds. Raise deliberately, never to paper over a regression.
+DEFAULT_BUDGET_SECONDS = 0.5
+
+# Modules that must stay out of the import path of app.py
+FORBIDDEN_MODULES = ["spacy", "nltk", "sklearn"]
+
+MEASURE_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "model_loaded": app.nlp is not None,
+    "imported": sorted(name for name in %r if name in sys.modules),
+}))
+"""
+
+def measure_import():
+    """Import app in a fresh interpreter and return its measurements"""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_IMPORT % FORBIDDEN_MODULES],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="budget in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh imports to time")
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.runs)]
+    median = statistics.median(run["seconds"] for run in runs)
+    print(f"import app: median {median * 1000:.0f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+
+    failures = []
+    if median > args.budget:
+        failures.append(f"import time {median * 1000:.0f} ms exceeds the {args.budget * 1000:.0f} ms budget")
+    if any(run["model_loaded"] for run in runs):
+        failures.append("the spaCy model was loaded at import time")
+    imported = sorted({name for run in runs for name in run["imported"]})
+    if imported:
+        failures.append(f"heavy modules imported at startup: {', '.join(imported)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
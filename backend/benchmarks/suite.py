@@ -0,0 +1,299 @@
+"""Benchmark suite over a synthetic resume and job description corpus.
+
+Generates resumes (as PDFs, from one to several pages) and job descriptions
+(short and long) for every domain in the skills taxonomy, then times the
+analysis functions one by one and /analyze end to end through the Flask test
+client. Each benchmark runs in a fresh process, so its peak RSS is its own.
+Reports p50/p95 latency, throughput and peak RSS, and compares them with a
+stored baseline: any figure worse than the baseline by more than the
+tolerance fails the run (exit status 1).
+
+The analysis cache is disabled so every call does the full work. Record a
+baseline on a known good commit, then compare later runs on the same machine
+against it. Run from the backend directory:
+
+    python benchmarks/suite.py --save-baseline
+    python benchmarks/suite.py [--rounds 3] [--only find_keyword_matches] [--tolerance 0.25]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["ANALYSIS_CACHE_MAX_BYTES"] = "0"
+
+import app
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Resume sizes in pages. The largest one goes through parallel PDF extraction
+RESUME_PAGES = [1, 3, 8]
+
+# Job description sizes in sentences
+JOB_DESCRIPTION_SENTENCES = {"short": 5, "long": 25}
+
+LINES_PER_PAGE = 55
+LINE_WIDTH = 90
+
+# Fraction by which a figure may be worse than the baseline before the run fails
+DEFAULT_TOLERANCE = 0.25
+
+# Figures compared with the baseline, and whether a higher value is worse
+COMPARED_FIGURES = {"p50_ms": True, "p95_ms": True, "throughput_per_s": False, "peak_rss_mb": True}
+
+FILLER_SENTENCES = [
+    "Worked closely with stakeholders to deliver {0} and {1} on schedule.",
+    "Responsible for {0}, {1} and day to day {2} across the team.",
+    "Improved {0} by introducing {1}, cutting turnaround time by 30%.",
+    "Mentored junior colleagues in {0} and led weekly reviews of {1}.",
+    "Owned the roadmap for {0} while supporting {1} and {2}.",
+]
+
+JOB_SENTENCES = [
+    "You will be responsible for {0} and {1}.",
+    "Experience with {0}, {1} and {2} is required.",
+    "Familiarity with {0} is a plus.",
+    "The role involves {0} alongside a team focused on {1}.",
+    "Strong {0} and {1} skills are essential.",
+]
+
+def wrap(text, width=LINE_WIDTH):
+    """Split text into lines of at most width characters"""
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def make_resume_lines(rng, domain, keywords, pages):
+    """Lines of a synthetic resume of about pages pages for domain"""
+    sample = lambda count: rng.sample(keywords, min(count, len(keywords)))
+    lines = ["Alex Morgan", f"Senior {domain.replace('_', ' ').title()} Specialist", "alex.morgan@example.com", "",
+             "Summary"]
+    lines += wrap(f"Professional with a background in {', '.join(sample(4))}.")
+    lines += ["", "Skills"] + wrap(", ".join(sample(15)))
+    lines += ["", "Education", "Bachelor of Science, State University, 2012", "", "Experience"]
+
+    year = 2024
+    while len(lines) < pages * LINES_PER_PAGE - 4:
+        lines += ["", f"Company {len(lines)}, Specialist, {year - 3} - {year}"]
+        for _ in range(4):
+            lines += wrap(rng.choice(FILLER_SENTENCES).format(*sample(3)))
+        year -= 3
+
+    lines += ["", "Projects"] + wrap(f"Built an internal tool for {', '.join(sample(2))} used by 200 people.")
+    return lines
+
+def make_job_description(rng, domain, keywords, sentences):
+    """A synthetic job description of about sentences sentences for domain"""
+    sample = lambda count: rng.sample(keywords, min(count, len(keywords)))
+    text = [f"We are hiring a {domain.replace('_', ' ')} specialist with {rng.randint(2, 8)}+ years of experience."]
+    text += [rng.choice(JOB_SENTENCES).format(*sample(3)) for _ in range(sentences - 2)]
+    text.append("A Bachelor's degree or equivalent experience is required.")
+    return " ".join(text)
+
+def escape_pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(lines):
+    """A minimal PDF with lines of Helvetica text, LINES_PER_PAGE to a page"""
+    pages = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+                   " ".join(f"{4 + 2 * index} 0 R" for index in range(len(pages))), len(pages)),
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for page_lines in pages:
+        content = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(
+            f"({escape_pdf_text(line)}) '" for line in page_lines) + " ET"
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Contents {len(objects) + 2} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer << /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+def build_corpus(seed):
+    """Resumes (PDF bytes and text) and job descriptions for every taxonomy domain and size"""
+    rng = random.Random(seed)
+    taxonomy = app.get_taxonomy()
+    resumes, job_descriptions = [], []
+    for domain, keywords in sorted(taxonomy.domain_keywords.items()):
+        keywords = keywords + taxonomy.common_skills
+        for pages in RESUME_PAGES:
+            lines = make_resume_lines(rng, domain, keywords, pages)
+            resumes.append({"domain": domain, "pages": pages, "pdf": make_pdf(lines), "text": "\n".join(lines)})
+        for size, sentences in JOB_DESCRIPTION_SENTENCES.items():
+            job_descriptions.append({"domain": domain, "size": size,
+                                     "text": make_job_description(rng, domain, keywords, sentences)})
+    return resumes, job_descriptions
+
+def resume_job_pairs(resumes, job_descriptions):
+    """Each resume with a job description from its own domain, alternating short and long"""
+    by_domain = {}
+    for job_description in job_descriptions:
+        by_domain.setdefault(job_description["domain"], []).append(job_description["text"])
+    return [(resume, by_domain[resume["domain"]][index % len(by_domain[resume["domain"]])])
+            for index, resume in enumerate(resumes)]
+
+# Each benchmark turns the corpus into a list of operations, one call each
+def bench_extract_text_from_pdf(resumes, job_descriptions):
+    return [lambda pdf=resume["pdf"]: app.extract_text_from_pdf(io.BytesIO(pdf)) for resume in resumes]
+
+def bench_extract_entities(resumes, job_descriptions):
+    # Includes the spaCy parse, which is where nearly all the time goes
+    return [lambda text=resume["text"]: app.extract_entities(app.get_nlp()(text)) for resume in resumes]
+
+def bench_extract_keywords_by_domain(resumes, job_descriptions):
+    return [lambda text=job_description["text"]: app.extract_keywords_by_domain(text)
+            for job_description in job_descriptions]
+
+def bench_find_keyword_matches(resumes, job_descriptions):
+    operations = []
+    for resume, job_description in resume_job_pairs(resumes, job_descriptions):
+        job_keywords = app.extract_keywords_by_domain(job_description)
+        operations.append(lambda text=resume["text"].lower(), job_keywords=job_keywords:
+                          app.find_keyword_matches(text, job_keywords))
+    return operations
+
+def bench_identify_missing_sections(resumes, job_descriptions):
+    return [lambda text=resume["text"]: app.identify_missing_sections(text) for resume in resumes]
+
+def bench_analyze_endpoint(resumes, job_descriptions):
+    client = app.app.test_client()
+
+    def post(pdf, job_description):
+        response = client.post('/analyze', data={'resume': (io.BytesIO(pdf), 'resume.pdf'),
+                                                 'jobDescription': job_description},
+                               content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    return [lambda pdf=resume["pdf"], job_description=job_description: post(pdf, job_description)
+            for resume, job_description in resume_job_pairs(resumes, job_descriptions)]
+
+BENCHMARKS = {
+    "extract_text_from_pdf": bench_extract_text_from_pdf,
+    "extract_entities": bench_extract_entities,
+    "extract_keywords_by_domain": bench_extract_keywords_by_domain,
+    "find_keyword_matches": bench_find_keyword_matches,
+    "identify_missing_sections": bench_identify_missing_sections,
+    "/analyze": bench_analyze_endpoint,
+}
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def run_benchmark(name, seed, rounds):
+    """Time every operation of one benchmark rounds times; runs in its own process"""
+    resumes, job_descriptions = build_corpus(seed)
+    operations = BENCHMARKS[name](resumes, job_descriptions)
+
+    # Warm up: loads the spaCy model, the taxonomy and the PDF workers
+    operations[0]()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for operation in operations:
+            operation_start = time.perf_counter()
+            operation()
+            latencies.append((time.perf_counter() - operation_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "operations": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def compare(results, baseline, tolerance):
+    """Descriptions of every figure worse than the baseline by more than tolerance"""
+    regressions = []
+    for name, figures in results.items():
+        expected = baseline.get("benchmarks", {}).get(name)
+        if expected is None:
+            continue
+        for figure, higher_is_worse in COMPARED_FIGURES.items():
+            if figure not in expected or not expected[figure]:
+                continue
+            ratio = figures[figure] / expected[figure]
+            if (ratio > 1 + tolerance) if higher_is_worse else (ratio < 1 / (1 + tolerance)):
+                regressions.append(f"{name} {figure} {figures[figure]} vs baseline {expected[figure]} "
+                                   f"({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3, help="times each operation is timed")
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic corpus")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="fraction by which a figure may be worse than the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<28} {'ops':>5} {'p50 ms':>9} {'p95 ms':>9} {'ops/s':>9} {'peak RSS MB':>12}")
+    for name in args.only or BENCHMARKS:
+        # A fresh process per benchmark, so peak RSS isn't inherited from the previous one
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            figures = executor.submit(run_benchmark, name, args.seed, args.rounds).result()
+        results[name] = figures
+        print(f"{name:<28} {figures['operations']:>5} {figures['p50_ms']:>9.2f} {figures['p95_ms']:>9.2f} "
+              f"{figures['throughput_per_s']:>9.1f} {figures['peak_rss_mb']:>12.1f}")
+
+    if args.save_baseline:
+        baseline = {"python": platform.python_version(), "machine": platform.platform(), "benchmarks": results}
+        if os.path.exists(args.baseline):
+            # Keep the figures of benchmarks left out of this run
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline["benchmarks"] = {**json.load(f).get("benchmarks", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with the baseline recorded on {baseline.get('machine')} "
+          f"(tolerance {args.tolerance * 100:.0f}%)")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"FAIL: {regression}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Memory per gunicorn worker with and without preload-and-fork.
+
+Starts the backend under gunicorn.conf.py twice, once with the models
+preloaded in the master (the default) and once with GUNICORN_PRELOAD=0, and
+reports each worker's unique (USS) and proportional (PSS) memory from
+/proc/<pid>/smaps_rollup. USS is what every additional worker costs; pages
+shared copy-on-write with the master only count towards PSS. Linux only.
+
+Run from the backend directory:
+
+    python benchmarks/worker_memory.py [--workers 4] [--settle 15]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def read_memory_kb(pid):
+    """Return (uss, pss) in kB for a process"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return uss, fields.get("Pss", 0)
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def wait_until_serving(port, timeout):
+    """Poll the server until it answers any HTTP request"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+            return
+        except urllib.error.HTTPError:
+            # A 404 still means a worker is up
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("gunicorn did not start serving in time")
+
+def measure(preload, workers, port, settle):
+    env = dict(os.environ, GUNICORN_PRELOAD="1" if preload else "0", WEB_CONCURRENCY=str(workers))
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_serving(port, timeout=120)
+        # Give every worker time to finish loading its models
+        time.sleep(settle)
+        worker_memory = [read_memory_kb(pid) for pid in child_pids(master.pid)]
+        master_memory = read_memory_kb(master.pid)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+    return master_memory, worker_memory
+
+def report(name, master_memory, worker_memory):
+    uss = [memory[0] for memory in worker_memory]
+    pss = [memory[1] for memory in worker_memory]
+    total_pss = master_memory[1] + sum(pss)
+    print(f"{name:<11} workers {len(worker_memory)}   per worker: USS {sum(uss) / len(uss) / 1024:7.1f} MB, "
+          f"PSS {sum(pss) / len(pss) / 1024:7.1f} MB   total PSS incl. master {total_pss / 1024:7.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--settle", type=float, default=15, help="seconds to wait for workers to load models")
+    args = parser.parse_args()
+
+    for name, preload in (("preload", True), ("no preload", False)):
+        master_memory, worker_memory = measure(preload, args.workers, args.port, args.settle)
+        report(name, master_memory, worker_memory)
+
+if __name__ == "__main__":
+    main()
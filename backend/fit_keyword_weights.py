@@ -0,0 +1,58 @@
+"""Build the keyword weight table used for the weighted match score.
+
+Counts how many past job descriptions ask for each keyword, from .txt and
+.pdf job descriptions (searched recursively) and the profiles stored by
+POST /jobs, and writes the weights to KEYWORD_WEIGHTS_PATH (default
+keyword_weights.npz). Rebuild it when the mix of jobs changes. Run from the
+backend directory:
+
+    python fit_keyword_weights.py [job_descriptions/] [--output keyword_weights.npz] [--skip-job-profiles]
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+import app
+from analysis_cache import normalize_job_description
+from fit_tfidf_model import read_corpus
+from job_profiles import JOB_PROFILE_DIR
+
+def stored_job_keywords():
+    """Keyword lists of every job profile stored by POST /jobs"""
+    keyword_sets = []
+    for path in sorted(glob.glob(os.path.join(JOB_PROFILE_DIR, '*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                keyword_sets.append(json.load(f)['profile']['keywords'])
+        except (OSError, ValueError, KeyError):
+            print(f"Skipping unreadable job profile {path}")
+    return keyword_sets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="*", help="files or directories of .txt and .pdf job descriptions")
+    parser.add_argument("--output", default=app.KEYWORD_WEIGHTS_PATH, help="where to write the table")
+    parser.add_argument("--skip-job-profiles", action="store_true", help=f"ignore profiles in {JOB_PROFILE_DIR}/")
+    args = parser.parse_args()
+
+    keyword_sets = [app.extract_keywords_by_domain(normalize_job_description(text))
+                    for text in read_corpus(args.corpus)]
+    if not args.skip_job_profiles:
+        keyword_sets.extend(stored_job_keywords())
+    if not keyword_sets:
+        parser.error("no job descriptions found")
+
+    taxonomy = app.get_taxonomy()
+    weights = app.compute_keyword_weights(taxonomy, keyword_sets)
+    # Write through a file object so numpy doesn't append .npz to the name
+    with open(args.output, 'wb') as f:
+        np.savez(f, vocabulary=np.array(taxonomy.vocabulary), weights=weights)
+
+    print(f"Counted {len(keyword_sets)} job descriptions, written to {args.output} "
+          f"(fingerprint {app.load_keyword_weights(args.output, taxonomy)['fingerprint']})")
+
+if __name__ == "__main__":
+    main()
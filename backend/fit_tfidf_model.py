@@ -0,0 +1,66 @@
+"""Fit the TF-IDF model used for semantic similarity scoring.
+
+Reads a reference corpus of resumes and job descriptions (.txt and .pdf
+files, searched recursively), fits a TF-IDF vectorizer on it and writes it
+to TFIDF_MODEL_PATH (default tfidf_model.pkl). The model only needs
+refitting when the reference corpus changes. Run from the backend directory:
+
+    python fit_tfidf_model.py corpus/ [--output tfidf_model.pkl] [--min-df 2]
+"""
+import argparse
+import os
+import pickle
+
+import app
+from analysis_cache import content_hash
+
+def read_corpus(paths):
+    """Text of every .txt and .pdf file under the given files and directories"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.extend(os.path.join(directory, name) for name in sorted(names))
+        else:
+            files.append(path)
+
+    texts = []
+    for file_path in files:
+        if file_path.endswith('.txt'):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                texts.append(f.read())
+        elif file_path.endswith('.pdf'):
+            with open(file_path, 'rb') as f:
+                texts.append(app.extract_text_from_pdf(f))
+    return texts
+
+def fit_tfidf_model(texts, min_df=2, max_features=50000):
+    """Fit the vectorizer and fingerprint it, so cached scores from another model are never reused"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # Sublinear term frequencies stop a keyword repeated many times from dominating
+    vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True, ngram_range=(1, 2),
+                                 min_df=min_df, max_features=max_features)
+    vectorizer.fit(texts)
+    return {'vectorizer': vectorizer, 'fingerprint': content_hash(pickle.dumps(vectorizer))[:16]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="+", help="files or directories of .txt and .pdf documents")
+    parser.add_argument("--output", default=app.TFIDF_MODEL_PATH, help="where to write the model")
+    parser.add_argument("--min-df", type=int, default=2, help="ignore terms in fewer documents than this")
+    parser.add_argument("--max-features", type=int, default=50000, help="vocabulary size cap")
+    args = parser.parse_args()
+
+    texts = read_corpus(args.corpus)
+    if not texts:
+        parser.error("no .txt or .pdf documents found")
+
+    model = fit_tfidf_model(texts, args.min_df, args.max_features)
+    with open(args.output, 'wb') as f:
+        pickle.dump(model, f)
+    print(f"Fitted on {len(texts)} documents, {len(model['vectorizer'].vocabulary_)} terms, "
+          f"written to {args.output} (fingerprint {model['fingerprint']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Preload-and-fork: the master imports app.py and loads the spaCy model and
+# keyword indexes once, then forks the workers, which share those pages
+# copy-on-write instead of each loading their own copy. Set
+# GUNICORN_PRELOAD=0 to have every worker load its own copy instead.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# With ANALYSIS_EXECUTOR=process the analysis runs in a process pool, so a
+# worker only receives uploads and waits: run a few workers with several
+# threads each (e.g. GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=8) and
+# let the pool use the cores
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+# Analyses of long resumes can take a while on a busy box
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+# /metrics adds up the counts of every worker from the files they write to
+# PROMETHEUS_MULTIPROC_DIR (see metrics.py). It has to be set before app.py is
+# imported, and emptied at startup so counts from an earlier run are dropped
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-multiproc-")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(path)
+
+if preload_app:
+    # Collections in the master would only create garbage and touch pages we
+    # want to share; the workers turn the collector back on after forking
+    gc.disable()
+
+def when_ready(server):
+    """Load the models in the master before any worker is forked"""
+    if not preload_app:
+        return
+
+    import app
+    app.preload_models()
+
+    # Move everything allocated so far into the permanent generation, so
+    # collections in the workers never write to (and so copy) shared pages
+    gc.freeze()
+    server.log.info("Preloaded models in the master, %d objects frozen", gc.get_freeze_count())
+
+def post_fork(server, worker):
+    gc.enable()
+
+def child_exit(server, worker):
+    import metrics
+    metrics.mark_worker_dead(worker.pid)
+
+def post_worker_init(worker):
+    """Make sure every worker has the models loaded before it takes requests"""
+    import app
+    app.preload_models()
+
+    # Fork the analysis pool now, while the worker has a single thread, so
+    # its processes inherit the loaded models
+    import analysis_pool
+    if analysis_pool.pool_enabled():
+        analysis_pool.start_analysis_pool()
+
+    # Pick up queued jobs. Jobs a worker that exited was still running are
+    # marked failed once their lease runs out (see job_queue.py)
+    import job_queue
+    job_queue.start_job_workers()
@@ -0,0 +1,70 @@
+import json
+import os
+import re
+import threading
+import time
+from analysis_cache import content_hash
+
+# Job descriptions parsed once by POST /jobs and referenced by job_id from then
+# on. Each profile is a JSON file JOB_PROFILE_DIR/<job_id>.json holding the
+# normalised job description and everything build_job_profile derives from it.
+# The id is a hash of the job description, so posting the same text twice
+# returns the same job. Unlike the analysis cache, profiles are never evicted.
+JOB_PROFILE_DIR = os.environ.get("JOB_PROFILE_DIR", "job_profiles")
+
+# Bump whenever build_job_profile's output changes. Profiles stored by an older
+# version, or against a different skills taxonomy, are rebuilt from their job
+# description the next time they are loaded
+JOB_PROFILE_VERSION = 1
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+class JobProfileNotFoundError(LookupError):
+    """Raised when a request refers to a job_id that was never created"""
+
+def job_profile_id(job_description):
+    """The job_id of a normalised job description"""
+    return content_hash('job_profile', job_description)[:32]
+
+def _profile_path(job_id):
+    return os.path.join(JOB_PROFILE_DIR, job_id + '.json')
+
+def save_job_profile(job_description, profile, taxonomy=None):
+    """Store a job description's profile, built with the taxonomy of that fingerprint, and return the stored record"""
+    job_id = job_profile_id(job_description)
+    record = {
+        'job_id': job_id,
+        'version': JOB_PROFILE_VERSION,
+        'taxonomy': taxonomy,
+        'created': time.time(),
+        'job_description': job_description,
+        'profile': profile
+    }
+
+    path = _profile_path(job_id)
+    os.makedirs(JOB_PROFILE_DIR, exist_ok=True)
+    # Write to a temporary file and rename so readers never see partial profiles
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    os.replace(temp_path, path)
+
+    return record
+
+def load_job_profile(job_id, build_profile, taxonomy=None):
+    """Return the stored record for job_id, rebuilding it with build_profile if it is out of date"""
+    # Ids are only ever hex digests; anything else can't name a profile file
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        raise JobProfileNotFoundError(f"Unknown job_id '{job_id}'")
+
+    try:
+        with open(_profile_path(job_id), 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        raise JobProfileNotFoundError(f"Unknown job_id '{job_id}'")
+
+    if record.get('version') != JOB_PROFILE_VERSION or record.get('taxonomy') != taxonomy:
+        job_description = record['job_description']
+        record = save_job_profile(job_description, build_profile(job_description), taxonomy)
+
+    return record
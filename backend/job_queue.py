@@ -0,0 +1,315 @@
+import heapq
+import itertools
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+# Submit/poll jobs for long analyses. Jobs wait in a priority queue (higher
+# priority first, then oldest first) and JOB_WORKERS threads per process run
+# them through the handler registered for their kind. JOB_QUEUE_BACKEND picks
+# the queue: "sqlite" keeps jobs in a SQLite file at JOB_QUEUE_PATH, shared by
+# every gunicorn worker on the box, so any worker can answer a poll. "memory"
+# keeps them in this process only, which suits a single worker and tests.
+JOB_QUEUE_BACKEND = os.environ.get("JOB_QUEUE_BACKEND", "sqlite")
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_PENDING = int(os.environ.get("JOB_QUEUE_MAX_PENDING", "100"))
+JOB_RESULT_TTL_SECONDS = int(os.environ.get("JOB_RESULT_TTL_SECONDS", str(60 * 60)))
+
+# A running job holds a lease, renewed by its worker every third of
+# JOB_LEASE_SECONDS through the job's updated time. A job whose lease runs out
+# was left behind by a worker that died or was recycled mid-job: the next
+# claim marks it failed, so polls for it end instead of waiting forever
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "60"))
+ORPHANED_JOB_ERROR = "The worker running this job exited before it finished. Please submit it again."
+
+# How often an idle SQLite worker looks for jobs submitted by other processes
+SQLITE_POLL_SECONDS = 0.5
+
+_lock = threading.Lock()
+_queue = None
+_handlers = {}
+_workers = []
+
+class JobQueueFullError(Exception):
+    """Raised when JOB_QUEUE_MAX_PENDING jobs are already waiting"""
+
+def public_job(job):
+    """The fields of a job that GET /analyze/jobs/<id> returns"""
+    view = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'priority': job['priority'],
+        'created': job['created'],
+        'updated': job['updated']
+    }
+    if job['status'] == 'done':
+        view['result'] = job['result']
+    elif job['status'] == 'failed':
+        view['error'] = job['error']
+    return view
+
+class InProcessJobQueue:
+    """Jobs in a heap and a dict, visible to this process only"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._jobs = {}
+        self._order = itertools.count()
+
+    def put(self, job):
+        with self._condition:
+            self._jobs[job['id']] = job
+            heapq.heappush(self._heap, (-job['priority'], next(self._order), job['id']))
+            self._condition.notify()
+
+    def claim(self, timeout):
+        with self._condition:
+            self._fail_orphaned(time.time() - JOB_LEASE_SECONDS)
+            if not self._heap:
+                self._condition.wait(timeout)
+            if not self._heap:
+                return None
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['updated'] = time.time()
+            return job
+
+    def complete(self, job_id, result=None, error=None):
+        with self._condition:
+            job = self._jobs[job_id]
+            job['status'] = 'failed' if error is not None else 'done'
+            job['result'] = result
+            job['error'] = error
+            job['updated'] = time.time()
+            # The upload is no longer needed once the job has run
+            job['payload'] = None
+
+    def renew(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] == 'running':
+                job['updated'] = time.time()
+
+    def _fail_orphaned(self, lease_expired_before):
+        for job in self._jobs.values():
+            if job['status'] == 'running' and job['updated'] < lease_expired_before:
+                job['status'] = 'failed'
+                job['error'] = ORPHANED_JOB_ERROR
+                job['updated'] = time.time()
+                job['payload'] = None
+
+    def get(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._heap)
+
+    def purge(self, finished_before):
+        with self._condition:
+            # A running job whose lease ran out that long ago is long orphaned too
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['status'] in ('done', 'failed', 'running') and job['updated'] < finished_before]:
+                del self._jobs[job_id]
+
+class SQLiteJobQueue:
+    """Jobs in a SQLite table, shared by every process using the same file"""
+
+    def __init__(self, path):
+        self._path = path
+        self._local = threading.local()
+        # Wakes this process's idle workers as soon as it submits a job
+        self._submitted = threading.Event()
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    payload BLOB,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )""")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, priority DESC, created)")
+
+    def _connect(self):
+        """One connection per thread, as sqlite3 connections can't be shared between threads"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def put(self, job):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], job['kind'], job['priority'], job['status'], pickle.dumps(job['payload']),
+                 job['created'], job['updated']))
+        self._submitted.set()
+
+    def claim(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            connection = self._connect()
+            # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, payload = NULL, updated = ? "
+                    "WHERE status = 'running' AND updated < ?", (ORPHANED_JOB_ERROR, now, now - JOB_LEASE_SECONDS))
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created LIMIT 1").fetchone()
+                if row is not None:
+                    connection.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?",
+                                       (now, row['id']))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+            if row is not None:
+                job = self._row_to_job(row)
+                job['status'] = 'running'
+                return job
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self._submitted.wait(min(remaining, SQLITE_POLL_SECONDS))
+            self._submitted.clear()
+
+    def complete(self, job_id, result=None, error=None):
+        status = 'failed' if error is not None else 'done'
+        with self._connect() as connection:
+            # The upload is no longer needed once the job has run
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, updated = ? WHERE id = ?",
+                (status, json.dumps(result), error, time.time(), job_id))
+
+    def renew(self, job_id):
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET updated = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, kind, priority, status, result, error, created, updated FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def pending_count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def purge(self, finished_before):
+        with self._connect() as connection:
+            # A running job whose lease ran out that long ago is long orphaned too
+            connection.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'running') AND updated < ?",
+                               (finished_before,))
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        if job.get('payload') is not None:
+            job['payload'] = pickle.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job.get('result') is not None else None
+        return job
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                if JOB_QUEUE_BACKEND == "memory":
+                    _queue = InProcessJobQueue()
+                elif JOB_QUEUE_BACKEND == "sqlite":
+                    _queue = SQLiteJobQueue(JOB_QUEUE_PATH)
+                else:
+                    raise ValueError(f"Unknown job queue backend '{JOB_QUEUE_BACKEND}'")
+    return _queue
+
+def register_job_handler(kind, handler):
+    """Run jobs of this kind with handler(payload), whose return value becomes the job result"""
+    _handlers[kind] = handler
+
+def submit_job(kind, payload, priority=0):
+    """Queue a job and return its id"""
+    queue = get_job_queue()
+    if queue.pending_count() >= JOB_QUEUE_MAX_PENDING:
+        raise JobQueueFullError("Too many analyses are waiting. Please try again shortly.")
+
+    now = time.time()
+    queue.purge(now - JOB_RESULT_TTL_SECONDS)
+
+    job_id = uuid.uuid4().hex
+    queue.put({
+        'id': job_id,
+        'kind': kind,
+        'priority': priority,
+        'status': 'queued',
+        'payload': payload,
+        'result': None,
+        'error': None,
+        'created': now,
+        'updated': now
+    })
+    start_job_workers()
+    return job_id
+
+def get_job(job_id):
+    """Return the public view of a job, or None if it is unknown or has expired"""
+    job = get_job_queue().get(job_id)
+    return public_job(job) if job is not None else None
+
+def run_job_worker():
+    """Take jobs off the queue and run them, forever"""
+    queue = get_job_queue()
+    while True:
+        job = queue.claim(timeout=60)
+        if job is None:
+            continue
+        finished = threading.Event()
+        threading.Thread(target=renew_job_lease, args=(queue, job['id'], finished), name="job-lease",
+                         daemon=True).start()
+        try:
+            result = _handlers[job['kind']](job['payload'])
+        except Exception as e:
+            print(f"Error running {job['kind']} job {job['id']}: {str(e)}")
+            queue.complete(job['id'], error=str(e))
+        else:
+            queue.complete(job['id'], result=result)
+        finally:
+            finished.set()
+
+def renew_job_lease(queue, job_id, finished):
+    """Keep a running job's lease until finished is set"""
+    while not finished.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            queue.renew(job_id)
+        except Exception as e:
+            print(f"Error renewing the lease of job {job_id}: {str(e)}")
+
+def start_job_workers():
+    """Start this process's JOB_WORKERS worker threads, if they aren't running yet"""
+    with _lock:
+        if _workers:
+            return
+        for _ in range(JOB_WORKERS):
+            worker = threading.Thread(target=run_job_worker, name="job-worker", daemon=True)
+            worker.start()
+            _workers.append(worker)
@@ -0,0 +1,41 @@
+import os
+from prometheus_client import CollectorRegistry, Histogram, generate_latest, multiprocess
+
+# Prometheus histograms of how long each analysis stage takes, exposed in the
+# text exposition format on /metrics. Under gunicorn every worker writes its
+# counts to files in PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py sets it up),
+# and a scrape adds up the files of all workers, past and present, whichever
+# worker answers it. Without it the counts are kept in this process's memory.
+STAGE_METRIC = "resume_analysis_stage_duration_seconds"
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Bucket upper bounds in seconds, from sub-millisecond keyword stages up to
+# slow PDF extractions
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+_registry = CollectorRegistry()
+_stage_duration = Histogram(STAGE_METRIC, "Time spent in each resume analysis stage.", ['stage'],
+                            buckets=STAGE_BUCKETS, registry=_registry)
+
+def observe_stage(stage, seconds):
+    """Record one observation of a stage's duration"""
+    _stage_duration.labels(stage=stage).observe(seconds)
+
+def observe_stage_timings(timings):
+    """Record a timings dict as produced by timed_stage (milliseconds per stage)"""
+    for stage, elapsed_ms in timings.items():
+        observe_stage(stage, elapsed_ms / 1000)
+
+def render_metrics():
+    """All histograms in the Prometheus text exposition format"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, PROMETHEUS_MULTIPROC_DIR)
+    else:
+        registry = _registry
+    return generate_latest(registry).decode('utf-8')
+
+def mark_worker_dead(pid):
+    """Drop a worker that exited from live-process gauges; its histogram counts stay in the totals"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, PROMETHEUS_MULTIPROC_DIR)
@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Reverse search: which stored resumes best match a job description. Each
+# resume's matchable keywords are kept in an inverted index (keyword -> the
+# internal ids of the resumes that match it), so a job description is scored
+# against the whole corpus by touching only the postings of its own keywords.
+# A posting list is a sorted uint32 array, delta-encoded and zlib-compressed.
+#
+# Everything lives in a SQLite file at RESUME_INDEX_PATH shared by every
+# gunicorn worker. Each process keeps decoded postings in memory and drops
+# them whenever another process has changed the index since. numpy is only
+# imported where it is used, so importing app.py stays fast.
+#
+# A resume's own keyword set is stored as a bitset over the index's keyword
+# table, which gives every keyword a bit the first time a resume has it and
+# never renumbers, so a stored resume costs a few dozen bytes of keywords.
+RESUME_INDEX_PATH = os.environ.get("RESUME_INDEX_PATH", "resume_index.sqlite3")
+
+_lock = threading.Lock()
+_local = threading.local()
+_postings_cache = {}
+_cached_generation = None
+
+def _connect():
+    """One connection per thread, as sqlite3 connections can't be shared between threads"""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = sqlite3.connect(RESUME_INDEX_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS keywords (
+                bit INTEGER PRIMARY KEY,
+                keyword TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                keyword TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+        """)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            _migrate_keyword_lists(connection)
+            connection.execute(RESUMES_TABLE.format(name='resumes'))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        _local.connection = connection
+    return connection
+
+RESUMES_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        resume_id TEXT UNIQUE NOT NULL,
+        keyword_bits BLOB NOT NULL,
+        entities TEXT NOT NULL,
+        added REAL NOT NULL
+    )"""
+
+def _migrate_keyword_lists(connection):
+    """Convert an index that stored each resume's keywords as a JSON list to keyword bitsets"""
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(resumes)")]
+    if 'keywords' not in columns:
+        return
+    connection.execute(RESUMES_TABLE.format(name='resumes_bitsets'))
+    rows = [(doc_id, resume_id, json.loads(keywords), entities, added) for doc_id, resume_id, keywords, entities, added
+            in connection.execute("SELECT doc_id, resume_id, keywords, entities, added FROM resumes")]
+    bit_numbers = _keyword_bit_numbers(connection, {keyword for row in rows for keyword in row[2]}, add=True)
+    for doc_id, resume_id, keywords, entities, added in rows:
+        connection.execute(
+            "INSERT INTO resumes_bitsets (doc_id, resume_id, keyword_bits, entities, added) VALUES (?, ?, ?, ?, ?)",
+            (doc_id, resume_id, _keywords_to_blob(bit_numbers, keywords), entities, added))
+    connection.execute("DROP TABLE resumes")
+    connection.execute("ALTER TABLE resumes_bitsets RENAME TO resumes")
+
+def _keyword_bit_numbers(connection, keywords, add=False):
+    """keyword -> bit for those of keywords in the keyword table, adding the missing ones first if add is set"""
+    if add:
+        connection.executemany("INSERT OR IGNORE INTO keywords (keyword) VALUES (?)",
+                               [(keyword,) for keyword in keywords])
+        # A big batch can name more keywords than a query takes parameters, so read the whole table
+        keywords = set(keywords)
+        return {keyword: bit for keyword, bit in connection.execute("SELECT keyword, bit FROM keywords")
+                if keyword in keywords}
+    placeholders = ','.join('?' * len(keywords))
+    return dict(connection.execute(
+        f"SELECT keyword, bit FROM keywords WHERE keyword IN ({placeholders})", list(keywords)).fetchall())
+
+def _keywords_to_blob(bit_numbers, keywords):
+    bits = 0
+    for keyword in keywords:
+        bits |= 1 << bit_numbers[keyword]
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+def _blob_to_keywords(connection, blob):
+    bits = int.from_bytes(blob, 'little')
+    bit_numbers = [bit for bit in range(bits.bit_length()) if bits >> bit & 1]
+    placeholders = ','.join('?' * len(bit_numbers))
+    return sorted(keyword for (keyword,) in connection.execute(
+        f"SELECT keyword FROM keywords WHERE bit IN ({placeholders})", bit_numbers))
+
+def encode_postings(doc_ids):
+    """Compress a sorted array of doc ids: gaps between ids, as uint32, through zlib"""
+    import numpy as np
+    deltas = np.diff(np.asarray(doc_ids, dtype=np.uint32), prepend=np.uint32(0))
+    return zlib.compress(deltas.astype(np.uint32).tobytes())
+
+def decode_postings(data):
+    """The sorted doc id array encoded by encode_postings"""
+    import numpy as np
+    return np.cumsum(np.frombuffer(zlib.decompress(data), dtype=np.uint32), dtype=np.uint32)
+
+def _load_postings(connection, keyword):
+    import numpy as np
+    row = connection.execute("SELECT data FROM postings WHERE keyword = ?", (keyword,)).fetchone()
+    return decode_postings(row[0]) if row is not None else np.empty(0, dtype=np.uint32)
+
+def _store_postings(connection, keyword, doc_ids):
+    if len(doc_ids):
+        connection.execute("INSERT OR REPLACE INTO postings (keyword, data) VALUES (?, ?)",
+                           (keyword, encode_postings(doc_ids)))
+    else:
+        connection.execute("DELETE FROM postings WHERE keyword = ?", (keyword,))
+
+def _bump_generation(connection):
+    connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+def add_resumes(resumes):
+    """Index (resume_id, keywords, entities) tuples, replacing any resume already stored under the same id"""
+    import numpy as np
+    connection = _connect()
+    with connection:
+        for resume_id, _, _ in resumes:
+            _remove_resume(connection, resume_id)
+
+        # New doc ids are always larger than existing ones, so every posting
+        # list just gets the new ids appended and stays sorted
+        new_postings = {}
+        bit_numbers = _keyword_bit_numbers(connection, {keyword for _, keywords, _ in resumes for keyword in keywords},
+                                           add=True)
+        for resume_id, keywords, entities in resumes:
+            keywords = sorted(set(keywords))
+            cursor = connection.execute(
+                "INSERT INTO resumes (resume_id, keyword_bits, entities, added) VALUES (?, ?, ?, ?)",
+                (resume_id, _keywords_to_blob(bit_numbers, keywords), json.dumps(entities), time.time()))
+            for keyword in keywords:
+                new_postings.setdefault(keyword, []).append(cursor.lastrowid)
+
+        for keyword, doc_ids in new_postings.items():
+            existing = _load_postings(connection, keyword)
+            _store_postings(connection, keyword, np.concatenate([existing, np.asarray(doc_ids, dtype=np.uint32)]))
+
+        _bump_generation(connection)
+
+def remove_resume(resume_id):
+    """Drop a resume from the index; returns False if it wasn't indexed"""
+    connection = _connect()
+    with connection:
+        removed = _remove_resume(connection, resume_id)
+        if removed:
+            _bump_generation(connection)
+    return removed
+
+def _remove_resume(connection, resume_id):
+    row = connection.execute("SELECT doc_id, keyword_bits FROM resumes WHERE resume_id = ?", (resume_id,)).fetchone()
+    if row is None:
+        return False
+
+    doc_id, blob = row
+    # Only the posting lists of this resume's own keywords contain it
+    for keyword in _blob_to_keywords(connection, blob):
+        doc_ids = _load_postings(connection, keyword)
+        _store_postings(connection, keyword, doc_ids[doc_ids != doc_id])
+    connection.execute("DELETE FROM resumes WHERE doc_id = ?", (doc_id,))
+    return True
+
+def get_resume(resume_id):
+    """The stored keywords and entities of a resume, or None"""
+    connection = _connect()
+    row = connection.execute("SELECT resume_id, keyword_bits, entities, added FROM resumes WHERE resume_id = ?",
+                             (resume_id,)).fetchone()
+    if row is None:
+        return None
+    return {'resume_id': row[0], 'keywords': _blob_to_keywords(connection, row[1]),
+            'entities': json.loads(row[2]), 'added': row[3]}
+
+def count_resumes():
+    return _connect().execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+def _cached_postings(connection, keywords):
+    """Decoded posting lists for keywords, reusing this process's copies while the index is unchanged"""
+    global _cached_generation
+    generation = connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+    with _lock:
+        if generation != _cached_generation:
+            _postings_cache.clear()
+            _cached_generation = generation
+        postings = {keyword: _postings_cache[keyword] for keyword in keywords if keyword in _postings_cache}
+
+    loaded = {keyword: _load_postings(connection, keyword) for keyword in keywords if keyword not in postings}
+    with _lock:
+        if generation == _cached_generation:
+            _postings_cache.update(loaded)
+
+    postings.update(loaded)
+    return [postings[keyword] for keyword in keywords]
+
+def search_resumes(keywords, top_k=20, keyword_weights=None):
+    """The top_k resumes matching most of keywords (or of their keyword_weights), as dicts with resume_id and matched_keywords"""
+    import numpy as np
+    keywords = sorted(set(keywords))
+    if not keywords or top_k <= 0:
+        return []
+
+    connection = _connect()
+    postings = _cached_postings(connection, keywords)
+    all_doc_ids = np.concatenate(postings)
+    if len(all_doc_ids) == 0:
+        return []
+
+    # How many of the keywords each doc id matches, or their total weight, in one vectorised pass
+    posting_weights = None
+    if keyword_weights is not None:
+        posting_weights = np.repeat([keyword_weights[keyword] for keyword in keywords],
+                                    [len(doc_ids) for doc_ids in postings])
+    scores = np.bincount(all_doc_ids, weights=posting_weights)
+    candidates = np.flatnonzero(scores)
+    # Best first, ties in the order resumes were added
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:top_k].tolist()
+
+    placeholders = ','.join('?' * len(candidates))
+    rows = connection.execute(
+        f"SELECT doc_id, resume_id, keyword_bits FROM resumes WHERE doc_id IN ({placeholders})", candidates).fetchall()
+    resumes = {doc_id: (resume_id, int.from_bytes(blob, 'little')) for doc_id, resume_id, blob in rows}
+    # Keywords no resume has were never given a bit, and have empty postings anyway
+    bit_numbers = _keyword_bit_numbers(connection, keywords)
+
+    results = []
+    for doc_id in candidates:
+        # Skip resumes another process removed after the postings were read
+        if doc_id not in resumes:
+            continue
+        resume_id, bits = resumes[doc_id]
+        matched = [keyword for keyword in keywords
+                   if keyword in bit_numbers and bits >> bit_numbers[keyword] & 1]
+        results.append({'resume_id': resume_id, 'matched_keywords': matched})
+    return results
@@ -0,0 +1,430 @@
+"""Compile the skills taxonomy into its binary keyword index.
+
+The app compiles the index itself whenever it is missing or out of date;
+run this to build it ahead of a deploy instead. From the backend directory:
+
+    python taxonomy.py [--source taxonomy.json] [--output taxonomy.idx]
+"""
+import argparse
+import array
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+# The skills taxonomy (domain keyword lists, common skills, synonyms, aliases
+# and education terms) is data in TAXONOMY_PATH rather than code. It is
+# compiled into a binary index at TAXONOMY_INDEX_PATH: an Aho-Corasick
+# automaton over every keyword and alias, stored as flat arrays that each
+# worker memory-maps, so all workers share one copy and a text is scanned for
+# every keyword in a single pass however large the taxonomy grows. get_taxonomy() checks the file every
+# TAXONOMY_RELOAD_SECONDS and swaps in the new taxonomy when it has changed
+# (0 disables hot reloading).
+# Both default to files next to this module, whatever directory the app is started from
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TAXONOMY_PATH = os.environ.get("TAXONOMY_PATH", os.path.join(BACKEND_DIR, "taxonomy.json"))
+TAXONOMY_INDEX_PATH = os.environ.get("TAXONOMY_INDEX_PATH", os.path.join(BACKEND_DIR, "taxonomy.idx"))
+TAXONOMY_RELOAD_SECONDS = float(os.environ.get("TAXONOMY_RELOAD_SECONDS", "5"))
+
+# Bump whenever the index layout changes; older index files are recompiled
+INDEX_MAGIC = b"SKTX"
+INDEX_FORMAT = 2
+
+# States are numbered breadth first, so the shallowest ones, which nearly every
+# character of a text passes through, are copied into per-process dicts for
+# speed. Deeper states are only ever read from the mapped file
+CACHED_STATES = 8192
+
+# The automaton's arrays, in file order, with their array typecodes
+INDEX_ARRAYS = [('edge_start', 'I'), ('edge_chars', 'I'), ('edge_targets', 'I'),
+                ('fail', 'I'), ('report', 'I'), ('next_report', 'I'), ('output', 'i')]
+
+_lock = threading.Lock()
+_taxonomy = None
+_checked = 0.0
+
+def is_word_boundary(text, index):
+    """Whether r'\\b' matches at text[index]"""
+    before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == '_')
+    after = index < len(text) and (text[index].isalnum() or text[index] == '_')
+    return before != after
+
+def read_taxonomy_source(path):
+    """The taxonomy file's tables, checked, plus the sorted list of every keyword to index and of (alias, keyword) pairs"""
+    with open(path, 'rb') as f:
+        source = f.read()
+    tables = json.loads(source)
+    for key in ('domains', 'common_skills', 'synonyms', 'education'):
+        if key not in tables:
+            raise ValueError(f"Taxonomy '{path}' has no '{key}' section")
+    for key in ('levels', 'job_terms', 'resume_terms', 'requirement_patterns'):
+        if key not in tables['education']:
+            raise ValueError(f"Taxonomy '{path}' has no 'education.{key}' section")
+
+    # Every keyword we ever look for: domain keywords, common skills, and the
+    # synonym table's keywords and synonyms
+    keywords = {keyword.lower() for keyword in tables['common_skills']}
+    for domain_keywords in tables['domains'].values():
+        keywords.update(keyword.lower() for keyword in domain_keywords)
+    for keyword, synonyms in tables['synonyms'].items():
+        keywords.add(keyword.lower())
+        keywords.update(synonym.lower() for synonym in synonyms)
+    keywords.discard('')
+
+    # Aliases are other spellings of a keyword ("k8s" for kubernetes). Unlike
+    # synonyms they are never keywords themselves: a text mentioning one is
+    # treated exactly as if it mentioned the keyword
+    aliases = {}
+    for keyword, keyword_aliases in tables.get('aliases', {}).items():
+        keyword = keyword.lower()
+        if keyword not in keywords:
+            raise ValueError(f"Taxonomy '{path}' has aliases for '{keyword}', which is not a keyword")
+        for alias in keyword_aliases:
+            alias = alias.lower()
+            if alias in keywords:
+                raise ValueError(f"Taxonomy '{path}' has alias '{alias}', which is already a keyword")
+            if aliases.setdefault(alias, keyword) != keyword:
+                raise ValueError(f"Taxonomy '{path}' has alias '{alias}' for both '{aliases[alias]}' and '{keyword}'")
+    aliases.pop('', None)
+
+    return source, tables, sorted(keywords), sorted(aliases.items())
+
+def build_automaton(patterns):
+    """Aho-Corasick automaton over patterns, as the INDEX_ARRAYS arrays"""
+    # A trie first, one dict of edges per state, with output[state] the index
+    # of the pattern ending there
+    edges = [{}]
+    output = [-1]
+    for pattern_id, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            target = edges[state].get(char)
+            if target is None:
+                target = len(edges)
+                edges.append({})
+                output.append(-1)
+                edges[state][char] = target
+            state = target
+        output[state] = pattern_id
+
+    # Renumber states breadth first (see CACHED_STATES)
+    order = [0]
+    queue = deque([0])
+    while queue:
+        state = queue.popleft()
+        for char in sorted(edges[state]):
+            order.append(edges[state][char])
+            queue.append(edges[state][char])
+    renumbered = {old: new for new, old in enumerate(order)}
+    edges = [{char: renumbered[target] for char, target in edges[old].items()} for old in order]
+    output = [output[old] for old in order]
+
+    # fail[state] is the state for the longest proper suffix of the state's
+    # text that is also a keyword prefix. Breadth first order means a state's
+    # fail state is always computed before its children need it
+    fail = [0] * len(edges)
+    for state, state_edges in enumerate(edges):
+        for char, target in state_edges.items():
+            if state:
+                suffix = fail[state]
+                while suffix and char not in edges[suffix]:
+                    suffix = fail[suffix]
+                fail[target] = edges[suffix].get(char, 0)
+
+    # report[state] is the first state along the fail chain (itself included)
+    # where a pattern ends, and next_report links each such state to the next
+    report = [0] * len(edges)
+    next_report = [0] * len(edges)
+    for state in range(1, len(edges)):
+        report[state] = state if output[state] >= 0 else report[fail[state]]
+        if output[state] >= 0:
+            next_report[state] = report[fail[state]]
+
+    # Edges in compressed rows: a state's edges are edge_start[state] to edge_start[state + 1]
+    edge_start = array.array('I', [0])
+    edge_chars = array.array('I')
+    edge_targets = array.array('I')
+    for state_edges in edges:
+        for char in sorted(state_edges):
+            edge_chars.append(ord(char))
+            edge_targets.append(state_edges[char])
+        edge_start.append(len(edge_chars))
+
+    return [edge_start, edge_chars, edge_targets, array.array('I', fail), array.array('I', report),
+            array.array('I', next_report), array.array('i', output)]
+
+def compile_taxonomy(source_path, index_path):
+    """Compile the taxonomy file into the binary index, replacing index_path atomically"""
+    source, tables, keywords, aliases = read_taxonomy_source(source_path)
+    # Pattern ids below len(keywords) are keyword ids; the rest are aliases
+    arrays = build_automaton(keywords + [alias for alias, _ in aliases])
+    header = json.dumps({
+        'format': INDEX_FORMAT,
+        'byteorder': sys.byteorder,
+        'source_sha256': hashlib.sha256(source).hexdigest(),
+        'tables': tables,
+        'keywords': keywords,
+        'aliases': aliases,
+        'array_lengths': [len(values) for values in arrays]
+    }).encode('utf-8')
+
+    temp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        # Align the arrays so they can be cast straight out of the mapping
+        f.write(b'\0' * (-f.tell() % 8))
+        for values in arrays:
+            f.write(values.tobytes())
+    os.replace(temp_path, index_path)
+
+class EducationClassifier:
+    """The highest education level a text mentions, found with one pattern over every level's terms"""
+
+    def __init__(self, levels, level_terms):
+        # Levels are listed highest first, so a lower rank is a higher level
+        self.levels = levels
+        self._term_ranks = {}
+        for rank, level in enumerate(levels):
+            for term in level_terms[level]:
+                self._term_ranks.setdefault(term.lower(), rank)
+        # Whole terms, plural or possessive too ("bachelors", "master's"); longest
+        # first, so "high school diploma" wins over "diploma" where both match
+        terms = sorted(self._term_ranks, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + '|'.join(re.escape(term) for term in terms) + r")(?:'?s)?\b")
+
+    def classify(self, text):
+        """(level, span) of the first mention of the highest level in lowercase text, or None if it mentions none"""
+        best_rank, best_span = len(self.levels), None
+        for match in self._pattern.finditer(text):
+            rank = self._term_ranks[match.group(1)]
+            if rank < best_rank:
+                best_rank, best_span = rank, match.span()
+                if rank == 0:
+                    break
+        if best_span is None:
+            return None
+        return self.levels[best_rank], best_span
+
+class Taxonomy:
+    """A compiled taxonomy: its tables, keyword ids and the memory-mapped keyword matcher"""
+
+    def __init__(self, index_path):
+        with open(index_path, 'rb') as f:
+            self._mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapping[:4] != INDEX_MAGIC:
+            raise ValueError(f"'{index_path}' is not a taxonomy index")
+        header_length = int.from_bytes(self._mapping[4:8], 'little')
+        header = json.loads(self._mapping[8:8 + header_length])
+        if header['format'] != INDEX_FORMAT or header['byteorder'] != sys.byteorder:
+            raise ValueError(f"'{index_path}' was compiled for another index format")
+
+        self.source_sha256 = header['source_sha256']
+        # (mtime, size) of the taxonomy file when it was loaded, set by load_taxonomy()
+        self.source_signature = None
+        # Goes into cache keys, so results from another taxonomy are never reused
+        self.fingerprint = self.source_sha256[:16]
+
+        tables = header['tables']
+        self.domain_keywords = {domain: [keyword.lower() for keyword in keywords]
+                                for domain, keywords in tables['domains'].items()}
+        self.common_skills = [skill.lower() for skill in tables['common_skills']]
+        self.synonyms = {keyword.lower(): [synonym.lower() for synonym in synonyms]
+                         for keyword, synonyms in tables['synonyms'].items()}
+        education = tables['education']
+        # Highest level first
+        self.education_levels = education['levels']
+        self.education_job_terms = education['job_terms']
+        self.education_resume_terms = education['resume_terms']
+        self.education_requirement_patterns = [re.compile(pattern) for pattern in education['requirement_patterns']]
+        self.education_job_classifier = EducationClassifier(self.education_levels, self.education_job_terms)
+        self.education_resume_classifier = EducationClassifier(self.education_levels, self.education_resume_terms)
+
+        # Keyword ids are positions in the sorted keyword list. other_keyword_id
+        # stands for job keywords outside the index, i.e. the experience ("5+
+        # years experience") and degree requirements found by pattern
+        self.vocabulary = header['keywords']
+        self.keyword_ids = {keyword: keyword_id for keyword_id, keyword in enumerate(self.vocabulary)}
+        self.other_keyword_id = len(self.vocabulary)
+        self.aliases = dict(header['aliases'])
+
+        # The automaton reports pattern ids: keyword ids, then one per alias.
+        # Each pattern maps to the keyword it stands for, so aliases are
+        # normalised during the scan itself
+        patterns = self.vocabulary + [alias for alias, _ in header['aliases']]
+        self._pattern_keywords = self.vocabulary + [keyword for _, keyword in header['aliases']]
+        self._pattern_lengths = [len(pattern) for pattern in patterns]
+
+        # Each keyword with synonyms, as (keyword id, bitset of its synonyms)
+        self.synonym_bits = [(self.keyword_ids[keyword], self.keyword_bits(synonyms))
+                             for keyword, synonyms in self.synonyms.items()]
+
+        # Filled in by app.get_keyword_weights(), as the weights depend on the keyword ids
+        self.keyword_weights = None
+
+        offset = 8 + header_length
+        offset += -offset % 8
+        view = memoryview(self._mapping)
+        for (name, typecode), length in zip(INDEX_ARRAYS, header['array_lengths']):
+            size = array.array(typecode).itemsize * length
+            setattr(self, '_' + name, view[offset:offset + size].cast(typecode))
+            offset += size
+
+        cached_states = min(CACHED_STATES, len(self._fail))
+        self._cached_states = cached_states
+        self._cached_edges = [
+            {chr(self._edge_chars[edge]): self._edge_targets[edge]
+             for edge in range(self._edge_start[state], self._edge_start[state + 1])}
+            for state in range(cached_states)]
+        self._cached_fail = self._fail[:cached_states].tolist()
+        self._cached_report = self._report[:cached_states].tolist()
+
+    def scan(self, text):
+        """Find every indexed keyword in text with a single pass.
+
+        Returns (substring_hits, word_hits): keywords occurring anywhere in the
+        text, and keywords occurring as whole words (what r'\\b' + keyword + r'\\b'
+        would match). An alias counts as its keyword, but only as a whole word,
+        so "js" inside "json" is no mention of javascript.
+        """
+        cached_states = self._cached_states
+        cached_edges = self._cached_edges
+        cached_fail = self._cached_fail
+        cached_report = self._cached_report
+        edge_start, edge_chars, edge_targets = self._edge_start, self._edge_chars, self._edge_targets
+        fail, report, next_report, output = self._fail, self._report, self._next_report, self._output
+
+        # (end, pattern id) of every keyword and alias occurrence
+        occurrences = []
+        state = 0
+        for position, char in enumerate(text):
+            while True:
+                if state < cached_states:
+                    target = cached_edges[state].get(char)
+                    if target is not None:
+                        state = target
+                        break
+                    if not state:
+                        break
+                    state = cached_fail[state]
+                else:
+                    code = ord(char)
+                    for edge in range(edge_start[state], edge_start[state + 1]):
+                        if edge_chars[edge] == code:
+                            state = edge_targets[edge]
+                            break
+                    else:
+                        state = fail[state]
+                        continue
+                    break
+
+            found = cached_report[state] if state < cached_states else report[state]
+            while found:
+                occurrences.append((position + 1, output[found]))
+                found = next_report[found]
+
+        substring_hits = set()
+        word_hits = set()
+        keyword_count = self.other_keyword_id
+        for end, pattern_id in occurrences:
+            keyword = self._pattern_keywords[pattern_id]
+            if is_word_boundary(text, end - self._pattern_lengths[pattern_id]) and is_word_boundary(text, end):
+                substring_hits.add(keyword)
+                word_hits.add(keyword)
+            elif pattern_id < keyword_count:
+                substring_hits.add(keyword)
+        return substring_hits, word_hits
+
+    # A set of keywords is a bitset: an int with bit i set for keyword id i, so
+    # intersections and differences of keyword sets are single bitwise operations
+    def keyword_bits(self, keywords):
+        """Bitset of the indexed keywords among keywords"""
+        bits = 0
+        for keyword in keywords:
+            keyword_id = self.keyword_ids.get(keyword)
+            if keyword_id is not None:
+                bits |= 1 << keyword_id
+        return bits
+
+    def bits_to_keywords(self, bits):
+        """The keywords of a bitset, in id order"""
+        keywords = []
+        while bits:
+            lowest_bit = bits & -bits
+            keywords.append(self.vocabulary[lowest_bit.bit_length() - 1])
+            bits ^= lowest_bit
+        return keywords
+
+    def resume_keyword_bits(self, word_hits):
+        """Bitset of the keywords a resume counts as having: whole word hits, plus keywords one of whose synonyms is hit"""
+        bits = self.keyword_bits(word_hits)
+        for keyword_id, synonym_bits in self.synonym_bits:
+            if bits & synonym_bits:
+                bits |= 1 << keyword_id
+        return bits
+
+    def ids(self, keywords):
+        """Ids of job keywords, with other_keyword_id for anything outside the index"""
+        return [self.keyword_ids.get(keyword, self.other_keyword_id) for keyword in keywords]
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def load_taxonomy(source_path, index_path):
+    """The compiled taxonomy for the taxonomy file, compiling it first if the index is missing or stale"""
+    signature = _source_signature(source_path)
+    with open(source_path, 'rb') as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    try:
+        taxonomy = Taxonomy(index_path)
+    except (OSError, ValueError, KeyError):
+        taxonomy = None
+    if taxonomy is None or taxonomy.source_sha256 != source_sha256:
+        # Another worker may be compiling it too; each writes its own file and renames it into place
+        compile_taxonomy(source_path, index_path)
+        taxonomy = Taxonomy(index_path)
+
+    taxonomy.source_signature = signature
+    return taxonomy
+
+def get_taxonomy():
+    """Return the process-wide taxonomy, loading it on first use and reloading it when the file changes"""
+    global _taxonomy, _checked
+    if _taxonomy is not None and (TAXONOMY_RELOAD_SECONDS <= 0 or time.monotonic() - _checked < TAXONOMY_RELOAD_SECONDS):
+        return _taxonomy
+
+    with _lock:
+        if _taxonomy is None:
+            _taxonomy = load_taxonomy(TAXONOMY_PATH, TAXONOMY_INDEX_PATH)
+            _checked = time.monotonic()
+        elif TAXONOMY_RELOAD_SECONDS > 0 and time.monotonic() - _checked >= TAXONOMY_RELOAD_SECONDS:
+            _checked = time.monotonic()
+            try:
+                if _source_signature(TAXONOMY_PATH) != _taxonomy.source_signature:
+                    _taxonomy = load_taxonomy(TAXONOMY_PATH, TAXONOMY_INDEX_PATH)
+            except Exception as e:
+                # A broken edit mustn't take the service down: keep the taxonomy we have
+                print(f"Error reloading taxonomy: {str(e)}")
+    return _taxonomy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=TAXONOMY_PATH, help="taxonomy JSON file")
+    parser.add_argument("--output", default=TAXONOMY_INDEX_PATH, help="where to write the index")
+    args = parser.parse_args()
+
+    compile_taxonomy(args.source, args.output)
+    taxonomy = Taxonomy(args.output)
+    print(f"Compiled {len(taxonomy.vocabulary)} keywords and {len(taxonomy.aliases)} aliases into {len(taxonomy._fail)} matcher states, "
+          f"written to {args.output} (fingerprint {taxonomy.fingerprint})")
+
+if __name__ == "__main__":
+    main()
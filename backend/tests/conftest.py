@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# The backend modules are imported by name, as gunicorn does from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep caches, job profiles and the resume index out of the working tree.
+# app.py reads these when it is imported, so they are set before any test does,
+# whatever the environment says
+_data_dir = tempfile.mkdtemp(prefix="resume-analyzer-tests-")
+os.environ["ANALYSIS_CACHE_DIR"] = os.path.join(_data_dir, "cache")
+os.environ["JOB_PROFILE_DIR"] = os.path.join(_data_dir, "job_profiles")
+os.environ["RESUME_INDEX_PATH"] = os.path.join(_data_dir, "resume_index.sqlite3")
+os.environ["JOB_QUEUE_BACKEND"] = "memory"
@@ -0,0 +1,31 @@
+import os
+import signal
+
+import pytest
+
+import analysis_pool
+
+def kill_self():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_EXECUTOR", "process")
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_POOL_WORKERS", 1)
+    yield analysis_pool.start_analysis_pool()
+    analysis_pool._pool.shutdown()
+    analysis_pool._pool = None
+
+def test_killed_process_is_replaced(pool):
+    os.kill(analysis_pool.run_analysis(os.getpid), signal.SIGKILL)
+
+    assert analysis_pool.run_analysis(sum, [1, 2]) == 3
+    assert analysis_pool._pool is not pool
+    assert analysis_pool._pending == 0
+
+def test_analysis_that_kills_its_process_fails_once(pool):
+    with pytest.raises(analysis_pool.AnalysisPoolBrokenError):
+        analysis_pool.run_analysis(kill_self)
+
+    assert analysis_pool.run_analysis(sum, [1, 2]) == 3
+    assert analysis_pool._pending == 0
@@ -0,0 +1,30 @@
+import pytest
+
+import app
+from resume_index import add_resumes
+
+JOB_DESCRIPTION = "Python developer with SQL and Docker"
+
+@pytest.fixture(scope="module")
+def client():
+    add_resumes([("jane", ["python", "sql", "docker"], {}), ("john", ["python"], {})])
+    return app.app.test_client()
+
+def search(client, top_k):
+    return client.post('/resumes/search', data={'jobDescription': JOB_DESCRIPTION, 'top_k': top_k})
+
+@pytest.mark.parametrize("top_k", [0, -5, app.RESUME_SEARCH_MAX_TOP_K + 1, 10 ** 6])
+def test_out_of_range_top_k_is_rejected(client, top_k):
+    response = search(client, top_k)
+    assert response.status_code == 400
+    assert 'top_k' in response.get_json()['error']
+
+def test_smallest_top_k(client):
+    response = search(client, 1)
+    assert response.status_code == 200
+    assert [result['resume_id'] for result in response.get_json()['results']] == ['jane']
+
+def test_largest_top_k(client):
+    response = search(client, app.RESUME_SEARCH_MAX_TOP_K)
+    assert response.status_code == 200
+    assert [result['resume_id'] for result in response.get_json()['results']] == ['jane', 'john']
@@ -11,6 +11,10 @@ import Results, { ResultsData } from '@/components/Results';
 
 // API_URL will be different in development vs production
 const getApiUrl = () => {
+  // VITE_API_URL points the app at another backend, e.g. the Flask one
+  if (import.meta.env.VITE_API_URL) {
+    return import.meta.env.VITE_API_URL;
+  }
   // On Azure Static Web Apps, API routes are automatically proxied via /api
   if (import.meta.env.PROD) {
     return "/api";
@@ -19,6 +23,74 @@ const getApiUrl = () => {
   return "http://localhost:7071/api";
 };
 
+// How often to ask the backend whether an analysis job has finished, and how
+// long to keep asking before giving up on it
+const POLL_INTERVAL_MS = 1000;
+const ANALYSIS_TIMEOUT_MS = 10 * 60 * 1000;
+
+// Backends that answered 404 to the job API (such as Azure Functions), so
+// later analyses go straight to /analyze instead of trying it again
+const backendsWithoutJobApi = new Set<string>();
+
+const errorFromResponse = async (response: Response) => {
+  const errorData = await response.json();
+  return new Error(errorData.error || 'Failed to analyze resume');
+};
+
+// Submit the analysis as a job and poll until it finishes, so a long
+// analysis doesn't depend on a single HTTP request staying open
+const runAnalysis = async (apiUrl: string, formData: FormData) => {
+  const submitResponse = backendsWithoutJobApi.has(apiUrl)
+    ? null
+    : await fetch(`${apiUrl}/analyze/jobs`, {
+        method: 'POST',
+        body: formData,
+      });
+
+  // Backends without the job API (such as Azure Functions) analyze in one request
+  if (submitResponse === null || submitResponse.status === 404) {
+    backendsWithoutJobApi.add(apiUrl);
+    const response = await fetch(`${apiUrl}/analyze`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      throw await errorFromResponse(response);
+    }
+    return response.json();
+  }
+
+  if (!submitResponse.ok) {
+    throw await errorFromResponse(submitResponse);
+  }
+
+  const { job_id } = await submitResponse.json();
+  const deadline = Date.now() + ANALYSIS_TIMEOUT_MS;
+  for (;;) {
+    if (Date.now() >= deadline) {
+      throw new Error('The analysis is taking too long. Please try again later.');
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+
+    const response = await fetch(`${apiUrl}/analyze/jobs/${job_id}`);
+    // The job expired or the backend lost it, so polling again won't help
+    if (response.status === 404) {
+      throw new Error('The analysis job was lost or has expired. Please try again.');
+    }
+    if (!response.ok) {
+      throw await errorFromResponse(response);
+    }
+
+    const job = await response.json();
+    if (job.status === 'done') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Failed to analyze resume');
+    }
+  }
+};
+
 const Index = () => {
   const { toast } = useToast();
   const [resume, setResume] = useState<File | null>(null);
@@ -88,17 +160,7 @@ const Index = () => {
       formData.append('jobDescription', jobDescription);
 
       // Call the backend API using the configured API URL
-      const response = await fetch(`${apiUrl}/analyze`, {
-        method: 'POST',
-        body: formData,
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.error || 'Failed to analyze resume');
-      }
-
-      const data = await response.json();
+      const data = await runAnalysis(apiUrl, formData);
       
       // Set the results
       setResults({